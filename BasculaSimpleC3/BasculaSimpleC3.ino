@@ -27,6 +27,18 @@ int16_t sendValuesIntervalLoops = 5;
 int8_t sendValuesCounter = 0;
 int16_t loopDelay = 100;
 bool continuousUpdate = false;
+bool binaryUpdate = false;     // stream BinaryFrame records instead of JSON lines
+
+// Binary streaming record, little endian, 13 bytes per sample
+const uint16_t FRAME_SYNC = 0x5AA5;  // sent as 0xA5 0x5A
+struct __attribute__((packed)) BinaryFrame {
+  uint16_t sync;
+  uint16_t seq;        // increments every frame, host detects drops with it
+  uint32_t micros;     // device timestamp of the conversion
+  int32_t adcValue;    // raw 20-bit value, sign extended
+  uint8_t checksum;    // sum of seq..adcValue bytes modulo 256
+};
+uint16_t frameSeq = 0;
 
 // Create a DynamicJsonDocument with a capacity of 200 bytes
 DynamicJsonDocument doc(200);
@@ -40,6 +52,7 @@ void setup() {
   doc["knownWeight"] = 00;
   doc["calibrationValue"] = 0;
   doc["calculatedWeight"] = 0;
+  doc["micros"] = 0;  // device timestamp of the conversion, lets the host align streams
 
   // Initialize serial communication at 115200 baud
   Serial.begin(115200);
@@ -81,6 +94,23 @@ void sendCurrentValues(){
   Serial.println();
 }
 
+void sendBinaryFrame(int32_t adcValue, uint32_t timestamp) {
+  BinaryFrame frame;
+  frame.sync = FRAME_SYNC;
+  frame.seq = frameSeq++;
+  frame.micros = timestamp;
+  frame.adcValue = adcValue;
+
+  uint8_t sum = 0;
+  const uint8_t *bytes = (const uint8_t *)&frame;
+  for (size_t i = sizeof(frame.sync); i < sizeof(frame) - sizeof(frame.checksum); i++) {
+    sum += bytes[i];
+  }
+  frame.checksum = sum;
+
+  Serial.write((const uint8_t *)&frame, sizeof(frame));
+}
+
 void selectMode() {
   // Wait for weight input
   while (!Serial.available()) {
@@ -91,12 +121,20 @@ void selectMode() {
   char mode = Serial.read();
   if (mode == 'm'){
     continuousUpdate = false;
+    binaryUpdate = false;
     Serial.print("Manual mode selected");
   }
   else if (mode == 'a'){
     continuousUpdate = true;
+    binaryUpdate = false;
     Serial.print("Automatic mode selected");
   }
+  else if (mode == 'b'){
+    continuousUpdate = true;
+    binaryUpdate = true;
+    frameSeq = 0;
+    Serial.print("Binary mode selected");
+  }
   else{
     Serial.print("Unsupported mode");
     Serial.println(mode);
@@ -132,6 +170,7 @@ void checkDataReady(){
   if (digitalRead(DOUT_PIN) == LOW) {
 
     // Read the 20-bit value
+    uint32_t timestamp = micros();
     int32_t adcValue = readADS1230();
     
     // Convert to weight
@@ -143,6 +182,7 @@ void checkDataReady(){
       doc["adcValue"] = adcValue;
       doc["isCalibrated"] = isCalibrated;
       doc["calculatedWeight"] = weight;
+      doc["micros"] = timestamp;
     
     // if (isCalibrated) {
     //   Serial.print(", Weight: ");
@@ -154,7 +194,9 @@ void checkDataReady(){
     //   Serial.println("Please calibrate using 't' and 'c' commands");
     // }
     // data is rady and continius update on
-    if(continuousUpdate)
+    if(continuousUpdate && binaryUpdate)
+      sendBinaryFrame(adcValue, timestamp);  // raw value only, weight computed on the host
+    else if(continuousUpdate)
       sendCurrentValues();
   }
 }
@@ -1,11 +1,41 @@
 
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, HTTPException, WebSocket, WebSocketDisconnect
+from fastapi.responses import StreamingResponse, Response, PlainTextResponse
+import time
+import asyncio
 import uvicorn
+from contextlib import asynccontextmanager
+import numpy as np
 
 from fastapi.middleware.cors import CORSMiddleware
 from motor_controller import MotorController
+from async_motor import AsyncMotorController
+from drive_group import DriveGroup, DriveAxis
+from device_worker import DeviceWorker
+from signal_buffer import SignalBuffer
+from telemetry_stream import StreamCursor
+from telemetry_sampler import TELEMETRY_CHANNELS
+from telemetry_history import TelemetryHistory, history_to_json, history_to_npz
+from time_alignment import timing_report
+from clock_sync import ClockSync
+import load_cell_reader
+from load_cell_commands import LoadCellCommand
+from load_cell_hub import LoadCellHub
+import metrics
+from sampling_profiler import profiler
 
-app = FastAPI()
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    worker.start()
+    history_task = asyncio.create_task(history_loop())
+    try:
+        yield
+    finally:
+        history_task.cancel()
+        # a running device command finishes first, off the event loop
+        await asyncio.to_thread(worker.stop)
+
+app = FastAPI(lifespan=lifespan)
 
 app.add_middleware(
     CORSMiddleware,
@@ -16,98 +46,542 @@ app.add_middleware(
 )
 
 motor : MotorController = None
+async_motor: AsyncMotorController = None
+# all device commands run on this thread, handlers only await its futures
+worker = DeviceWorker()
+# multi axis stations, addressed by axis id under /axes
+group = DriveGroup()
 
-@app.post("/motor/connect")
-async def set_home_position():
-    """Write a UTF-8 string to serial port."""
+load_cell: load_cell_reader.LoadCellreader = None
+load_cell_buffer = SignalBuffer(['force', 'adcValue'], 100000)
+# several sensors per station (input/output tension) read by one thread
+load_cell_hub = LoadCellHub()
+
+STREAM_SOURCES = ['motor', 'loadcell']
+STREAM_INTERVAL = 0.02  # fastest frame period for streaming clients
+HISTORY_INTERVAL = 1.0  # seconds between history updates
+
+history = {
+    'motor': TelemetryHistory(TELEMETRY_CHANNELS),
+    'loadcell': TelemetryHistory(load_cell_buffer.channels),
+}
+
+def require_motor():
+    if not motor:
+        raise HTTPException(status_code=400, detail="Motor not connected")
+
+async def run_command(fn, *args):
+    return await asyncio.wrap_future(worker.submit(fn, *args))
+
+async def run_job(name: str, fn, wait: bool):
+    job = worker.start_job(name, fn)
+    if wait:
+        await asyncio.wrap_future(job.future)
+    return {
+        "status": "success" if wait else "accepted",
+        "job": job.id,
+        "result": job.result
+    }
+
+def connect_motor(profile: str = None, serial_number: str = None):
     global motor
-    try:
-        print("Initializing motor")
+    print("Initializing motor")
+    if motor:
+        # same board keeps its handle, don't reboot it under the new controller
+        motor.end(reboot=False)
+        motor = None
 
-        print("Waitting for motor to connect")
-        motor = MotorController()
-        
-        print("Configuring motor")
-        motor.config()
-        motor.save_and_reboot()
+    print("Waitting for motor to connect")
+    new_motor = MotorController(serial_number=serial_number)
 
-        return {
-            "status": "success"
-        }
-    except UnicodeEncodeError as e:
-        raise HTTPException(status_code=400, detail="Error connecting motor")
+    print("Configuring motor")
+    new_motor.config(profile)
+    new_motor.save_and_reboot()
+    new_motor.restore_calibration()
+    new_motor.run()
+    motor = new_motor
+    return new_motor.connect_report()
+
+def set_position_and_read(position: float):
+    motor.set_pos(position)
+    return motor.get_position()
+
+def get_async_motor() -> AsyncMotorController:
+    global async_motor
+    if async_motor is None or async_motor.motor is not motor:
+        if async_motor:
+            async_motor.close()
+        async_motor = AsyncMotorController(motor, run_command)
+    return async_motor
+
+@app.post("/motor/connect")
+async def connect(wait: bool = True, profile: str = None, serial_number: str = None):
+    """Discover, configure (profile: JSON file path) and start sampling the motor.
+
+    The USB handle of a board is discovered once and reused by later connects,
+    serial_number picks the board. Only changed configuration values are
+    written, the board is saved and rebooted only if something changed.
+    With wait=false returns a job id.
+    """
+    try:
+        return await run_job("connect", lambda: connect_motor(profile, serial_number), wait)
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=f"Error connecting motor: {e}")
         
 @app.post("/motor/calibrate")
-async def set_home_position():
-    """Write a UTF-8 string to serial port."""
-    global motor
+async def calibrate(wait: bool = True, force: bool = False):
+    """Calibrate the motor, reusing a validated cached calibration unless force.
+
+    The result reports the source (device, cache or full) and the time saved.
+    With wait=false returns a job id.
+    """
+    require_motor()
     try:
         print("Calibrate motor") 
-        motor.calibrate()
-        return {
-            "status": "success"
-        }
-    except UnicodeEncodeError as e:
-        raise HTTPException(status_code=400, detail="Error calibrating motor")
+        return await run_job("calibrate", lambda: motor.calibrate(force), wait)
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=f"Error calibrating motor: {e}")
     
 @app.post("/motor/release")
-async def set_home_position():
-    """Write a UTF-8 string to serial port."""
-    global motor
+async def release():
+    """Set the axis to idle."""
+    require_motor()
     try:
         print("Releasing motor") 
-        motor.release_torque()
+        await run_command(motor.release_torque)
         return {
             "status": "success"
         }
-    except UnicodeEncodeError as e:
-        raise HTTPException(status_code=400, detail="Error releasing motor")
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=f"Error releasing motor: {e}")
 
 @app.post("/motor/set_home")
-async def set_home_position():
-    """Write a UTF-8 string to serial port."""
-    global motor
+async def set_home_position(timeout: float = 5.0):
+    """Enter closed loop control and return the current position.
+
+    Waits on the shared state poller, the axis is idled again if closed loop
+    is not reached within timeout or the request is cancelled.
+    """
+    require_motor()
     try:
         print("Set new home")
-        motor.set_home()
-        pos = motor.get_position()
+        telemetry = await get_async_motor().set_home(timeout)
         return {
             "status": "success",
-            "position": pos
+            "position": telemetry.position
         }
-    except UnicodeEncodeError as e:
-        raise HTTPException(status_code=400, detail="Error settign home")
+    except asyncio.TimeoutError:
+        raise HTTPException(status_code=408, detail=f"Closed loop not reached after {timeout}s")
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=f"Error settign home: {e}")
 
 @app.post("/motor/set_position/{position}")
 async def set_position(position: float):
-    """Read data and decode as UTF-8 string."""
-    global motor
+    """Write a position setpoint in degrees."""
+    require_motor()
     try:
         print("setting position to", position)
-        motor.set_pos(position)
-        pos = motor.get_position()
+        pos = await run_command(set_position_and_read, position)
         return {
             "status": "success",
             "position": pos
         }
-    except UnicodeDecodeError:
-        raise HTTPException(status_code=400, detail=f"Error setting position {position}")
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=f"Error setting position {position}: {e}")
 
 @app.post("/motor/get_values")
-async def set_position():
-    """Read data and decode as UTF-8 string."""
-    global motor
+async def get_values():
+    """Latest telemetry snapshot, served from the sampler cache without touching the device."""
+    require_motor()
+    telemetry = motor.telemetry
+    if telemetry is None:
+        try:
+            telemetry = await run_command(motor.get_telemetry)
+        except Exception as e:
+            raise HTTPException(status_code=400, detail=f"Error getting position: {e}")
+    return {
+        "position": telemetry.position,
+        "velocity": telemetry.velocity,
+        "torque": telemetry.torque,
+        "iq": telemetry.iq,
+        "vbus_voltage": telemetry.vbus_voltage,
+        "axis_state": telemetry.axis_state,
+        "active_errors": telemetry.active_errors,
+        "disarm_reason": telemetry.disarm_reason,
+        "timestamp": telemetry.timestamp
+    }
+
+def load_cell_block_cb(block: load_cell_reader.LoadCellBlock):
+    # device timestamps mapped to time.monotonic(), the clock of the motor telemetry
+    load_cell_buffer.extend(
+        block.times,
+        np.vstack((block.column('calculatedWeight'), block.column('adcValue')))
+    )
+
+def connect_load_cell_reader(port: str, baud_rate: int, binary: bool):
+    global load_cell
+    if load_cell and load_cell.isConnected():
+        load_cell.disconnect()
+    load_cell = load_cell_reader.LoadCellreader(port, baud_rate)
+    load_cell.start(block_callback=load_cell_block_cb, binary=binary)
+
+@app.post("/loadcell/connect")
+async def connect_load_cell(port: str = 'COM4', baud_rate: int = 115200, binary: bool = False):
+    """Open the load cell serial port and stream its samples into the telemetry sources."""
     try:
-        pos = motor.get_position()
-        vel = motor.get_velocity()
-        torq = motor.get_torque()
+        await asyncio.to_thread(connect_load_cell_reader, port, baud_rate, binary)
         return {
-            "position": pos,
-            "velocity": vel,
-            "torque": torq
+            "status": "success"
         }
-    except UnicodeDecodeError:
-        raise HTTPException(status_code=400, detail=f"Error getting position")
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=f"Error connecting load cell: {e}")
+
+@app.post("/loadcell/{sensor_id}/connect")
+async def connect_hub_sensor(sensor_id: str, port: str, baud_rate: int = 115200, binary: bool = False):
+    """Add a sensor to the load cell hub, replacing any sensor with the same id."""
+    try:
+        hub_port = await asyncio.to_thread(load_cell_hub.add, sensor_id, port, baud_rate, binary)
+        return {"status": "success", **hub_port.describe()}
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=f"Error connecting load cell {sensor_id}: {e}")
+
+@app.delete("/loadcell/{sensor_id}")
+async def remove_hub_sensor(sensor_id: str):
+    await asyncio.to_thread(load_cell_hub.remove, sensor_id)
+    return {"status": "success"}
+
+@app.get("/loadcell/stats")
+async def load_cell_stats():
+    """Per port bytes/s, lines/s, parse errors and parse errors/s since the previous call."""
+    stats = load_cell_hub.get_stats()
+    if load_cell and load_cell.isConnected():
+        stats["ports"]["loadcell"] = load_cell.get_stats()
+    return stats
+
+def get_load_cell(sensor_id: str = None) -> load_cell_reader.LoadCellreader:
+    """The /loadcell/connect reader, or a hub sensor when sensor_id is given."""
+    if sensor_id is None:
+        if not load_cell or not load_cell.isConnected():
+            raise HTTPException(status_code=400, detail="Load cell not connected")
+        return load_cell
+    if sensor_id not in load_cell_hub.ports:
+        raise HTTPException(status_code=404, detail=f"Unknown load cell {sensor_id}")
+    return load_cell_hub.ports[sensor_id].reader
+
+async def run_load_cell_command(command: LoadCellCommand) -> dict:
+    # resolved by the reader thread when the reply line arrives, samples keep streaming meanwhile
+    try:
+        reply = await asyncio.wait_for(asyncio.wrap_future(command), command.deadline - time.monotonic() + 0.05)
+    except (asyncio.TimeoutError, TimeoutError):
+        raise HTTPException(status_code=408, detail=f"No reply from load cell to {command.data!r}")
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=f"Error sending load cell command: {e}")
+    return {"status": "success", "messages": command.messages, "reply": reply}
+
+@app.post("/loadcell/tare")
+async def tare_load_cell(sensor_id: str = None):
+    return await run_load_cell_command(get_load_cell(sensor_id).tare())
+
+@app.post("/loadcell/calibrate")
+async def calibrate_load_cell(weight_kg: float = 1.0, sensor_id: str = None):
+    """Calibrate with weight_kg on the cell."""
+    return await run_load_cell_command(get_load_cell(sensor_id).calibrate(weight_kg))
+
+@app.get("/loadcell/force")
+async def get_load_cell_force(sensor_id: str = None):
+    """Latest streamed weight, a round trip to the firmware only in manual mode."""
+    reader = get_load_cell(sensor_id)
+    return {"force": await asyncio.to_thread(reader.get_current_force)}
+
+@app.get("/loadcell/merged/samples")
+async def get_merged_load_cell_samples(since: int = 0, max_samples: int = 5000):
+    """All hub sensors in receive order, the sensor column is the index given in /loadcell/stats."""
+    return buffer_samples(load_cell_hub.merged, since, max_samples)
+
+@app.get("/loadcell/{sensor_id}/samples")
+async def get_load_cell_samples(sensor_id: str, since: int = 0, max_samples: int = 5000):
+    if sensor_id not in load_cell_hub.ports:
+        raise HTTPException(status_code=404, detail=f"Unknown load cell {sensor_id}")
+    return buffer_samples(load_cell_hub.ports[sensor_id].buffer, since, max_samples)
+
+def stream_buffers(sources: str) -> dict:
+    buffers = {}
+    for name in sources.split(','):
+        if name == 'motor' and motor and motor.sampler:
+            buffers[name] = motor.sampler.buffer
+        elif name == 'loadcell' and load_cell:
+            buffers[name] = load_cell_buffer
+    return buffers
+
+def update_cursors(cursors: dict, sources: str, rate: float) -> list[StreamCursor]:
+    """Add cursors for sources that became available (or were replaced), returns the new ones."""
+    added = []
+    for name, buffer in stream_buffers(sources).items():
+        if name not in cursors or cursors[name].buffer is not buffer:
+            cursors[name] = StreamCursor(name, STREAM_SOURCES.index(name), buffer, rate)
+            added.append(cursors[name])
+    return added
+
+@app.websocket("/ws/telemetry")
+async def telemetry_websocket(websocket: WebSocket, rate: float = 0, format: str = "json",
+                              sources: str = "motor,loadcell"):
+    """Push telemetry to the client.
+
+    rate limits samples per second per source (0 sends every sample), format=binary
+    sends telemetry_stream binary frames instead of JSON. Every source is announced
+    with a JSON {"type": "source"} message before its first frame.
+    """
+    await websocket.accept()
+    interval = max(STREAM_INTERVAL, 1 / rate) if rate else STREAM_INTERVAL
+    binary = format == "binary"
+    cursors = {}
+    try:
+        while True:
+            for cursor in update_cursors(cursors, sources, rate):
+                await websocket.send_json({"type": "source", **cursor.describe()})
+            for cursor in cursors.values():
+                batch = cursor.poll()
+                if not batch:
+                    continue
+                if binary:
+                    await websocket.send_bytes(cursor.encode_binary(*batch))
+                else:
+                    await websocket.send_text(cursor.encode_json(*batch))
+            await asyncio.sleep(interval)
+    except WebSocketDisconnect:
+        pass
+
+@app.websocket("/ws/motor/state")
+async def motor_state_websocket(websocket: WebSocket):
+    """Push the motor telemetry snapshot each time axis_state or active_errors changes."""
+    await websocket.accept()
+    if not motor:
+        await websocket.close(code=1011, reason="Motor not connected")
+        return
+    try:
+        async for telemetry in get_async_motor().state_changes():
+            await websocket.send_json(telemetry.to_dict())
+    except WebSocketDisconnect:
+        pass
+
+@app.get("/telemetry/stream")
+async def telemetry_events(rate: float = 0, sources: str = "motor,loadcell"):
+    """Server-Sent Events version of /ws/telemetry (JSON frames only)."""
+    interval = max(STREAM_INTERVAL, 1 / rate) if rate else STREAM_INTERVAL
+
+    async def events():
+        cursors = {}
+        while True:
+            update_cursors(cursors, sources, rate)
+            for cursor in cursors.values():
+                batch = cursor.poll()
+                if batch:
+                    yield f"data: {cursor.encode_json(*batch)}\n\n"
+            await asyncio.sleep(interval)
+
+    return StreamingResponse(events(), media_type="text/event-stream")
+
+def update_history():
+    for name, buffer in stream_buffers(','.join(STREAM_SOURCES)).items():
+        history[name].update(buffer)
+
+async def history_loop():
+    while True:
+        try:
+            update_history()
+        except Exception as e:
+            print(f"Exception updating history {e}")
+        await asyncio.sleep(HISTORY_INTERVAL)
+
+@app.get("/telemetry/timing")
+async def telemetry_timing():
+    """Load cell clock sync, latency of each pipeline stage and the resulting alignment error."""
+    connected = load_cell and load_cell.isConnected()
+    stages = dict(load_cell.latency) if connected else {}
+    if motor and motor.sampler:
+        stages["motor_fetch"] = motor.sampler.fetch_latency
+    return timing_report(load_cell.clock if connected else ClockSync(), stages)
+
+@app.get("/metrics")
+async def get_metrics():
+    """Counters and histograms of the hot paths in the Prometheus text format."""
+    return PlainTextResponse(metrics.registry.to_prometheus(), media_type="text/plain; version=0.0.4")
+
+@app.post("/metrics/enabled")
+async def set_metrics_enabled(enabled: bool = True):
+    """Switch metric updates on or off at runtime, the values collected so far are kept."""
+    metrics.set_enabled(enabled)
+    return {"enabled": metrics.enabled}
+
+@app.post("/profiler/start")
+async def start_profiler(duration: float = 30.0, interval_ms: float = 5.0):
+    """Sample the stacks of all threads for duration seconds (at most 600)."""
+    try:
+        profiler.start(duration, interval_ms / 1000)
+    except Exception as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    return profiler.get_stats()
+
+@app.post("/profiler/stop")
+async def stop_profiler():
+    await asyncio.to_thread(profiler.stop)
+    return profiler.get_stats()
+
+@app.get("/profiler")
+async def get_profile(top: int = 20):
+    """Profiler state and the functions most often on top of a sampled stack."""
+    return {**profiler.get_stats(), "top": profiler.top(top)}
+
+@app.get("/profiler/folded")
+async def get_profile_folded():
+    """Collapsed stacks for flamegraph.pl or speedscope."""
+    return PlainTextResponse(profiler.folded())
+
+@app.get("/telemetry/history")
+async def telemetry_history(source: str = 'motor', since: float = None, until: float = None,
+                            max_points: int = 2000, format: str = "json"):
+    """Past telemetry between since and until (sample clock seconds) in at most max_points points.
+
+    Long ranges are answered from min/max/mean tiers, format=npz returns a
+    compressed numpy archive with one array per column instead of JSON.
+    """
+    if source not in history:
+        raise HTTPException(status_code=404, detail=f"Unknown source {source}")
+    update_history()
+    result = history[source].query(since, until, max(max_points, 1))
+    if format == "npz":
+        return Response(history_to_npz(result), media_type="application/octet-stream",
+                        headers={"X-Tier": result["tier"]})
+    return history_to_json(result)
+
+@app.get("/motor/connection")
+async def connection_stats():
+    """Discovery and reconnect counters and timings of the motor's USB connection."""
+    require_motor()
+    return motor.connection.get_stats()
+
+@app.get("/motor/commands")
+async def command_stats():
+    """Setpoint pipeline metrics: queue depth, coalesced requests, command-to-wire latency."""
+    require_motor()
+    return motor.dispatcher.get_stats()
+
+@app.get("/jobs")
+async def list_jobs():
+    return {
+        "busy": worker.current,
+        "jobs": [job.to_dict() for job in worker.jobs.values()]
+    }
+
+@app.get("/jobs/{job_id}")
+async def get_job(job_id: int):
+    job = worker.get_job(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail=f"Unknown job {job_id}")
+    return job.to_dict()
+
+def buffer_samples(buffer: SignalBuffer, since: int, max_samples: int) -> dict:
+    first, ts, values = buffer.since(since)
+    ts, values = ts[:max_samples], values[:, :max_samples]
+    samples = {name: values[i].tolist() for i, name in enumerate(buffer.channels)}
+    return {
+        "first_seq": first,
+        "next_seq": first + len(ts),
+        "timestamp": ts.tolist(),
+        **samples
+    }
+
+@app.get("/motor/samples")
+async def get_samples(since: int = 0, max_samples: int = 5000):
+    """Sampled telemetry with sequence number >= since, pass back next_seq to continue."""
+    if not motor or not motor.sampler:
+        raise HTTPException(status_code=400, detail="Motor not connected")
+    return buffer_samples(motor.sampler.buffer, since, max_samples)
+
+def require_axis(axis_id: str) -> DriveAxis:
+    entry = group.get(axis_id)
+    if not entry:
+        raise HTTPException(status_code=404, detail=f"Unknown axis {axis_id}")
+    return entry
+
+async def run_axis(entry: DriveAxis, fn, *args):
+    # each axis has its own worker, a slow command on one axis doesn't queue the others
+    return await asyncio.wrap_future(entry.worker.submit(fn, *args))
+
+def connect_axis(axis_id: str, serial_number: str, axis: int, profile: str):
+    entry = group.add(axis_id, serial_number, axis, profile)
+    group.start()
+    return {**entry.describe(), "report": entry.motor.connect_report()}
+
+@app.get("/axes")
+async def list_axes():
+    return [entry.describe() for entry in group.axes.values()]
+
+@app.get("/axes/stats")
+async def axes_stats():
+    """Group sampling loop counters and per-axis samples, stalls and errors."""
+    return group.get_stats()
+
+@app.post("/axes/{axis_id}/connect")
+async def connect_group_axis(axis_id: str, serial_number: str = None, axis: int = 0, profile: str = None):
+    """Add axis `axis` of board serial_number to the group under axis_id and start sampling it."""
+    try:
+        return await asyncio.to_thread(connect_axis, axis_id, serial_number, axis, profile)
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=f"Error connecting axis {axis_id}: {e}")
+
+@app.delete("/axes/{axis_id}")
+async def remove_group_axis(axis_id: str):
+    require_axis(axis_id)
+    await asyncio.to_thread(group.remove, axis_id)
+    return {"status": "success"}
+
+@app.get("/axes/{axis_id}/values")
+async def get_axis_values(axis_id: str):
+    """Latest sampled telemetry of one axis, no bus access."""
+    telemetry = require_axis(axis_id).motor.telemetry
+    if telemetry is None:
+        raise HTTPException(status_code=404, detail=f"No telemetry for axis {axis_id} yet")
+    return telemetry.to_dict()
+
+@app.get("/axes/{axis_id}/samples")
+async def get_axis_samples(axis_id: str, since: int = 0, max_samples: int = 5000):
+    return buffer_samples(require_axis(axis_id).buffer, since, max_samples)
+
+@app.post("/axes/{axis_id}/set_position/{position}")
+async def set_axis_position(axis_id: str, position: float):
+    entry = require_axis(axis_id)
+    entry.motor.set_pos(position)
+    return {"status": "success"}
+
+@app.post("/axes/{axis_id}/set_home")
+async def set_axis_home(axis_id: str, timeout: float = 5.0):
+    entry = require_axis(axis_id)
+    try:
+        await run_axis(entry, entry.motor.set_home, timeout)
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=f"Error setting home on {axis_id}: {e}")
+    return {"status": "success", "position": entry.motor.telemetry.position if entry.motor.telemetry else None}
+
+@app.post("/axes/{axis_id}/release")
+async def release_axis(axis_id: str):
+    require_axis(axis_id).motor.release_torque()
+    return {"status": "success"}
+
+@app.post("/axes/{axis_id}/calibrate")
+async def calibrate_axis(axis_id: str, force: bool = False):
+    entry = require_axis(axis_id)
+    try:
+        return await run_axis(entry, entry.motor.calibrate, force)
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=f"Error calibrating {axis_id}: {e}")
+
+@app.post("/axes/broadcast")
+async def broadcast_positions(positions: dict[str, float]):
+    """Write {axis_id: position deg} to all listed axes together, returns the write time spread."""
+    for axis_id in positions:
+        require_axis(axis_id)
+    return await asyncio.to_thread(group.broadcast, positions)
     
 if __name__ == "__main__":
     uvicorn.run(app, host="0.0.0.0", port=8000)
\ No newline at end of file
@@ -1,26 +1,34 @@
 import tkinter as tk
+from tkinter import filedialog
 import time
+import json
 import threading
-import csv
 import datetime
+import numpy as np
 
 from matplotlib.figure import Figure 
 from matplotlib.backends.backend_tkagg import (
     FigureCanvasTkAgg,
 ) 
 from motor_controller import MotorController, LoopFlowData
+from step_sequence import load_steps
+from signal_buffer import SignalBuffer
+from live_plot import LivePlot
+from recorder import SessionRecorder
+from time_alignment import StreamAligner, timing_report
+from latency_stats import LatencyHistogram
+from clock_sync import ClockSync
+import metrics
+from sampling_profiler import profiler
 
 import load_cell_reader
 import os
 
-# CSV file with date and time in file name
-csv_name = f"results/captan_drive_test_{datetime.datetime.now().strftime('%Y-%m-%d_%H-%M-%S')}.csv"
+# Recording with date and time in file name, convert with `python recorder.py <file>`
+record_name = f"results/captan_drive_test_{datetime.datetime.now().strftime('%Y-%m-%d_%H-%M-%S')}"
 # Ensure the 'results' folder exists, create it if it doesn't
 os.makedirs('results', exist_ok=True)
-csvfile = open(csv_name, 'w', newline='')
-fieldnames = ['timestamp', 'position', 'torque', 'velocity', 'force']
-writer = csv.DictWriter(csvfile, fieldnames=fieldnames)
-writer.writeheader()
+recorder = SessionRecorder(record_name)
 
 # Initialize the Tkinter root window
 root = tk.Tk()
@@ -29,19 +37,26 @@ root.geometry(None)
 
 SENSOR_COM = 'COM4'
 SERSOR_BR = 115200
+MOTOR_PROFILE = None  # JSON profile file, None uses motor_profile.DEFAULT_PROFILE
 INTERVAL_VALUES_UPDATE = 0.1
-MAX_VALUES = 1000
+MAX_VALUES = 1000         # points drawn per signal
+PLOT_WINDOW_S = 300       # seconds of history shown
+HISTORY_CAPACITY = 200000 # samples kept in memory
+RECORD_RATE_HZ = 100      # common timebase of the recorded rows
+ALIGN_INTERVAL_MS = 100
+# rows are aligned on time.monotonic(), recorded timestamps stay wall clock seconds
+EPOCH_OFFSET = time.time() - time.monotonic()
+METRICS_SUMMARY_S = 60    # s between metric summaries on the console, None disables them
+PROFILE_S = 30            # s sampled by the Profile button
 init_time = 0
 
 motor : MotorController = None
 ser: load_cell_reader.LoadCellreader = None
-thread: threading.Thread = None
-check_values : bool = False
-position_values = []
-velocity_values = []
-torque_values = []
-force_values = []
-timestamps = []
+history = SignalBuffer(['position', 'velocity', 'torque', 'force'], HISTORY_CAPACITY)
+load_cell_buffer = SignalBuffer(['force'], HISTORY_CAPACITY)
+aligner = StreamAligner({'motor': ['position', 'velocity', 'torque'], 'loadcell': ['force']}, RECORD_RATE_HZ)
+record_latency = LatencyHistogram()  # sample time to row handed to the recorder
+align_time = metrics.histogram("app_align_seconds", "Aligning and recording one batch of rows on the Tk main loop")
 
 # Function to start the application
 def set_position(event=None):
@@ -89,26 +104,10 @@ ax_force.grid()
 graph = FigureCanvasTkAgg(fig, master=root) 
 graph.get_tk_widget().pack(side="top",fill='both',expand=True) 
 
-def plot(values, val_y,  ax_to_plot): 
-    ax_to_plot.cla() 
-    ax_to_plot.grid()
-    val_len = len(values)
-    ax_to_plot.plot(range(0, val_len), values)
-
-def clear_values(array: list, percentage: float = 0.8):
-    prev_len = len(array)
-    return array[int(prev_len*percentage): prev_len]
-
-def clear_graphs(event=None):
-    global position_values, velocity_values, torque_values, force_values
-    position_values = clear_values(position_values)
-    velocity_values = clear_values(velocity_values)
-    torque_values = clear_values(torque_values)
-    force_values = clear_values(force_values)
-    plot(position_values, ax)
-    plot(velocity_values, ax_vel)
-    plot(torque_values, ax_torq)
-    plot(force_values, ax_force)
+def clear_graphs(event=None, percentage: float = 0.8):
+    # keep the newest 20% of the history
+    history.drop_oldest(int(len(history) * (1 - percentage)))
+    plotter.redraw()
 
 def reset_to_home(event=None):
     global motor
@@ -123,7 +122,9 @@ def release(event=None):
 def calibrate(event=None):
     global motor
     print("Calibrate motor") 
-    motor.calibrate()
+    report = motor.calibrate()
+    saved = f", {report['saved']:.1f}s saved" if report['saved'] else ""
+    messages_output.config(text=f"Calibration: {report['source']} in {report['time']:.1f}s{saved}")
 
 def calibrate_lc(event=None):
     global ser
@@ -156,53 +157,67 @@ def tare_lc(event=None):
     except:
         messages_output.config(text="Error connecting with Load Cell")
 
-def update_csv_file(data: list[dict]):
-    writer.writerows(data)
+def load_cell_cb(block: load_cell_reader.LoadCellBlock):
+    # reader thread, samples stamped with the device time mapped to time.monotonic()
+    load_cell_buffer.extend(block.times, block.column('calculatedWeight'))
 
-def limit_data_len(data: list):
-    val_len = len(data)
-    if val_len > MAX_VALUES:
-        data = data[-MAX_VALUES:]
-        val_len = MAX_VALUES
-    return data
-
-def load_cell_cb(data: load_cell_reader.LoadCellData):
-
-    global position_values, velocity_values, torque_values, force_values
-
-    ts = datetime.datetime.now().timestamp()
-    timestamps.append(ts)
-    
-    # get values
-    pos = motor.get_position() if motor else 0.0
-    vel = motor.get_velocity() if motor else 0.0
-    torq = motor.get_torque() if motor else 0.0
-    force = data.calculatedWeight if data else 0.0
-
-    # update lists
-    position_values.append(pos)
-    velocity_values.append(vel)
-    torque_values.append(torq)
-    force_values.append(force)
-
-    # limit list
-    position_values = limit_data_len(position_values)
-    velocity_values = limit_data_len(velocity_values)
-    torque_values = limit_data_len(torque_values)
-    force_values = limit_data_len(force_values)
-
-    # update interface
-    position_output.config(text=f"Pos [deg]: {pos:.2f}")
-
-    # save information
-    data = {
-        'timestamp': ts, 
-        'position': pos, 
-        'torque': torq, 
-        'velocity': vel, 
-        'force': force
+def align_and_record():
+    # motor and load cell resampled onto one grid, instead of reading the motor when a force line arrives
+    buffers = {
+        'motor': motor.sampler.buffer if motor and motor.sampler else None,
+        'loadcell': load_cell_buffer if ser else None,
     }
-    update_csv_file([data])
+    with align_time.time():
+        align_rows(buffers)
+    root.after(ALIGN_INTERVAL_MS, align_and_record)
+
+def align_rows(buffers: dict):
+    grid, values = aligner.poll(buffers)
+    if len(grid):
+        pos, vel, torq = values['motor']
+        force = values['loadcell'][0]
+        ts = grid + EPOCH_OFFSET
+        history.extend(ts, np.vstack((pos, vel, torq, force)))
+        position_output.config(text=f"Pos [deg]: {pos[-1]:.2f}")
+        # save information, columns as recorder.CSV_CHANNELS
+        for row in zip(ts, pos, torq, vel, force):
+            recorder.record(row)
+        record_latency.add_many(time.monotonic() - grid)
+
+def print_metrics():
+    summary = metrics.registry.summary()
+    if summary:
+        print(f"Metrics:\n{metrics.format_summary(summary)}")
+    root.after(int(METRICS_SUMMARY_S * 1000), print_metrics)
+
+def toggle_profiler():
+    if profiler.is_running():
+        profiler.stop()
+        return
+    profiler.start(PROFILE_S)
+    profile_button.config(text="Stop Profile")
+    messages_output.config(text=f"Profiling for {PROFILE_S}s")
+    root.after(500, check_profiler)
+
+def check_profiler():
+    if profiler.is_running():
+        root.after(500, check_profiler)
+        return
+    profile_button.config(text="Profile")
+    path = f"{record_name}_profile.txt"
+    with open(path, "w") as f:
+        f.write(profiler.folded())
+    messages_output.config(text=f"Profile saved to {path}, {profiler.samples} samples")
+
+def save_timing_report():
+    stages = dict(ser.latency) if ser else {}
+    if motor and motor.sampler:
+        stages["motor_fetch"] = motor.sampler.fetch_latency
+    stages["record"] = record_latency
+    report = timing_report(ser.clock if ser else ClockSync(), stages, aligner)
+    with open(f"{record_name}_timing.json", "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"Alignment error {report['alignment_error'] * 1000:.2f} ms, timing saved to {record_name}_timing.json")
 
 def connect_lc(event=None):
     global ser
@@ -213,30 +228,12 @@ def connect_lc(event=None):
     try:
         # try to connect serial force sensor
         ser = load_cell_reader.LoadCellreader(SENSOR_COM, SERSOR_BR)  # open serial port
-        ser.start(load_cell_cb)
-        buffer = ser.readBuffer()
-        if buffer:
-            messages_output.config(text=f"Message from cell: {buffer}")
+        ser.start(block_callback=load_cell_cb)
+        messages_output.config(text=f"Message from cell: {ser.mode_reply.text()}")
 
     except:
         messages_output.config(text="Error connecting with Load Cell")
 
-def run_updates():
-    global timestamps
-    while check_values:
-
-        ts_len = len(timestamps)    
-        if ts_len > MAX_VALUES:
-            timestamps = timestamps[-MAX_VALUES:]
-
-        # Update each output with a random float
-        plot(position_values, timestamps, ax)
-        plot(velocity_values, timestamps,ax_vel)
-        plot(torque_values, timestamps, ax_torq)
-        plot(force_values, timestamps, ax_force)
-        graph.draw()
-        time.sleep(INTERVAL_VALUES_UPDATE)  # Update every second
-
 def connect():
 
     global motor, thread, check_values
@@ -245,12 +242,23 @@ def connect():
 
     print("Initializing motor")
 
+    if motor:
+        # reconnect reuses the board's handle, stop the old controller's threads only
+        motor.end(reboot=False)
+
     messages_output.config(text="Waitting for motor to connect")
     motor = MotorController()
     
     messages_output.config(text="Configuring motor")
-    motor.config()
+    motor.config(MOTOR_PROFILE)
     motor.save_and_reboot()
+    calibration = motor.restore_calibration()
+    # telemetry sampler, the motor side of the recorded rows
+    motor.run()
+    report = motor.connect_report()
+    messages_output.config(text=f"Motor connected in {report['total']:.1f}s, "
+                                f"{len(report['config']['changed'])} config values changed, "
+                                f"calibration {calibration or 'required'}")
 
 def run_step_loop():
     global motor
@@ -265,9 +273,25 @@ def run_step_loop():
     steps.append(LoopFlowData(position=500, delay_ms= 1000))
     motor.set_loop_flow(steps)
 
+def load_step_loop():
+    global motor
+    path = filedialog.askopenfilename(filetypes=[("Step files", "*.csv *.json")])
+    if not path:
+        return
+    try:
+        steps = load_steps(path)
+    except Exception as e:
+        messages_output.config(text=f"Error loading steps: {e}")
+        return
+    messages_output.config(text=f"Running {len(steps)} steps from {os.path.basename(path)}")
+    motor.set_loop_flow(steps)
+
 def stop_step_loop():
     global motor
     motor.stop_steps_loop()
+    if motor.sequence:
+        # per step timing log next to the session recording
+        motor.sequence.save_log(f"{record_name}_steps.npy")
 
 # Create labels for the outputs
 input_frame = tk.LabelFrame(root, text='Input and Info', padx=10, pady=10)
@@ -292,6 +316,9 @@ release_button.pack(side="left", padx=10, pady=10)
 release_button = tk.Button(motor_frame, text="Run Steps", command=run_step_loop)
 release_button.pack(side="left", padx=10, pady=10)
 
+release_button = tk.Button(motor_frame, text="Load Steps", command=load_step_loop)
+release_button.pack(side="left", padx=10, pady=10)
+
 release_button = tk.Button(motor_frame, text="Stop Steps", command=stop_step_loop)
 release_button.pack(side="left", padx=10, pady=10)
 
@@ -321,6 +348,9 @@ release_button.pack(side="left", padx=10, pady=10)
 release_button = tk.Button(load_cell_frame, text="Tare", command=tare_lc)
 release_button.pack(side="left", padx=10, pady=10)
 
+profile_button = tk.Button(input_frame, text="Profile", command=toggle_profiler)
+profile_button.pack(side="left", padx=10, pady=10)
+
 # information
 messages_output = tk.Label(root, text="Info: ---")
 messages_output.pack(side="left",pady=5)
@@ -328,16 +358,38 @@ messages_output.pack(side="left",pady=5)
 clear_graph = tk.Button(load_cell_frame, text="Clear Graphs", command=clear_graphs)
 clear_graph.pack(side="left", padx=10, pady=10)
 
-# Start the updates in a separate thread
-check_values = True
-thread = threading.Thread(target=run_updates, daemon=True)
-thread.start()
+plot_output = tk.Label(root, text="Plot: ---")
+plot_output.pack(side="left",pady=5)
+
+# Redraw the plots from the Tk main loop
+plotter = LivePlot(
+    root, graph, history,
+    {'position': ax, 'velocity': ax_vel, 'torque': ax_torq, 'force': ax_force},
+    window_s=PLOT_WINDOW_S,
+    max_points=MAX_VALUES,
+    interval_ms=int(INTERVAL_VALUES_UPDATE * 1000),
+    status_label=plot_output,
+)
+plotter.start()
+root.after(ALIGN_INTERVAL_MS, align_and_record)
+if METRICS_SUMMARY_S:
+    root.after(int(METRICS_SUMMARY_S * 1000), print_metrics)
+
+def on_close():
+    # the widgets are gone once mainloop returns, shut down while they still exist
+    print("Disconnecting motor")
+    messages_output.config(text="Disconnecting motor")
+    try:
+        plotter.stop()
+    finally:
+        recorder.close()
+        print(f"Recording saved to {recorder.paths}: {recorder.stats.to_dict()}")
+        try:
+            save_timing_report()
+        finally:
+            root.destroy()
 
-# Start the Tkinter main loop
-root.mainloop()
+root.protocol("WM_DELETE_WINDOW", on_close)
 
-print("Disconnecting motor")
-messages_output.config(text="Disconnecting motor")
-check_values = False
-thread.join()
-thread = None
\ No newline at end of file
+# Start the Tkinter main loop
+root.mainloop()
\ No newline at end of file
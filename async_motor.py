@@ -0,0 +1,118 @@
+import time
+import asyncio
+
+from odrive.utils import AxisState
+
+class AsyncMotorController:
+    """asyncio facade over a MotorController.
+
+    Device writes run through `run` (asyncio.to_thread by default, the API
+    passes its DeviceWorker), waits are served by the controller's shared
+    StatePoller, so any number of coroutines can wait on state changes
+    without touching the bus themselves. A wait that is cancelled or times out
+    idles the axis before the exception propagates.
+    """
+
+    def __init__(self, motor, run=None) -> None:
+        self.motor = motor
+        self.poller = motor.poller
+        self.run = run or asyncio.to_thread
+        self.loop = None
+        self.telemetry = None
+        self.changed = asyncio.Event()
+        self.poller.add_listener(self._on_change)
+
+    def _on_change(self, telemetry):
+        # poller thread -> event loop
+        if self.loop and not self.loop.is_closed():
+            self.loop.call_soon_threadsafe(self._notify, telemetry)
+
+    def _notify(self, telemetry):
+        self.telemetry = telemetry
+        # wake every waiter, later waits use a fresh event
+        changed, self.changed = self.changed, asyncio.Event()
+        changed.set()
+
+    def close(self):
+        self.poller.remove_listener(self._on_change)
+
+    async def wait_for(self, predicate, timeout: float = None, after: float = None, idle_on_cancel: bool = True):
+        """Wait until predicate(telemetry) holds for a snapshot taken at or after `after`, returns it."""
+        self.loop = asyncio.get_running_loop()
+        after = time.monotonic() if after is None else after
+        self.poller.add_waiter()
+        try:
+            return await asyncio.wait_for(self._wait(predicate, after), timeout)
+        except (asyncio.CancelledError, asyncio.TimeoutError):
+            if idle_on_cancel:
+                self.motor.release_torque()
+            raise
+        finally:
+            self.poller.remove_waiter()
+
+    async def _wait(self, predicate, after: float):
+        while True:
+            changed = self.changed
+            # the poller may have seen the change before we subscribed
+            telemetry = self.poller.telemetry
+            if telemetry is not None and telemetry.timestamp >= after and predicate(telemetry):
+                return telemetry
+            try:
+                await asyncio.wait_for(changed.wait(), self.poller.fast_interval * 4)
+            except asyncio.TimeoutError:
+                pass
+
+    async def wait_for_state(self, state, timeout: float = None, after: float = None, idle_on_cancel: bool = True):
+        states = (state,) if isinstance(state, int) else tuple(state)
+        return await self.wait_for(lambda t: t.axis_state in states, timeout, after, idle_on_cancel)
+
+    async def set_home(self, timeout: float = 5.0):
+        requested = time.monotonic()
+        await self.run(self._request_state, AxisState.CLOSED_LOOP_CONTROL)
+        return await self.wait_for_state(AxisState.CLOSED_LOOP_CONTROL, timeout, after=requested)
+
+    async def release(self):
+        request = self.motor.release_torque()
+        await self.run(request.wait, 1.0)
+        return request
+
+    async def calibrate(self, force: bool = False, timeout: float = 60.0) -> dict:
+        start = time.perf_counter()
+        report = None if force else await self.run(self.motor.reuse_calibration, start)
+        if report:
+            return report
+        requested = await self.run(self.motor.start_full_calibration)
+        try:
+            started = await self.wait_for(lambda t: t.axis_state != AxisState.IDLE, 1.0, requested,
+                                          idle_on_cancel=False)
+        except asyncio.TimeoutError:
+            started = None
+        if started:
+            await self.wait_for_state(AxisState.IDLE, timeout, after=started.timestamp)
+        return await self.run(self.motor.finish_calibration, start)
+
+    def _request_state(self, state):
+        self.motor.axis.requested_state = state
+
+    async def state_changes(self):
+        """Yield the telemetry snapshot of every axis_state/active_errors change."""
+        self.loop = asyncio.get_running_loop()
+        self.poller.add_waiter()
+        try:
+            while True:
+                changed = self.changed
+                await changed.wait()
+                yield self.telemetry
+        finally:
+            self.poller.remove_waiter()
+
+    async def telemetry_stream(self, interval: float = 0.02):
+        """Yield the latest cached snapshot every interval, skipping repeats. Never reads the bus."""
+        self.poller.start()
+        last = None
+        while True:
+            telemetry = self.motor.telemetry
+            if telemetry is not None and telemetry is not last:
+                last = telemetry
+                yield telemetry
+            await asyncio.sleep(interval)
@@ -0,0 +1,86 @@
+import os
+import json
+import time
+
+from motor_profile import profile_hash, read_property, write_property
+
+# next to this module, not the working directory, so every entry point shares one cache
+CALIBRATION_CACHE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "calibration_cache.json")
+
+# Results of FULL_CALIBRATION_SEQUENCE on ODrive 0.6, values before their valid flags
+CALIBRATION_VALUES = [
+    "axis0.config.motor.phase_resistance",
+    "axis0.config.motor.phase_inductance",
+    "axis0.commutation_mapper.config.offset",
+    "axis0.pos_vel_mapper.config.offset",
+]
+CALIBRATION_FLAGS = [
+    "axis0.config.motor.phase_resistance_valid",
+    "axis0.config.motor.phase_inductance_valid",
+    "axis0.commutation_mapper.config.offset_valid",
+    "axis0.pos_vel_mapper.config.offset_valid",
+]
+
+# profile entries that change what the calibration measures
+CALIBRATION_CONFIG_KEYS = ("config.motor.", "calibration_lockin", "encoder")
+
+def calibration_hash(profile: dict) -> str:
+    return profile_hash({key: value for key, value in profile.items()
+                         if any(part in key for part in CALIBRATION_CONFIG_KEYS)})
+
+def _on_axis(path: str, axis: int) -> str:
+    return f"axis{axis}." + path[6:] if axis else path
+
+def read_calibration(odrv, axis: int = 0) -> tuple[dict, bool]:
+    """Calibration values on the device and whether all of them are flagged valid.
+
+    Values are keyed by their axis0 path whatever the axis, so entries are portable.
+    """
+    values = {path: float(read_property(odrv, _on_axis(path, axis))) for path in CALIBRATION_VALUES}
+    valid = all(bool(read_property(odrv, _on_axis(path, axis))) for path in CALIBRATION_FLAGS)
+    return values, valid
+
+def write_calibration(odrv, values: dict, axis: int = 0):
+    """Write cached values and mark them valid so the axis can enter closed loop without calibrating."""
+    for path in CALIBRATION_VALUES:
+        write_property(odrv, _on_axis(path, axis), values[path])
+    for path in CALIBRATION_FLAGS:
+        write_property(odrv, _on_axis(path, axis), True)
+
+def same_calibration(current: dict, cached: dict, rel_tol: float = 1e-3) -> bool:
+    return all(abs(current[path] - cached[path]) <= rel_tol * max(abs(cached[path]), 1e-9)
+               for path in CALIBRATION_VALUES)
+
+class CalibrationCache:
+    """JSON file of calibration results keyed by board serial number and calibration config hash."""
+
+    def __init__(self, path: str = CALIBRATION_CACHE_PATH) -> None:
+        self.path = path
+        self.entries = {}
+        if os.path.exists(path):
+            try:
+                with open(path) as f:
+                    self.entries = json.load(f)
+            except Exception as e:
+                print(f"Ignoring calibration cache {path}: {e}")
+
+    @staticmethod
+    def key(serial_number, profile: dict, axis: int = 0) -> str:
+        return f"{serial_number}-{calibration_hash(profile)}" + (f"-axis{axis}" if axis else "")
+
+    def get(self, key: str) -> dict:
+        return self.entries.get(key)
+
+    def put(self, key: str, values: dict, duration: float):
+        self.entries[key] = {"values": values, "duration": duration, "saved_at": time.time()}
+        self.save()
+
+    def remove(self, key: str):
+        if self.entries.pop(key, None) is not None:
+            self.save()
+
+    def save(self):
+        tmp = self.path + ".tmp"
+        with open(tmp, 'w') as f:
+            json.dump(self.entries, f, indent=4)
+        os.replace(tmp, self.path)
@@ -0,0 +1,117 @@
+import math
+import numpy as np
+from collections import deque
+
+MICROS_WRAP = 1 << 32  # micros() is a 32-bit counter, wraps every 71.6 min
+SYNC_WINDOW = 1.0      # s of device time per minimum delay point
+SYNC_WINDOWS = 120     # points in the offset/drift fit (2 min)
+MAX_DRIFT = 500e-6     # beyond any crystal, a steeper fit means the link delay is growing
+
+class ClockSync:
+    """Maps a device clock (firmware micros()) onto host time.monotonic().
+
+    Every sample gives host_receive - device_time = offset + drift * device_time + delay
+    with delay >= 0. In each SYNC_WINDOW of device time the sample with the
+    smallest difference crossed the link fastest, a least squares line through
+    the last SYNC_WINDOWS of those minima gives offset and drift. Mapped times
+    are on that line: serial buffering and USB polling jitter are removed, the
+    constant minimum link delay is not (one-way timestamps can't see it).
+    error is the rms residual of the minima around the line. When the link is
+    saturated the delay keeps growing and looks like drift, the fit is then
+    clamped to MAX_DRIFT through the lowest point and saturated is set.
+    """
+
+    def __init__(self) -> None:
+        self.resets = 0
+        self.reset()
+
+    def reset(self):
+        self.last_micros = None
+        self.wraps = 0
+        self.window = None  # [index, device, diff] of the window still filling
+        self.points = deque(maxlen=SYNC_WINDOWS)
+        self.offset = None
+        self.drift = 0.0
+        self.error = 0.0
+        self.saturated = False
+        self.samples = 0
+
+    def device_seconds(self, micros) -> np.ndarray:
+        """Unwraps micros() values into seconds since the device booted."""
+        micros = np.asarray(micros).astype(np.int64)
+        previous = micros[0] if self.last_micros is None else self.last_micros
+        steps = np.diff(micros, prepend=previous)
+        wrapped = steps < -(MICROS_WRAP >> 1)
+        if ((steps < 0) & ~wrapped).any():
+            # went back without wrapping: the board rebooted
+            self.resets += 1
+            self.reset()
+            wrapped[:] = False
+        wraps = self.wraps + np.cumsum(wrapped)
+        self.wraps = int(wraps[-1])
+        self.last_micros = int(micros[-1])
+        return (micros + wraps * MICROS_WRAP) / 1e6
+
+    def update(self, device: np.ndarray, host) -> np.ndarray:
+        """Adds samples (device s, host receive s), returns their delay above the fitted line."""
+        diff = host - device
+        index = np.floor(device / SYNC_WINDOW)
+        changed = False
+        # one or two windows per read, so a short loop over them
+        for i in np.flatnonzero(np.r_[True, index[1:] != index[:-1]]):
+            end = i + np.searchsorted(index[i:], index[i], side='right')
+            j = i + int(np.argmin(diff[i:end]))
+            window = self.window
+            if window is not None and index[j] == window[0]:
+                if diff[j] < window[2]:
+                    window[1], window[2] = device[j], diff[j]
+                    changed = True
+            elif window is None or index[j] > window[0]:
+                if window is not None:
+                    self.points.append((window[1], window[2]))
+                self.window = [index[j], device[j], diff[j]]
+                changed = True
+        self.samples += len(device)
+        if changed:
+            self.fit()
+        return np.maximum(diff - self.line(device), 0.0)
+
+    def fit(self):
+        points = list(self.points)
+        if self.window is not None:
+            points.append((self.window[1], self.window[2]))
+        device = np.array([p[0] for p in points])
+        diff = np.array([p[1] for p in points])
+        if len(points) >= 2 and device[-1] - device[0] >= SYNC_WINDOW:
+            # centred on the mean device time so float precision holds over hours
+            mean = device.mean()
+            drift, offset = np.polyfit(device - mean, diff, 1)
+            self.drift = float(drift)
+            self.offset = float(offset - drift * mean)
+            self.saturated = bool(abs(drift) > MAX_DRIFT)
+            if self.saturated:
+                self.drift = float(np.clip(drift, -MAX_DRIFT, MAX_DRIFT))
+                self.offset = float(np.min(diff - self.drift * device))
+            residuals = diff - self.line(device)
+            self.error = float(math.sqrt(np.mean(residuals[:-1] ** 2))) if len(points) > 2 else 0.0
+        else:
+            self.drift = 0.0
+            self.offset = float(diff.min())
+
+    def line(self, device):
+        return self.offset + self.drift * device
+
+    def to_host(self, device):
+        """Host monotonic time (s) of device times (s, unwrapped)."""
+        return device + self.line(device)
+
+    def get_stats(self) -> dict:
+        return {
+            "offset": self.offset,
+            "drift_ppm": self.drift * 1e6,
+            "error": self.error,
+            "saturated": self.saturated,
+            "points": len(self.points),
+            "samples": self.samples,
+            "resets": self.resets,
+        }
@@ -0,0 +1,180 @@
+import time
+import threading
+from enum import IntEnum
+
+import metrics
+
+class RequestKind(IntEnum):
+    # lower value = dispatched first
+    RELEASE = 0     # safety: idle the axis, drops pending setpoints
+    POSITION = 1
+    VELOCITY = 2
+    TORQUE = 3
+
+SAFETY_KINDS = (RequestKind.RELEASE,)
+
+class MotorRequest:
+    torque: float = 0.1     # Nm
+    velocity: float = 30  # deg/s
+    position: float = 0.0   # deg
+
+    def __init__(self, kind: RequestKind = RequestKind.POSITION, position: float = 0.0,
+                 velocity: float = 30, torque: float = 0.1) -> None:
+        self.kind = kind
+        self.position = position
+        self.velocity = velocity
+        self.torque = torque
+        self.created = time.monotonic()
+        self.sent_at = None
+        self.superseded = False
+        self.error = None       # exception raised by the write, the request never reached the drive
+        self.done = threading.Event()
+
+    def wait(self, timeout: float = None) -> bool:
+        """True once the request was written to the drive, False if it was superseded, failed or timed out."""
+        return self.done.wait(timeout) and self.sent_at is not None
+
+class DispatcherStats:
+    def __init__(self) -> None:
+        self.submitted = 0
+        self.sent = 0
+        self.coalesced = 0      # replaced by a newer request of the same kind before being sent
+        self.dropped = 0        # discarded by a safety command
+        self.errors = 0
+        self.last_error = None  # "KIND: message" of the latest failed write
+        self.max_depth = 0
+        self.latency_last = 0.0  # seconds from add_request to written on the wire
+        self.latency_max = 0.0
+        self.latency_sum = 0.0
+
+    def to_dict(self) -> dict:
+        stats = dict(self.__dict__)
+        stats["latency_mean"] = self.latency_sum / self.sent if self.sent else 0.0
+        return stats
+
+class CommandDispatcher:
+    """Single thread writing MotorRequests to the drive.
+
+    Only the newest pending request of each kind is kept (latest wins), so a
+    burst of setpoints from the UI or API results in one write of the last
+    value. Setpoint writes are spaced at least 1 / max_rate_hz apart, safety
+    requests are dispatched first and are not rate limited.
+    """
+
+    def __init__(self, motor, max_rate_hz: float = 500, labels: dict = None) -> None:
+        self.motor = motor
+        self.min_interval = 1 / max_rate_hz
+        self.pending: dict[RequestKind, MotorRequest] = {}
+        self.cond = threading.Condition()
+        self.stats = DispatcherStats()
+        self.write_errors = metrics.counter("odrive_write_errors", "Motor requests whose write raised", labels)
+        self.last_write = 0.0
+        self.running = False
+        self.th = None
+
+    def start(self):
+        with self.cond:
+            if self.running:
+                return
+            self.running = True
+        self.th = threading.Thread(target=self.dispatch_loop, daemon=True)
+        self.th.start()
+
+    def stop(self):
+        with self.cond:
+            self.running = False
+            self.cond.notify()
+        if self.th:
+            self.th.join()
+            self.th = None
+
+    def submit(self, request: MotorRequest) -> MotorRequest:
+        with self.cond:
+            if request.kind in SAFETY_KINDS:
+                # pending setpoints are stale once the axis is released
+                for old in self.pending.values():
+                    self._discard(old)
+                    self.stats.dropped += 1
+                self.pending.clear()
+            else:
+                old = self.pending.get(request.kind)
+                if old:
+                    self._discard(old)
+                    self.stats.coalesced += 1
+            self.pending[request.kind] = request
+            self.stats.submitted += 1
+            self.stats.max_depth = max(self.stats.max_depth, len(self.pending))
+            self.cond.notify()
+        return request
+
+    def discard_pending(self, kinds=(RequestKind.POSITION,)):
+        """Drop pending requests of kinds, before setpoints are written outside the dispatcher."""
+        with self.cond:
+            for kind in kinds:
+                old = self.pending.pop(kind, None)
+                if old:
+                    self._discard(old)
+                    self.stats.dropped += 1
+
+    def depth(self) -> int:
+        return len(self.pending)
+
+    def _discard(self, request: MotorRequest):
+        request.superseded = True
+        request.done.set()
+
+    def _next(self) -> MotorRequest:
+        # called with the condition held, waits for the next request allowed on the wire
+        while self.running:
+            if not self.pending:
+                self.cond.wait()
+                continue
+            kind = min(self.pending)
+            if kind not in SAFETY_KINDS:
+                wait = self.last_write + self.min_interval - time.monotonic()
+                if wait > 0:
+                    # keep coalescing while rate limited, a safety request wakes us up
+                    self.cond.wait(wait)
+                    continue
+            return self.pending.pop(kind)
+        return None
+
+    def dispatch_loop(self):
+        while True:
+            with self.cond:
+                request = self._next()
+            if request is None:
+                return
+            try:
+                self.write(request)
+                request.sent_at = time.monotonic()
+                latency = request.sent_at - request.created
+                stats = self.stats
+                stats.sent += 1
+                stats.latency_last = latency
+                stats.latency_max = max(stats.latency_max, latency)
+                stats.latency_sum += latency
+            except Exception as e:
+                request.error = e
+                self.stats.errors += 1
+                self.stats.last_error = f"{request.kind.name}: {e}"
+                self.write_errors.inc()
+            finally:
+                self.last_write = time.monotonic()
+                request.done.set()
+
+    def write(self, request: MotorRequest):
+        motor = self.motor
+        if request.kind == RequestKind.RELEASE:
+            motor.write_idle()
+        elif request.kind == RequestKind.POSITION:
+            motor.write_pos(request.position)
+        elif request.kind == RequestKind.VELOCITY:
+            motor.write_velocity(request.velocity, request.torque)
+        elif request.kind == RequestKind.TORQUE:
+            motor.write_torque(request.torque)
+
+    def get_stats(self) -> dict:
+        stats = self.stats.to_dict()
+        stats["depth"] = self.depth()
+        return stats
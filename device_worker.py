@@ -0,0 +1,120 @@
+import time
+import queue
+import itertools
+import threading
+from concurrent.futures import Future
+
+class Job:
+    """Long running device operation tracked by id (calibration, connect...)."""
+
+    def __init__(self, job_id: int, name: str, future: Future) -> None:
+        self.id = job_id
+        self.name = name
+        self.future = future
+        self.status = "pending"
+        self.error = None
+        self.result = None
+        self.created = time.time()
+        self.started = None
+        self.finished = None
+
+    def to_dict(self) -> dict:
+        return {
+            "id": self.id,
+            "name": self.name,
+            "status": self.status,
+            "error": self.error,
+            "result": self.result,
+            "created": self.created,
+            "started": self.started,
+            "finished": self.finished,
+        }
+
+class DeviceWorker:
+    """Runs every device command on one thread, in submission order.
+
+    submit() returns a concurrent.futures.Future so async handlers can await it
+    with asyncio.wrap_future() without blocking the event loop. start_job()
+    does the same but also keeps a Job record that can be polled by id.
+    """
+
+    MAX_JOBS = 100
+
+    def __init__(self) -> None:
+        self.commands = queue.Queue()
+        self.jobs: dict[int, Job] = {}
+        self.job_ids = itertools.count(1)
+        self.current = None
+        self.running = False
+        self.th = None
+        self.start()
+
+    def start(self):
+        """Start the thread, again after stop(); commands submitted meanwhile wait in the queue."""
+        if self.th and self.th.is_alive():
+            return
+        self.running = True
+        self.th = threading.Thread(target=self.run, daemon=True)
+        self.th.start()
+
+    def submit(self, fn, *args, **kwargs) -> Future:
+        future = Future()
+        self.commands.put((future, None, fn, args, kwargs))
+        return future
+
+    def start_job(self, name: str, fn, *args, **kwargs) -> Job:
+        future = Future()
+        job = Job(next(self.job_ids), name, future)
+        self.jobs[job.id] = job
+        # forget the oldest finished jobs
+        while len(self.jobs) > self.MAX_JOBS:
+            oldest = next(iter(self.jobs.values()))
+            if oldest.status in ("pending", "running"):
+                break
+            del self.jobs[oldest.id]
+        self.commands.put((future, job, fn, args, kwargs))
+        return job
+
+    def get_job(self, job_id: int) -> Job:
+        return self.jobs.get(job_id)
+
+    def busy(self) -> bool:
+        return self.current is not None or not self.commands.empty()
+
+    def stop(self):
+        self.running = False
+        self.commands.put(None)
+        if self.th:
+            self.th.join()
+            self.th = None
+
+    def run(self):
+        while self.running:
+            command = self.commands.get()
+            if command is None:
+                continue
+            future, job, fn, args, kwargs = command
+            if not future.set_running_or_notify_cancel():
+                if job:
+                    job.status = "cancelled"
+                continue
+            self.current = job.name if job else getattr(fn, "__name__", "command")
+            if job:
+                job.status = "running"
+                job.started = time.time()
+            try:
+                result = fn(*args, **kwargs)
+            except Exception as e:
+                if job:
+                    job.status = "failed"
+                    job.error = str(e)
+                future.set_exception(e)
+            else:
+                if job:
+                    job.status = "done"
+                    job.result = result if isinstance(result, (int, float, str, dict, list, type(None))) else str(result)
+                future.set_result(result)
+            finally:
+                if job:
+                    job.finished = time.time()
+                self.current = None
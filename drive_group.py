@@ -0,0 +1,212 @@
+import math
+import time
+import threading
+from concurrent.futures import ThreadPoolExecutor, wait
+
+from motor_controller import MotorController
+from odrive_connection import normalize_serial
+from device_worker import DeviceWorker
+from signal_buffer import SignalBuffer
+from telemetry_sampler import TELEMETRY_CHANNELS, telemetry_row, sample_time
+
+BROADCAST_TIMEOUT = 0.1  # s for every axis I/O thread to be ready before a synchronized write
+
+class AxisStats:
+    def __init__(self) -> None:
+        self.samples = 0
+        self.stalled = 0        # ticks skipped because the previous read of this axis was still running
+        self.disconnected = 0
+        self.errors = 0
+        self.fetch_time_max = 0.0
+
+    def to_dict(self) -> dict:
+        return dict(self.__dict__)
+
+class DriveAxis:
+    """One axis of the group: its controller, telemetry buffer and I/O threads.
+
+    io runs the telemetry reads and synchronized writes of this axis only, so a
+    slow USB link stalls its own samples and nobody else's. worker runs long
+    commands (connect, calibrate, homing) like the API's DeviceWorker.
+    """
+
+    def __init__(self, axis_id: str, motor: MotorController, capacity: int) -> None:
+        self.id = axis_id
+        self.motor = motor
+        self.buffer = SignalBuffer(TELEMETRY_CHANNELS, capacity)
+        self.io = ThreadPoolExecutor(max_workers=1, thread_name_prefix=f"io-{axis_id}")
+        self.worker = DeviceWorker()
+        self.in_flight = None
+        self.stats = AxisStats()
+
+    def describe(self) -> dict:
+        return {
+            "id": self.id,
+            "serial_number": self.motor.connection.serial_number,
+            "axis": self.motor.axis_index,
+            "connected": self.motor.is_connected(),
+            "samples": self.buffer.seq,
+        }
+
+    def close(self):
+        self.motor.end(reboot=False)
+        self.io.shutdown(wait=False)
+        self.worker.stop()
+
+class DriveGroup:
+    """Several ODrive axes (one or more boards) driven from one process.
+
+    A single sampling loop ticks every axis on the same absolute deadlines and
+    hands each read to that axis's I/O thread, so all buffers share one
+    timebase. broadcast() writes setpoints to several axes released together
+    by a barrier, for rigs where capstans have to move in step.
+    """
+
+    def __init__(self, rate_hz: float = 200, capacity: int = 60000) -> None:
+        self.period = 1 / rate_hz
+        self.capacity = capacity
+        self.axes: dict[str, DriveAxis] = {}
+        self.lock = threading.Lock()
+        self.iterations = 0
+        self.overruns = 0
+        self.skipped = 0
+        self.broadcast_spread_max = 0.0
+        self.running = False
+        self.th = None
+
+    def add(self, axis_id: str, serial_number: str = None, axis: int = 0, profile=None) -> DriveAxis:
+        """Connect, configure and restore the calibration of one axis (blocking)."""
+        motor = MotorController(serial_number=serial_number, axis=axis)
+        motor.config(profile)
+        motor.save_and_reboot()
+        motor.restore_calibration()
+        motor.dispatcher.start()
+        entry = DriveAxis(axis_id, motor, self.capacity)
+        with self.lock:
+            old = self.axes.get(axis_id)
+            self.axes[axis_id] = entry
+        if old:
+            old.close()
+        return entry
+
+    def add_all(self, specs: list[dict]) -> dict:
+        """Connect several axes, specs are add() keyword arguments. Returns errors by axis id.
+
+        Boards are set up in parallel, the axes of one board one after the other
+        since each add() configures and reboots the whole board.
+        """
+        boards = {}
+        for spec in specs:
+            boards.setdefault(normalize_serial(spec.get("serial_number")), []).append(spec)
+        errors = {}
+        with ThreadPoolExecutor(max_workers=max(len(boards), 1)) as pool:
+            for board_errors in pool.map(self._add_board, boards.values()):
+                errors.update(board_errors)
+        return errors
+
+    def _add_board(self, specs: list[dict]) -> dict:
+        errors = {}
+        for spec in specs:
+            try:
+                self.add(**spec)
+            except Exception as e:
+                errors[spec["axis_id"]] = str(e)
+        return errors
+
+    def remove(self, axis_id: str):
+        with self.lock:
+            entry = self.axes.pop(axis_id, None)
+        if entry:
+            entry.close()
+
+    def get(self, axis_id: str) -> DriveAxis:
+        return self.axes.get(axis_id)
+
+    def start(self):
+        if self.th:
+            return
+        self.running = True
+        self.th = threading.Thread(target=self.sample_loop, daemon=True)
+        self.th.start()
+
+    def stop(self):
+        self.running = False
+        if self.th:
+            self.th.join()
+            self.th = None
+        for axis_id in list(self.axes):
+            self.remove(axis_id)
+
+    def _sample(self, entry: DriveAxis, jitter: float):
+        try:
+            t = entry.motor.get_telemetry(max_age=0)
+            entry.buffer.append(sample_time(t), telemetry_row(t, jitter))
+            entry.stats.samples += 1
+            entry.stats.fetch_time_max = max(entry.stats.fetch_time_max, t.fetch_time)
+        except Exception as e:
+            entry.stats.errors += 1
+            print(f"Exception sampling {entry.id}: {e}")
+
+    def sample_loop(self):
+        deadline = time.monotonic()
+        while self.running:
+            jitter = time.monotonic() - deadline
+            for entry in list(self.axes.values()):
+                if not entry.motor.is_connected():
+                    entry.stats.disconnected += 1
+                elif entry.in_flight and not entry.in_flight.done():
+                    entry.stats.stalled += 1
+                else:
+                    entry.in_flight = entry.io.submit(self._sample, entry, jitter)
+            self.iterations += 1
+
+            deadline += self.period
+            now = time.monotonic()
+            if now > deadline:
+                self.overruns += 1
+                missed = math.ceil((now - deadline) / self.period)
+                self.skipped += missed
+                deadline += missed * self.period
+            time.sleep(max(deadline - time.monotonic(), 0))
+
+    def broadcast(self, positions: dict[str, float]) -> dict:
+        """Write position setpoints (deg) to several axes at once.
+
+        Every axis's I/O thread waits on a common barrier and then writes,
+        so the writes leave together instead of one after the other. Pending
+        position requests of those axes are dropped first so they cannot
+        overwrite the broadcast afterwards.
+        """
+        entries = [(self.axes[axis_id], position) for axis_id, position in positions.items()]
+        barrier = threading.Barrier(len(entries))
+
+        def write(entry: DriveAxis, position: float) -> float:
+            try:
+                barrier.wait(BROADCAST_TIMEOUT)
+            except threading.BrokenBarrierError:
+                pass  # some axis is busy, write anyway rather than hold the others
+            entry.motor.write_pos(position)
+            return time.monotonic()
+
+        for entry, _ in entries:
+            entry.motor.dispatcher.discard_pending()
+        futures = {entry.id: entry.io.submit(write, entry, position) for entry, position in entries}
+        wait(futures.values())
+        sent = {axis_id: future.result() for axis_id, future in futures.items()}
+        spread = max(sent.values()) - min(sent.values()) if sent else 0.0
+        self.broadcast_spread_max = max(self.broadcast_spread_max, spread)
+        return {"sent": sent, "spread": spread}
+
+    def latest(self) -> dict:
+        """Latest cached telemetry of every axis, no bus access."""
+        return {axis_id: entry.motor.telemetry for axis_id, entry in self.axes.items()}
+
+    def get_stats(self) -> dict:
+        return {
+            "rate_hz": 1 / self.period,
+            "iterations": self.iterations,
+            "overruns": self.overruns,
+            "skipped": self.skipped,
+            "broadcast_spread_max": self.broadcast_spread_max,
+            "axes": {axis_id: entry.stats.to_dict() for axis_id, entry in self.axes.items()},
+        }
@@ -0,0 +1,61 @@
+import bisect
+import numpy as np
+
+# bucket upper bounds in s, roughly 1-2-5 from 50 us to 5 s, plus an overflow bucket
+LATENCY_BUCKETS = (50e-6, 100e-6, 200e-6, 500e-6, 1e-3, 2e-3, 5e-3, 10e-3, 20e-3, 50e-3,
+                   0.1, 0.2, 0.5, 1.0, 2.0, 5.0)
+
+class LatencyHistogram:
+    """Fixed bucket histogram of durations (s), cheap enough for every sample.
+
+    Quantiles are the upper bound of the bucket they fall in, so they are
+    upper estimates with the resolution of LATENCY_BUCKETS.
+    """
+
+    def __init__(self, buckets: tuple = LATENCY_BUCKETS) -> None:
+        self.buckets = tuple(buckets)
+        self.bounds = np.asarray(buckets)
+        self.counts = np.zeros(len(buckets) + 1, dtype=np.int64)
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+
+    def add(self, value: float):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+        if value > self.max:
+            self.max = value
+
+    def add_many(self, values):
+        values = np.asarray(values, dtype=float)
+        if not values.size:
+            return
+        self.counts += np.bincount(np.searchsorted(self.bounds, values), minlength=len(self.counts))
+        self.count += values.size
+        self.sum += float(values.sum())
+        self.max = max(self.max, float(values.max()))
+
+    def quantile(self, q: float) -> float:
+        if not self.count:
+            return 0.0
+        index = int(np.searchsorted(np.cumsum(self.counts), q * self.count))
+        return self.buckets[index] if index < len(self.buckets) else self.max
+
+    def reset(self):
+        self.counts[:] = 0
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+
+    def to_dict(self) -> dict:
+        return {
+            "count": self.count,
+            "mean": self.sum / self.count if self.count else 0.0,
+            "max": self.max,
+            "p50": self.quantile(0.5),
+            "p90": self.quantile(0.9),
+            "p99": self.quantile(0.99),
+            "buckets": list(self.buckets) + ["inf"],
+            "counts": self.counts.tolist(),
+        }
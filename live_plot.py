@@ -0,0 +1,135 @@
+import time
+import numpy as np
+
+from signal_buffer import SignalBuffer
+import metrics
+
+RENDER_TIME = metrics.histogram("plot_render_seconds", "One live plot frame on the Tk main loop")
+FULL_DRAWS = metrics.counter("plot_full_draws", "Frames that redrew the whole figure instead of blitting")
+
+def minmax_decimate(ts: np.ndarray, values: np.ndarray, max_points: int):
+    """Reduce to at most max_points keeping the min and max of each bucket, so peaks stay visible."""
+    n = len(ts)
+    if n <= max_points:
+        return ts, values
+    buckets = max(max_points // 2, 1)
+    starts = np.linspace(0, n, buckets, endpoint=False).astype(np.intp)
+    lows = np.minimum.reduceat(values, starts)
+    highs = np.maximum.reduceat(values, starts)
+    x = np.repeat(ts[starts], 2)
+    y = np.column_stack((lows, highs)).ravel()
+    return x, y
+
+class LivePlot:
+    """Blitted plotting of SignalBuffer channels on a FigureCanvasTkAgg.
+
+    Line artists are created once and only their data is updated. The static
+    parts (axes, grid, labels) are cached as a background and restored on every
+    frame; a full redraw only happens when a y range has to grow or the window
+    is resized. All drawing runs on the Tk main loop through after().
+    """
+
+    def __init__(self, root, canvas, buffer: SignalBuffer, axes: dict, window_s: float = 60,
+                 max_points: int = 1000, interval_ms: int = 100, status_label=None) -> None:
+        # axes maps channel name -> matplotlib Axes
+        self.root = root
+        self.canvas = canvas
+        self.fig = canvas.figure
+        self.buffer = buffer
+        self.window_s = window_s
+        self.max_points = max_points
+        self.interval_ms = interval_ms
+        self.status_label = status_label
+        self.lines = {}
+        for channel, ax in axes.items():
+            line, = ax.plot([], [], animated=True)
+            ax.set_xlim(-window_s, 0)
+            self.lines[channel] = line
+        self.background = None
+        self.refit = False
+        self.running = False
+        self.after_id = None
+        self.frames = 0
+        self.render_time = 0.0
+        self.fps_time = time.monotonic()
+        self.canvas.mpl_connect('draw_event', self._on_draw)
+
+    def _on_draw(self, event=None):
+        # cache everything but the animated lines
+        self.background = self.canvas.copy_from_bbox(self.fig.bbox)
+
+    def start(self):
+        self.running = True
+        self.redraw()
+        self.after_id = self.root.after(self.interval_ms, self._tick)
+
+    def stop(self):
+        self.running = False
+        if self.after_id:
+            self.root.after_cancel(self.after_id)
+            self.after_id = None
+
+    def redraw(self):
+        """Full redraw refitting the y ranges, use after the buffer was cleared."""
+        self.refit = True
+        self.background = None
+        self.render()
+        self.refit = False
+
+    def _tick(self):
+        if not self.running:
+            return
+        start = time.perf_counter()
+        self.render()
+        self.render_time = time.perf_counter() - start
+        RENDER_TIME.observe(self.render_time)
+        self.frames += 1
+        self._update_status()
+        self.after_id = self.root.after(self.interval_ms, self._tick)
+
+    def update_data(self) -> bool:
+        """Push the visible window into the lines, returns True if an axis range changed."""
+        _, ts, values = self.buffer.view()
+        rescale = False
+        if len(ts):
+            # x is seconds relative to the newest sample
+            first = np.searchsorted(ts, ts[-1] - self.window_s)
+            ts = ts[first:] - ts[-1]
+            values = values[:, first:]
+        for channel, line in self.lines.items():
+            x, y = minmax_decimate(ts, values[self.buffer.index[channel]], self.max_points)
+            line.set_data(x, y)
+            if len(y) and self._fit_ylim(line.axes, y.min(), y.max()):
+                rescale = True
+        return rescale
+
+    def _fit_ylim(self, ax, low: float, high: float) -> bool:
+        # ranges only grow between refits, so most frames can be blitted over the cached background
+        margin = max((high - low) * 0.1, 1e-3)
+        if self.refit:
+            ax.set_ylim(low - margin, high + margin)
+            return True
+        bottom, top = ax.get_ylim()
+        if bottom <= low and high <= top:
+            return False
+        ax.set_ylim(min(bottom, low - margin), max(top, high + margin))
+        return True
+
+    def render(self):
+        if self.update_data() or self.background is None:
+            FULL_DRAWS.inc()
+            self.canvas.draw()
+        self.canvas.restore_region(self.background)
+        for line in self.lines.values():
+            line.axes.draw_artist(line)
+        self.canvas.blit(self.fig.bbox)
+
+    def _update_status(self):
+        now = time.monotonic()
+        elapsed = now - self.fps_time
+        if elapsed < 1 or not self.status_label:
+            return
+        fps = self.frames / elapsed
+        self.status_label.config(text=f"Plot: {fps:.1f} fps, {self.render_time * 1000:.1f} ms/frame")
+        self.frames = 0
+        self.fps_time = now
@@ -0,0 +1,170 @@
+import time
+import threading
+from collections import deque
+from concurrent.futures import Future
+
+COMMAND_TIMEOUT = 1.0    # s for replies of commands that don't block the firmware
+TARE_TIMEOUT = 5.0       # performTare() blocks 2.5 s
+CALIBRATE_TIMEOUT = 5.0  # performCalibration() blocks 1.5 s after the weight
+MAX_MESSAGES = 50        # unsolicited text lines kept for readBuffer()
+
+# selectMode() prints these without a newline, the next sample follows on the same line
+MODE_REPLIES = (b'Manual mode selected', b'Automatic mode selected', b'Binary mode selected', b'Unsupported mode')
+TARE_REPLIES = (b'Zero offset set to:',)
+CALIBRATE_REPLIES = (b'Using ',)
+
+class LoadCellCommand(Future):
+    """Command bytes written to the firmware, resolved by the reader thread.
+
+    The result is the reply line (str) or, for sample commands ('g'), the next
+    LoadCellSample. Lines printed before the reply are kept in messages.
+    result() without timeout waits until the command's own deadline.
+    """
+
+    def __init__(self, data: bytes, replies: tuple = (), timeout: float = COMMAND_TIMEOUT,
+                 partial: bool = False, sample: bool = False) -> None:
+        super().__init__()
+        self.data = data
+        self.replies = replies  # the line containing one of these completes the command
+        self.partial = partial  # reply may arrive without newline
+        self.sample = sample    # completed by the next JSON sample instead
+        self.timeout = timeout
+        self.messages = []
+        self.sent_at = None
+        self.deadline = None
+
+    def expects_reply(self) -> bool:
+        return bool(self.replies) or self.sample
+
+    def result(self, timeout: float = None):
+        if timeout is None and self.deadline is not None:
+            timeout = max(self.deadline - time.monotonic(), 0) + 0.05
+        return super().result(timeout)
+
+    def text(self, timeout: float = None) -> str:
+        """Progress lines and reply as one string, like the old read_all() replies."""
+        return "\n".join(self.messages + [str(self.result(timeout))])
+
+class CommandChannel:
+    """Matches firmware replies to the commands written on the same port.
+
+    The firmware answers commands one after the other, so replies are matched
+    in FIFO order against the oldest pending command. Deadlines add up along
+    the queue, a command whose deadline passed fails with TimeoutError so it
+    can't hold back the ones behind it.
+    Text nobody waits for (banner, late replies) is kept in messages.
+    """
+
+    def __init__(self, write) -> None:
+        self.write = write  # write(bytes) on the serial port
+        self.pending: deque[LoadCellCommand] = deque()
+        self.lock = threading.Lock()
+        self.messages = deque(maxlen=MAX_MESSAGES)
+        self.sent = 0
+        self.completed = 0
+        self.timeouts = 0
+        self.unsolicited = 0
+        self.latency_last = 0.0
+        self.latency_max = 0.0
+
+    def send(self, command: LoadCellCommand) -> LoadCellCommand:
+        with self.lock:
+            now = time.monotonic()
+            self._expire(now)
+            command.sent_at = now
+            # the firmware answers in order, so the clock starts when the commands ahead are done
+            ahead = self.pending[-1].deadline if self.pending else now
+            command.deadline = max(ahead, now) + command.timeout
+            # queued before writing, the reader may see the reply before write() returns
+            if command.expects_reply():
+                self.pending.append(command)
+            try:
+                self.write(command.data)
+            except Exception as e:
+                if command.expects_reply():
+                    self.pending.pop()
+                command.set_exception(e)
+                return command
+            self.sent += 1
+            if not command.expects_reply():
+                self._complete(command, None)
+        return command
+
+    def _expire(self, now: float):
+        while self.pending and self.pending[0].deadline < now:
+            command = self.pending.popleft()
+            self.timeouts += 1
+            command.set_exception(TimeoutError(f"No reply from load cell to {command.data!r}"))
+
+    def _complete(self, command: LoadCellCommand, result):
+        latency = time.monotonic() - command.sent_at
+        self.latency_last = latency
+        self.latency_max = max(self.latency_max, latency)
+        self.completed += 1
+        command.set_result(result)
+
+    def _match(self, command: LoadCellCommand, text: bytes) -> int:
+        # position of the reply in text, -1 if it's not there
+        for reply in command.replies:
+            index = text.find(reply)
+            if index >= 0:
+                return index
+        return -1
+
+    def on_line(self, line: bytes):
+        """Text line (not a sample) from the firmware."""
+        with self.lock:
+            self._expire(time.monotonic())
+            command = self.pending[0] if self.pending else None
+            if command and not command.sample:
+                index = self._match(command, line)
+                if index >= 0:
+                    self.pending.popleft()
+                    self._complete(command, line[index:].decode(errors="replace"))
+                else:
+                    command.messages.append(line.decode(errors="replace"))
+                return
+            self.unsolicited += 1
+            self.messages.append(line.decode(errors="replace"))
+
+    def on_partial(self, buffer: bytes) -> int:
+        """Unterminated text, returns how many bytes of it a reply consumed."""
+        with self.lock:
+            command = self.pending[0] if self.pending else None
+            if not command or not command.partial:
+                return 0
+            for reply in command.replies:
+                index = buffer.find(reply)
+                if index >= 0:
+                    self.pending.popleft()
+                    self._complete(command, reply.decode())
+                    return index + len(reply)
+        return 0
+
+    def on_sample(self, sample):
+        with self.lock:
+            self._expire(time.monotonic())
+            if self.pending and self.pending[0].sample:
+                self._complete(self.pending.popleft(), sample)
+
+    def take_messages(self) -> list[str]:
+        with self.lock:
+            messages = list(self.messages)
+            self.messages.clear()
+        return messages
+
+    def close(self):
+        with self.lock:
+            while self.pending:
+                self.pending.popleft().set_exception(Exception("Load cell disconnected"))
+
+    def get_stats(self) -> dict:
+        return {
+            "sent": self.sent,
+            "completed": self.completed,
+            "timeouts": self.timeouts,
+            "unsolicited": self.unsolicited,
+            "pending": len(self.pending),
+            "latency_last": self.latency_last,
+            "latency_max": self.latency_max,
+        }
@@ -0,0 +1,480 @@
+import os
+import pty
+import tty
+import math
+import time
+import random
+import select
+import struct
+import threading
+
+# Pseudo-terminal standing in for the BasculaSimpleC3 board (ESP32-C3 + ADS1230),
+# Linux/macOS only. LoadCellreader opens emulator.port like the real COM port and
+# the emulator answers with the firmware's banner, replies and JSON lines or
+# BinaryFrame records. Faults (dropped samples, garbage bytes, split lines,
+# stalls) are injected on the byte stream to stress the reader.
+
+RATE_HZ = 80             # ADS1230 conversions per second (SPEED pin high)
+BAUD_RATE = 115200       # link limit, bytes/s = baud / 10; 0 writes as fast as the pty takes them
+TX_BUFFER = 4096         # bytes queued on the device before a conversion is missed
+TX_CHUNK = 64            # bytes the link sends at once (one USB CDC packet)
+MAX_CATCH_UP = 0.1       # s of conversions produced after a long gap, older ones are skipped
+ZERO_COUNTS = 7700       # raw reading with no load (OFFSET in the firmware)
+COUNTS_PER_KG = 80000    # raw counts added per kg on the cell
+NOISE = 40.0             # counts rms
+ADC_MIN, ADC_MAX = -0x80000, 0x7FFFF  # 20-bit signed range
+TARE_TIME = 2.5          # s performTare() blocks: delay(2000) + 10 x 50 ms
+CALIBRATION_TIME = 1.5   # s performCalibration() blocks after the weight: delay(1000) + 10 x 50 ms
+MODE_POLL = 0.1          # s selectMode()/performCalibration() sleep while no byte is available
+PARSE_TIMEOUT = 1.0      # s Serial.parseFloat() waits for more digits
+
+BANNER = ["ADS1230 Initialize", "ADS1230 Reader Initialized", "Read One data to clean buffer"]
+NUMERIC = b'-.0123456789'
+
+class Faults:
+    """Injected on the device side, probabilities are per sample sent."""
+
+    def __init__(self, drop: float = 0.0, garbage: float = 0.0, garbage_len: int = 16,
+                 partial: float = 0.0, partial_delay: float = 0.002,
+                 stall: float = 0.0, stall_time: float = 0.2) -> None:
+        self.drop = drop                    # sample lost (binary seq still advances)
+        self.garbage = garbage              # random bytes written before the sample
+        self.garbage_len = garbage_len      # max garbage bytes per injection
+        self.partial = partial              # sample split in two writes
+        self.partial_delay = partial_delay  # s between the two halves
+        self.stall = stall                  # output held, then sent as one burst
+        self.stall_time = stall_time        # s
+
+class EmulatorStats:
+    def __init__(self) -> None:
+        self.conversions = 0
+        self.samples = 0         # JSON lines or frames queued, including 'g' replies
+        self.overruns = 0        # conversions not sent because the TX buffer was full
+        self.skipped = 0         # conversions beyond MAX_CATCH_UP after a gap
+        self.bytes_written = 0
+        self.commands = 0
+        self.dropped = 0
+        self.garbage_bytes = 0
+        self.partial_lines = 0
+        self.stalls = 0
+
+    def to_dict(self) -> dict:
+        return dict(self.__dict__)
+
+def _f32(value: float) -> float:
+    return struct.unpack('<f', struct.pack('<f', value))[0]
+
+def _number(value) -> str:
+    # ArduinoJson: integers as is, floats with 7 significant digits, inf/nan as null
+    if isinstance(value, bool):
+        return "true" if value else "false"
+    if isinstance(value, int):
+        return str(value)
+    if not math.isfinite(value):
+        return "null"
+    return '%.7g' % value
+
+class LoadCellEmulator:
+    """BasculaSimpleC3 firmware behind a pty.
+
+    Follows the sketch closely: modes 'm' 'a' 'b', 't' tare, 'c' calibrate
+    (weight read like Serial.parseFloat), 'r' reset and 'g' get. Commands
+    block the firmware loop for as long as they do on the board, so no
+    samples are sent meanwhile. The JSON document is kept apart from the
+    calibration variables like the sketch's doc (e.g. 'r' leaves it as is).
+
+    Conversions run at rate_hz against the device clock and are paced onto
+    the link at baud_rate / 10 bytes/s. A conversion is missed when more than
+    tx_buffer bytes are still waiting, like Serial.write blocking the loop.
+    baud_rate=0 removes the link limit to push the reader beyond it.
+    """
+
+    def __init__(self, rate_hz: float = RATE_HZ, baud_rate: int = BAUD_RATE, noise: float = NOISE,
+                 tx_buffer: int = TX_BUFFER, faults: Faults = None, seed: int = None,
+                 clock_ppm: float = 0.0, boot_micros: int = 50000) -> None:
+        self.rate_hz = rate_hz
+        # device crystal error and micros() at the first conversion, to exercise clock sync
+        self.clock_rate = 1 + clock_ppm * 1e-6
+        self.boot_micros = boot_micros
+        self.baud_rate = baud_rate
+        self.noise = noise
+        self.tx_buffer = tx_buffer
+        self.faults = faults or Faults()
+        self.random = random.Random(seed)
+        self.load = 0.0  # kg on the cell
+        self.stats = EmulatorStats()
+        self.lock = threading.Lock()
+        self.running = False
+        self.th = None
+
+        self.master, self.slave = pty.openpty()
+        # no echo or newline translation before the reader configures the port
+        tty.setraw(self.slave)
+        os.set_blocking(self.master, False)
+        self.port = os.ttyname(self.slave)
+        self.reset()
+
+    def reset(self):
+        """Power on state of the sketch (globals and setup())."""
+        now = time.monotonic()
+        self.t0 = now
+        self.zero_offset = 0
+        self.calibration_value = 80000
+        self.known_weight = 1.0
+        self.is_calibrated = False
+        self.continuous = False
+        self.binary = False
+        self.frame_seq = 0
+        self.adc = 0
+        self.doc = {
+            "adcValue": 0,
+            "zeroOffset": 0,
+            "offsetCorrected": 0,
+            "isCalibrated": False,
+            "knownWeight": 0,
+            "calibrationValue": 0,
+            "calculatedWeight": 0,
+            "micros": 0,
+        }
+        self.rx = bytearray()
+        self.rx_time = now
+        self.waiting = None        # 'mode' or 'weight' while a command reads its argument
+        self.number = None         # digits of the weight being parsed, None before the first byte
+        self.busy_until = 0.0      # firmware blocked in a delay
+        self.busy_done = None
+        self.out = bytearray()
+        self.split_at = None       # offset in out where a partial line pauses
+        self.hold_until = 0.0
+        self.tx_full = False
+        self.credit = 0.0
+        self.credit_t = now
+        self.next_conversion = 0
+        for line in BANNER:
+            self.println(line)
+        self.println(str(self.read_adc()))
+        self.println("Read One completed")
+
+    def start(self):
+        if self.th:
+            return
+        self.running = True
+        self.th = threading.Thread(target=self.run_loop, daemon=True)
+        self.th.start()
+
+    def stop(self):
+        self.running = False
+        if self.th:
+            self.th.join()
+            self.th = None
+
+    def close(self):
+        self.stop()
+        os.close(self.master)
+        os.close(self.slave)
+
+    def reboot(self):
+        """Like pressing reset: state lost and the banner sent again."""
+        with self.lock:
+            self.reset()
+
+    def set_load(self, kg: float):
+        self.load = kg
+
+    # device output
+
+    def print(self, text: str):
+        self.out += text.encode()
+
+    def println(self, text: str):
+        self.out += text.encode() + b'\r\n'
+
+    def json_line(self) -> bytes:
+        return ('{' + ','.join(f'"{key}":{_number(value)}' for key, value in self.doc.items()) + '}\r\n').encode()
+
+    def binary_frame(self, adc: int, micros: int) -> bytes:
+        body = struct.pack('<HIi', self.frame_seq, micros, adc)
+        self.frame_seq = (self.frame_seq + 1) & 0xFFFF
+        return struct.pack('<H', 0x5AA5) + body + bytes([sum(body) & 0xFF])
+
+    def send_sample(self, record: bytes, now: float):
+        self.stats.samples += 1
+        faults = self.faults
+        r = self.random.random
+        if faults.drop and r() < faults.drop:
+            self.stats.dropped += 1
+            return
+        if faults.garbage and r() < faults.garbage:
+            n = self.random.randint(1, faults.garbage_len)
+            self.out += self.random.randbytes(n)
+            self.stats.garbage_bytes += n
+        if faults.partial and self.split_at is None and r() < faults.partial:
+            self.split_at = len(self.out) + self.random.randint(1, len(record) - 1)
+            self.stats.partial_lines += 1
+        self.out += record
+        if faults.stall and r() < faults.stall:
+            self.hold_until = max(self.hold_until, now + faults.stall_time)
+            self.stats.stalls += 1
+
+    # firmware
+
+    def read_adc(self) -> int:
+        counts = ZERO_COUNTS + self.load * COUNTS_PER_KG + self.random.gauss(0.0, self.noise)
+        return int(min(max(round(counts), ADC_MIN), ADC_MAX))
+
+    def to_weight(self, adc: int) -> float:
+        corrected = adc - self.zero_offset
+        if not self.is_calibrated:
+            return _f32(corrected / 1000.0)
+        span = _f32(self.calibration_value - self.zero_offset)
+        if span == 0:
+            return math.copysign(math.inf, corrected) if corrected else math.nan
+        return _f32(_f32(corrected * self.known_weight) / span)
+
+    def average_adc(self) -> int:
+        return int(sum(self.read_adc() for _ in range(10)) / 10)
+
+    def blocked(self, now: float) -> bool:
+        return self.waiting is not None or now < self.busy_until
+
+    def block(self, seconds: float, done=None):
+        self.busy_until = time.monotonic() + seconds
+        self.busy_done = done
+
+    def handle(self, now: float):
+        """Runs the sketch's loop() command handling on the received bytes."""
+        if self.busy_until:
+            if now < self.busy_until:
+                return
+            self.busy_until = 0.0
+            done, self.busy_done = self.busy_done, None
+            if done:
+                done()
+        while self.rx or self.waiting:
+            if self.busy_until:
+                return
+            if self.waiting:
+                if not self.handle_argument(now):
+                    return
+                continue
+            command = self.rx.pop(0)
+            self.stats.commands += 1
+            if command == ord('t'):
+                self.println("Place no weight on scale and wait...")
+                self.block(TARE_TIME, self.finish_tare)
+            elif command == ord('c'):
+                self.println("Place known weight on scale and enter the weight in kg (e.g. '1.0'):")
+                self.waiting = 'weight'
+                self.number = None
+            elif command == ord('r'):
+                self.zero_offset = 0
+                self.calibration_value = 0
+                self.is_calibrated = False
+            elif command == ord('g'):
+                self.send_sample(self.json_line(), now)
+            elif command == ord('m'):
+                self.waiting = 'mode'
+
+    def handle_argument(self, now: float) -> bool:
+        """Reads the argument of 'm' or 'c', False while the firmware is still waiting for it."""
+        if self.number is None or self.waiting == 'mode':
+            if not self.rx:
+                # while (!Serial.available()) delay(100);
+                self.block(MODE_POLL)
+                return False
+            if self.waiting == 'mode':
+                self.waiting = None
+                self.select_mode(self.rx.pop(0))
+                return True
+            self.number = bytearray()
+        # Serial.parseFloat: skip to the first numeric char, read until a non numeric one or timeout
+        while self.rx and not self.number and self.rx[0] not in NUMERIC:
+            self.rx.pop(0)
+        while self.rx and self.rx[0] in NUMERIC:
+            self.number.append(self.rx.pop(0))
+        if not self.rx and now - self.rx_time < PARSE_TIMEOUT:
+            return False
+        self.waiting = None
+        try:
+            self.known_weight = _f32(float(self.number))
+        except ValueError:
+            self.known_weight = 0.0
+        self.block(CALIBRATION_TIME, self.finish_calibration)
+        return True
+
+    def select_mode(self, mode: int):
+        if mode == ord('m'):
+            self.continuous = False
+            self.binary = False
+            self.print("Manual mode selected")
+        elif mode == ord('a'):
+            self.continuous = True
+            self.binary = False
+            self.print("Automatic mode selected")
+        elif mode == ord('b'):
+            self.continuous = True
+            self.binary = True
+            self.frame_seq = 0
+            self.print("Binary mode selected")
+        else:
+            self.print("Unsupported mode")
+            self.println(chr(mode))
+
+    def finish_tare(self):
+        self.zero_offset = self.average_adc()
+        self.println(f"Zero offset set to: {self.zero_offset}")
+        self.doc["zeroOffset"] = self.zero_offset
+
+    def finish_calibration(self):
+        self.calibration_value = self.average_adc()
+        self.is_calibrated = True
+        self.doc["offsetCorrected"] = 0
+        self.doc["isCalibrated"] = True
+        self.doc["knownWeight"] = self.known_weight
+        self.doc["calibrationValue"] = self.calibration_value
+        self.println(f"Using {self.known_weight:.2f} kg as calibration weight")
+
+    def convert(self, now: float):
+        """Conversions due since the last call (checkDataReady)."""
+        due = int((now - self.t0) * self.rate_hz) + 1
+        n = due - self.next_conversion
+        if n <= 0:
+            return
+        if self.blocked(now):
+            # the loop is stuck in a command, DRDY pulses go unnoticed
+            self.next_conversion = due
+            return
+        limit = max(int(MAX_CATCH_UP * self.rate_hz), 1)
+        if n > limit:
+            self.stats.skipped += n - limit
+            self.next_conversion += n - limit
+        self.stats.conversions += due - self.next_conversion
+        # only the last value matters when nothing is streamed
+        first = self.next_conversion if self.continuous else due - 1
+        for k in range(first, due):
+            adc = self.read_adc()
+            micros = int(k * 1e6 * self.clock_rate / self.rate_hz + self.boot_micros) & 0xFFFFFFFF
+            self.adc = adc
+            self.doc["adcValue"] = adc
+            self.doc["isCalibrated"] = self.is_calibrated
+            self.doc["calculatedWeight"] = self.to_weight(adc)
+            self.doc["micros"] = micros
+            if not self.continuous:
+                continue
+            if len(self.out) >= self.tx_buffer:
+                self.stats.overruns += 1
+                continue
+            if self.binary:
+                self.send_sample(self.binary_frame(adc, micros), now)
+            else:
+                self.send_sample(self.json_line(), now)
+        self.next_conversion = due
+
+    # link
+
+    def receive(self, now: float):
+        try:
+            data = os.read(self.master, 4096)
+        except (BlockingIOError, OSError):
+            return
+        if data:
+            self.rx += data
+            self.rx_time = now
+
+    def flush(self, now: float):
+        if not self.out or now < self.hold_until:
+            return
+        limit = len(self.out) if self.split_at is None else self.split_at
+        if self.baud_rate:
+            bytes_per_s = self.baud_rate / 10
+            self.credit = min(self.credit + (now - self.credit_t) * bytes_per_s, TX_CHUNK)
+            self.credit_t = now
+            limit = min(limit, int(self.credit))
+        if limit <= 0:
+            return
+        try:
+            written = os.write(self.master, self.out[:limit])
+            self.tx_full = False
+        except BlockingIOError:
+            self.tx_full = True  # reader not keeping up, the pty buffer is full
+            return
+        del self.out[:written]
+        self.stats.bytes_written += written
+        if self.baud_rate:
+            self.credit -= written
+        if self.split_at is not None:
+            self.split_at -= written
+            if self.split_at <= 0:
+                self.split_at = None
+                self.hold_until = now + self.faults.partial_delay
+
+    def wake_time(self, now: float) -> float:
+        wake = self.t0 + self.next_conversion / self.rate_hz
+        if self.busy_until:
+            wake = min(wake, self.busy_until)
+        if self.waiting == 'weight':
+            wake = min(wake, self.rx_time + PARSE_TIMEOUT)
+        if self.out:
+            if now < self.hold_until:
+                wake = min(wake, self.hold_until)
+            elif self.baud_rate:
+                missing = min(len(self.out), TX_CHUNK) - self.credit
+                wake = min(wake, now + max(missing, 1) * 10 / self.baud_rate)
+        return min(wake, now + 0.1)
+
+    def run_loop(self):
+        while self.running:
+            now = time.monotonic()
+            with self.lock:
+                self.receive(now)
+                self.handle(now)
+                self.convert(now)
+                self.flush(now)
+                timeout = max(self.wake_time(now) - time.monotonic(), 0)
+                writable = [self.master] if self.tx_full else []
+            select.select([self.master], writable, [], timeout)
+
+    def get_stats(self) -> dict:
+        stats = self.stats.to_dict()
+        stats.update(port=self.port, pending=len(self.out), mode="binary" if self.binary else
+                     "automatic" if self.continuous else "manual", uptime=time.monotonic() - self.t0)
+        return stats
+
+if __name__ == '__main__':
+    import argparse
+    from load_cell_reader import LoadCellreader
+
+    parser = argparse.ArgumentParser(description="BasculaSimpleC3 emulator, benchmarks LoadCellreader against it")
+    parser.add_argument("--rate", type=float, default=RATE_HZ, help="conversions per second")
+    parser.add_argument("--baud", type=int, default=BAUD_RATE, help="link limit, 0 for none")
+    parser.add_argument("--binary", action="store_true", help="stream BinaryFrame records ('mb')")
+    parser.add_argument("--noise", type=float, default=NOISE, help="adc noise, counts rms")
+    parser.add_argument("--drop", type=float, default=0.0)
+    parser.add_argument("--garbage", type=float, default=0.0)
+    parser.add_argument("--partial", type=float, default=0.0)
+    parser.add_argument("--stall", type=float, default=0.0)
+    parser.add_argument("--seconds", type=float, default=5.0)
+    parser.add_argument("--serve", action="store_true", help="only print the port and run until Enter")
+    args = parser.parse_args()
+
+    emulator = LoadCellEmulator(args.rate, args.baud, args.noise,
+                                faults=Faults(drop=args.drop, garbage=args.garbage, partial=args.partial, stall=args.stall))
+    emulator.set_load(0.5)
+    emulator.start()
+    print(f"Load cell emulator on {emulator.port}")
+    if args.serve:
+        input()
+    else:
+        samples = 0
+
+        def count(block):
+            global samples
+            samples += block.count
+
+        reader = LoadCellreader(emulator.port, 115200)
+        reader.start(block_callback=count, binary=args.binary)
+        time.sleep(args.seconds)
+        print("reader", reader.get_stats())
+        print("emulator", emulator.get_stats())
+        print(f"samples decoded {samples}, {samples / args.seconds:.0f}/s")
+        reader.disconnect()
+    emulator.close()
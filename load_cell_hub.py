@@ -0,0 +1,234 @@
+import os
+import time
+import selectors
+import threading
+import numpy as np
+
+from load_cell_reader import LoadCellreader, LoadCellBlock
+from signal_buffer import SignalBuffer
+
+HUB_CHANNELS = ['force', 'adcValue']
+MERGED_CHANNELS = ['sensor', 'force', 'adcValue']
+POLL_INTERVAL = 0.002  # s between in_waiting sweeps where ports can't be selected (Windows)
+MERGE_DELAY = 0.05     # s a sample may wait for older samples of other ports before it is merged
+
+class HubPort:
+    """One sensor of the hub: its LoadCellreader (no thread of its own) and sample buffer."""
+
+    def __init__(self, sensor_id: str, index: int, reader: LoadCellreader, capacity: int) -> None:
+        self.sensor_id = sensor_id
+        self.index = index   # numeric id stored in the merged stream
+        self.reader = reader
+        self.buffer = SignalBuffer(HUB_CHANNELS, capacity)
+        self.received = 0.0  # host time of the chunk being processed
+        self.errors = 0      # serial read and decoding errors
+        self.last_time = None  # newest sample time, this port sends nothing older anymore
+
+    def describe(self) -> dict:
+        return {"sensor_id": self.sensor_id, "index": self.index, "port": self.reader.com,
+                "binary": self.reader.binary, "samples": self.buffer.seq}
+
+class LoadCellHub:
+    """Reads any number of load cell serial ports from one thread.
+
+    On POSIX the ports are waited on with a selector, elsewhere the loop sweeps
+    in_waiting every POLL_INTERVAL. Each chunk is stamped with the host
+    monotonic receive time (same clock as the motor telemetry) and decoded by
+    the port's LoadCellreader, which maps the firmware timestamps onto that
+    clock. Samples go to the port's own buffer and, ordered by sample time, to
+    the merged buffer: they are held until every port has sent something newer
+    or MERGE_DELAY has passed. A sample older than what was already merged
+    (a port late by more than MERGE_DELAY) is only kept in its port's buffer.
+    """
+
+    def __init__(self, capacity: int = 100000, block_callback=None) -> None:
+        self.capacity = capacity
+        self.ports: dict[str, HubPort] = {}
+        self.next_index = 0
+        self.merged = SignalBuffer(MERGED_CHANNELS, capacity * 4)
+        self.pending = []          # (times, rows) not merged yet
+        self.merged_until = -np.inf
+        self.merge_late = 0
+        self.block_callback = block_callback  # (sensor_id, received, LoadCellBlock)
+        self.use_selector = os.name != 'nt'
+        self.selector = None
+        self.wake_r = self.wake_w = None
+        self.lock = threading.Lock()
+        self.loop_cpu = 0.0
+        self.running = False
+        self.th = None
+        self._open_selector()
+
+    def _open_selector(self):
+        if not self.use_selector or self.selector:
+            return
+        self.selector = selectors.DefaultSelector()
+        # wakes the selector when ports are added or removed
+        self.wake_r, self.wake_w = os.pipe()
+        os.set_blocking(self.wake_r, False)
+        self.selector.register(self.wake_r, selectors.EVENT_READ, None)
+
+    def _close_selector(self):
+        if not self.selector:
+            return
+        self.selector.close()
+        os.close(self.wake_r)
+        os.close(self.wake_w)
+        self.selector = None
+        self.wake_r = self.wake_w = None
+
+    def add(self, sensor_id: str, port: str, baud_rate: int = 115200, binary: bool = False) -> HubPort:
+        reader = LoadCellreader(port, baud_rate)
+        hub_port = HubPort(sensor_id, self.next_index, reader, self.capacity)
+        reader.start(block_callback=lambda block: self._on_block(hub_port, block), binary=binary, threaded=False)
+        with self.lock:
+            old = self.ports.pop(sensor_id, None)
+            if old:
+                hub_port.index = old.index
+                self._close_port(old)
+            else:
+                self.next_index += 1
+            self.ports[sensor_id] = hub_port
+            if self.use_selector:
+                # reopened after stop()
+                self._open_selector()
+                reader.ser.timeout = 0
+                self.selector.register(reader.ser.fileno(), selectors.EVENT_READ, hub_port)
+        self._wake()
+        self.start()
+        return hub_port
+
+    def remove(self, sensor_id: str):
+        with self.lock:
+            hub_port = self.ports.pop(sensor_id, None)
+            if hub_port:
+                self._close_port(hub_port)
+        self._wake()
+
+    def _close_port(self, hub_port: HubPort):
+        if self.use_selector:
+            try:
+                self.selector.unregister(hub_port.reader.ser.fileno())
+            except (KeyError, ValueError):
+                pass
+        hub_port.reader.disconnect()
+
+    def _wake(self):
+        if self.wake_w is not None:
+            os.write(self.wake_w, b'x')
+
+    def start(self):
+        if self.th:
+            return
+        self.running = True
+        self.th = threading.Thread(target=self.select_loop if self.use_selector else self.poll_loop, daemon=True)
+        self.th.start()
+
+    def stop(self):
+        self.running = False
+        self._wake()
+        if self.th:
+            self.th.join()
+            self.th = None
+        self._merge(flush=True)
+        with self.lock:
+            for hub_port in self.ports.values():
+                self._close_port(hub_port)
+            self.ports.clear()
+            self._close_selector()
+
+    def _read(self, hub_port: HubPort):
+        ser = hub_port.reader.ser
+        try:
+            waiting = ser.in_waiting
+            data = ser.read(waiting) if waiting else b''
+        except Exception as e:
+            hub_port.errors += 1
+            print(f"Exception reading load cell {hub_port.sensor_id} {e}")
+            self.remove(hub_port.sensor_id)
+            return
+        if data:
+            hub_port.received = time.monotonic()
+            try:
+                with hub_port.reader.parse_time.time():
+                    hub_port.reader.feed(data, hub_port.received)
+            except Exception as e:
+                # one bad chunk must not stop reading the other ports
+                hub_port.errors += 1
+                print(f"Exception decoding load cell {hub_port.sensor_id} {e}")
+
+    def select_loop(self):
+        cpu_start = time.thread_time()
+        while self.running:
+            for key, _ in self.selector.select(timeout=MERGE_DELAY if self.pending else 1.0):
+                if key.data is None:
+                    os.read(self.wake_r, 4096)
+                else:
+                    self._read(key.data)
+            self._merge()
+            self.loop_cpu = time.thread_time() - cpu_start
+
+    def poll_loop(self):
+        cpu_start = time.thread_time()
+        while self.running:
+            for hub_port in list(self.ports.values()):
+                self._read(hub_port)
+            self._merge()
+            self.loop_cpu = time.thread_time() - cpu_start
+            time.sleep(POLL_INTERVAL)
+
+    def _on_block(self, hub_port: HubPort, block: LoadCellBlock):
+        n = block.count
+        ts = block.times
+        force = block.column('calculatedWeight')
+        adc = block.column('adcValue')
+        hub_port.buffer.extend(ts, np.vstack((force, adc)))
+        if n:
+            hub_port.last_time = ts[-1]
+            self.pending.append((ts, np.vstack((np.full(n, hub_port.index), force, adc))))
+        if self.block_callback:
+            self.block_callback(hub_port.sensor_id, hub_port.received, block)
+
+    def _merge(self, flush: bool = False):
+        # hub thread only, moves the pending samples older than the watermark to merged in time order
+        if not self.pending:
+            return
+        if flush:
+            watermark = np.inf
+        else:
+            # a port that sent nothing yet holds the merge back by MERGE_DELAY
+            times = [-np.inf if hub_port.last_time is None else hub_port.last_time for hub_port in list(self.ports.values())]
+            watermark = max(min(times, default=-np.inf), time.monotonic() - MERGE_DELAY)
+        ts = np.concatenate([block[0] for block in self.pending])
+        rows = np.hstack([block[1] for block in self.pending])
+        order = np.argsort(ts, kind='stable')
+        ts = ts[order]
+        rows = rows[:, order]
+        ready = np.searchsorted(ts, watermark, side='right')
+        late = np.searchsorted(ts, self.merged_until, side='left')
+        if late:
+            self.merge_late += int(min(late, ready))
+        if ready > late:
+            self.merged.extend(ts[late:ready], rows[:, late:ready])
+            self.merged_until = ts[ready - 1]
+        self.pending = [(ts[ready:], rows[:, ready:])] if ready < len(ts) else []
+
+    def get_current_force(self, sensor_id: str) -> float:
+        """Latest streamed weight of one sensor, None before the first sample."""
+        buffer = self.ports[sensor_id].buffer
+        return buffer.last_value('force') if buffer.seq else None
+
+    def get_stats(self) -> dict:
+        stats = {}
+        for sensor_id, hub_port in list(self.ports.items()):
+            port_stats = hub_port.reader.get_stats()
+            port_stats.update(hub_port.describe(), read_errors=hub_port.errors)
+            stats[sensor_id] = port_stats
+        return {
+            "mode": "selector" if self.use_selector else "poll",
+            "loop_cpu_time": self.loop_cpu,
+            "merged_samples": self.merged.seq,
+            "merge_pending": sum(len(block[0]) for block in self.pending),
+            "merge_late": self.merge_late,
+            "ports": stats,
+        }
@@ -1,153 +1,652 @@
+import re
 import serial
+import struct
 import time
 import json
 import threading
+import numpy as np
 from pydantic import BaseModel
 from typing import Optional
 
+from clock_sync import ClockSync
+from latency_stats import LatencyHistogram
+import metrics
+from load_cell_commands import (LoadCellCommand, CommandChannel, MODE_REPLIES, TARE_REPLIES, CALIBRATE_REPLIES,
+                                TARE_TIMEOUT, CALIBRATE_TIMEOUT)
+
 class LoadCellData(BaseModel):
     adcValue: Optional[int] = 0
     zeroOffset: Optional[int] = 0
     offsetCorrected: Optional[int] = 0
     isCalibrated: Optional[bool] = False
-    knownWeight: Optional[int] = 0
+    knownWeight: Optional[float] = 0.0
     calibrationValue: Optional[int] = 0
     calculatedWeight: Optional[float] = 0.0
+    micros: Optional[int] = 0
+
+# field order of the JSON document built in BasculaSimpleC3 setup()
+SAMPLE_FIELDS = (
+    "adcValue",
+    "zeroOffset",
+    "offsetCorrected",
+    "isCalibrated",
+    "knownWeight",
+    "calibrationValue",
+    "calculatedWeight",
+    "micros",  # device time of the conversion, 0 from firmware without timestamps
+)
+
+_INT = rb'(-?\d+)'
+_NUM = rb'(-?\d+(?:\.\d+)?(?:[eE][-+]?\d+)?)'
+# serializeJson output for the fixed key set, no whitespace
+_FAST_LINE = re.compile(
+    rb'\{"adcValue":' + _INT + rb',"zeroOffset":' + _INT + rb',"offsetCorrected":' + _INT +
+    rb',"isCalibrated":(true|false),"knownWeight":' + _NUM + rb',"calibrationValue":' + _INT +
+    rb',"calculatedWeight":' + _NUM + rb'(?:,"micros":(\d+))?\}'
+)
+
+class LoadCellSample:
+    """Lightweight sample record, same attributes as LoadCellData."""
+
+    __slots__ = SAMPLE_FIELDS
+
+    def __init__(self, adcValue: int = 0, zeroOffset: int = 0, offsetCorrected: int = 0,
+                 isCalibrated: bool = False, knownWeight: float = 0.0, calibrationValue: int = 0,
+                 calculatedWeight: float = 0.0, micros: int = 0) -> None:
+        self.adcValue = adcValue
+        self.zeroOffset = zeroOffset
+        self.offsetCorrected = offsetCorrected
+        self.isCalibrated = isCalibrated
+        self.knownWeight = knownWeight
+        self.calibrationValue = calibrationValue
+        self.calculatedWeight = calculatedWeight
+        self.micros = micros
+
+    @classmethod
+    def from_model(cls, data: LoadCellData) -> "LoadCellSample":
+        return cls(*(getattr(data, name) for name in SAMPLE_FIELDS))
+
+    def to_dict(self) -> dict:
+        return {name: getattr(self, name) for name in SAMPLE_FIELDS}
+
+    def __repr__(self) -> str:
+        return f"LoadCellSample({self.to_dict()})"
+
+def parse_sample(line: str | bytes) -> LoadCellSample:
+    """Decode one firmware line, full json + pydantic validation only when the fast match fails."""
+    if isinstance(line, str):
+        line = line.encode()
+    m = _FAST_LINE.fullmatch(line)
+    if m:
+        adc, zero, corrected, calibrated, known, cal, weight, micros = m.groups(b'0')
+        return LoadCellSample(int(adc), int(zero), int(corrected), calibrated == b'true',
+                              float(known), int(cal), float(weight), int(micros))
+    return LoadCellSample.from_model(LoadCellData(**json.loads(line)))
+
+_BOOL_COL = SAMPLE_FIELDS.index("isCalibrated")
+_NUM_COLS = [i for i in range(len(SAMPLE_FIELDS)) if i != _BOOL_COL]
+_PLACEHOLDER = (b'0', b'0', b'0', b'false', b'0', b'0', b'0', b'0')
+
+def _int(value: float):
+    # null fields are stored as NaN, back to None like LoadCellData has them
+    return int(value) if value == value else None
+
+class LoadCellBlock:
+    """Preallocated column block (one float64 row per field) filled from many lines at once."""
+
+    def __init__(self, capacity: int = 1024) -> None:
+        self.data = np.zeros((len(SAMPLE_FIELDS), capacity))
+        self.count = 0
+        self.errors = 0
+        self.times = np.empty(0)  # host monotonic time of each sample, set by the reader
+
+    @property
+    def capacity(self) -> int:
+        return self.data.shape[1]
+
+    def clear(self):
+        self.count = 0
+        self.errors = 0
+        self.times = np.empty(0)
+
+    def column(self, name: str) -> np.ndarray:
+        return self.data[SAMPLE_FIELDS.index(name), :self.count]
+
+    def sample(self, index: int = -1) -> LoadCellSample:
+        values = self.data[:, :self.count][:, index]
+        return LoadCellSample(_int(values[0]), _int(values[1]), _int(values[2]), bool(values[3]),
+                              float(values[4]), _int(values[5]), float(values[6]), _int(values[7]))
+
+    def _reserve(self, n: int):
+        needed = self.count + n
+        if needed > self.capacity:
+            grown = np.zeros((len(SAMPLE_FIELDS), max(needed, 2 * self.capacity)))
+            grown[:, :self.count] = self.data[:, :self.count]
+            self.data = grown
+
+    def decode_frames(self, frames: np.ndarray, calibration: LoadCellSample) -> int:
+        """Append binary frames, calibration fields are taken from the last JSON sample."""
+        n = len(frames)
+        if not n:
+            return 0
+        self._reserve(n)
+        cols = self.data[:, self.count:self.count + n]
+        adc = frames['adc']
+        cols[0] = adc
+        cols[1] = calibration.zeroOffset
+        cols[2] = adc - calibration.zeroOffset
+        cols[3] = calibration.isCalibrated
+        cols[4] = calibration.knownWeight
+        cols[5] = calibration.calibrationValue
+        cols[6] = adc_to_weight(adc, calibration)
+        cols[7] = frames['micros']
+        self.count += n
+        return n
+
+    def decode_lines(self, lines: list[bytes]) -> int:
+        """Append every decodable line to the block, returns the number of samples added."""
+        rows = []
+        fallback = []
+        for line in lines:
+            m = _FAST_LINE.fullmatch(line)
+            if m:
+                rows.append(m.groups(b'0'))
+                continue
+            try:
+                sample = LoadCellSample.from_model(LoadCellData(**json.loads(line)))
+                # the firmware writes NaN and inf as null
+                values = [np.nan if value is None else float(value) for value in
+                          (getattr(sample, name) for name in SAMPLE_FIELDS)]
+            except Exception as e:
+                self.errors += 1
+                print(f"Exception parsing values {e}:{line}")
+                continue
+            fallback.append((len(rows), values))
+            rows.append(_PLACEHOLDER)
+
+        n = len(rows)
+        if not n:
+            return 0
+        self._reserve(n)
+        start = self.count
+        # let numpy convert the captured digits column-wise instead of per value
+        raw = np.array(rows, dtype='S32')
+        self.data[_NUM_COLS, start:start + n] = raw[:, _NUM_COLS].astype(np.float64).T
+        self.data[_BOOL_COL, start:start + n] = raw[:, _BOOL_COL] == b'true'
+        for row, values in fallback:
+            self.data[:, start + row] = values
+        self.count += n
+        return n
+
+# binary streaming mode ('mb'), see BinaryFrame in BasculaSimpleC3.ino
+FRAME_SYNC = b'\xa5\x5a'
+FRAME_FORMAT = '<HHIiB'
+FRAME_SIZE = struct.calcsize(FRAME_FORMAT)
+FRAME_DTYPE = np.dtype([
+    ('sync', '<u2'),
+    ('seq', '<u2'),
+    ('micros', '<u4'),
+    ('adc', '<i4'),
+    ('checksum', 'u1'),
+])
+
+def adc_to_weight(adc, calibration: LoadCellSample):
+    """Same conversion as convertToWeight() in the firmware, works on scalars and arrays."""
+    corrected = adc - calibration.zeroOffset
+    if not calibration.isCalibrated:
+        return corrected / 1000.0
+    span = calibration.calibrationValue - calibration.zeroOffset
+    return corrected * calibration.knownWeight / span if span else corrected * 0.0
+
+class BinaryFrameDecoder:
+    """Finds, validates and unpacks BinaryFrame records from a raw byte stream."""
+
+    def __init__(self) -> None:
+        self._buf = b''
+        self._text = b''
+        self.last_seq = None
+        self.frames = 0
+        self.dropped = 0
+        self.resyncs = 0
+        self.bad_frames = 0
+
+    def _valid(self, raw: np.ndarray) -> np.ndarray:
+        sync_ok = (raw[:, 0] == FRAME_SYNC[0]) & (raw[:, 1] == FRAME_SYNC[1])
+        checksum = raw[:, 2:FRAME_SIZE - 1].sum(axis=1, dtype=np.uint32) & 0xFF
+        return sync_ok & (checksum == raw[:, FRAME_SIZE - 1])
+
+    def _skip(self, data: bytes):
+        # bytes outside frames, keep them so text replies can still be read
+        self._text = (self._text + data)[-MAX_LINE_LEN:]
+
+    def feed(self, data: bytes) -> np.ndarray:
+        """Returns all complete valid frames in data (plus leftovers from previous calls)."""
+        buf = self._buf + data
+        chunks = []
+        pos = 0
+        while True:
+            start = buf.find(FRAME_SYNC, pos)
+            if start < 0:
+                # a trailing first sync byte may be the start of the next frame
+                keep = len(buf) - 1 if buf.endswith(FRAME_SYNC[:1]) else len(buf)
+                self._skip(buf[pos:keep])
+                pos = keep
+                break
+            if start != pos:
+                self.resyncs += 1
+                self._skip(buf[pos:start])
+                pos = start
+            n = (len(buf) - start) // FRAME_SIZE
+            if not n:
+                break
+            raw = np.frombuffer(buf, np.uint8, count=n * FRAME_SIZE, offset=start).reshape(n, FRAME_SIZE)
+            valid = self._valid(raw)
+            good = n if valid.all() else int(np.argmin(valid))
+            if good:
+                chunks.append(np.frombuffer(buf, FRAME_DTYPE, count=good, offset=start))
+            pos = start + good * FRAME_SIZE
+            if good < n:
+                # corrupted frame or false sync, look for the next sync after it
+                self.bad_frames += 1
+                self._skip(buf[pos:pos + 1])
+                pos += 1
+        self._buf = buf[pos:]
+
+        if not chunks:
+            return np.empty(0, FRAME_DTYPE)
+        frames = np.concatenate(chunks)
+        self._count_drops(frames['seq'])
+        self.frames += len(frames)
+        return frames
+
+    def restart(self):
+        """The firmware numbers frames from 0 again after a mode switch or reconnect."""
+        self.last_seq = None
+
+    def _count_drops(self, seq: np.ndarray):
+        if self.last_seq is not None:
+            seq = np.concatenate(([self.last_seq], seq))
+        gaps = (np.diff(seq.astype(np.int32)) - 1) & 0xFFFF
+        self.dropped += int(gaps.sum())
+        self.last_seq = int(seq[-1])
+
+    def take_lines(self) -> list[bytes]:
+        """Complete text lines seen between frames (mode/command replies)."""
+        lines = self._text.split(b'\n')
+        self._text = lines.pop()
+        return [line.strip() for line in lines if line.strip()]
+
+# longest partial line kept while waiting for a newline, protects against
+# garbage on the link growing the buffer forever
+MAX_LINE_LEN = 4096
+
+def is_text(line: bytes) -> bool:
+    """Printable ASCII, i.e. a firmware message rather than line noise."""
+    return line.isascii() and line.decode().isprintable()
+
+class ReaderStats:
+    """Counters updated by the reader thread, rates are computed on demand."""
+
+    def __init__(self) -> None:
+        self.bytes_read = 0
+        self.lines_read = 0
+        self.reads = 0
+        self.cpu_time = 0.0
+        self.parse_errors = 0
+        self.start_time = time.monotonic()
+        self._last = (self.start_time, 0, 0, 0.0, 0)
+
+    def snapshot(self) -> dict:
+        # rates since the previous snapshot (or since start)
+        now = time.monotonic()
+        last_t, last_bytes, last_lines, last_cpu, last_errors = self._last
+        bytes_read, lines_read, cpu_time, errors = self.bytes_read, self.lines_read, self.cpu_time, self.parse_errors
+        self._last = (now, bytes_read, lines_read, cpu_time, errors)
+        elapsed = max(now - last_t, 1e-9)
+        return {
+            "bytes_per_s": (bytes_read - last_bytes) / elapsed,
+            "lines_per_s": (lines_read - last_lines) / elapsed,
+            "parse_errors_per_s": (errors - last_errors) / elapsed,
+            "cpu_percent": 100 * (cpu_time - last_cpu) / elapsed,
+            "bytes_read": bytes_read,
+            "lines_read": lines_read,
+            "reads": self.reads,
+            "parse_errors": self.parse_errors,
+            "cpu_time": cpu_time,
+            "uptime": now - self.start_time,
+        }
 
 class LoadCellreader:
     def __init__(self, com: str, baud_rate: int) -> None:
+        self.com = com
+        self.baud_rate = baud_rate
         self.ser = serial.Serial(com, baud_rate, timeout=2)
         self.ser_buffer = b''
         self.read_thread = None
         self.running = False
-        self.last_read = LoadCellData()
+        self.last_read = LoadCellSample()
         self.callback = None
-        self._line_buf = ""
+        self.block_callback = None
+        self.block = LoadCellBlock()
+        self._line_buf = b""
+        self.stats = ReaderStats()
+        self.binary = False
+        self.decoder = BinaryFrameDecoder()
+        # calibration fields used to convert raw binary frames to weight
+        self.calibration = LoadCellSample()
+        self.last_read_time = None  # host time of the latest sample, None before the first one
+        self.received = 0.0         # host time of the chunk being processed
+        self.clock = ClockSync()
+        self.last_time = -np.inf
+        self.latency = {"device_to_host": LatencyHistogram(), "parse": LatencyHistogram()}
+        self.mode = None
+        self.mode_reply = None
+        self.commands = CommandChannel(self.write)
+        labels = {"port": com}
+        self.parse_time = metrics.histogram("loadcell_parse_seconds", "Processing of one chunk read from the port", labels)
+        self.parse_errors = metrics.counter("loadcell_parse_errors", "Lines or frames that could not be decoded", labels)
+        self.samples_read = metrics.counter("loadcell_samples", "Samples decoded", labels)
+        self.bytes_read = metrics.counter("loadcell_read_bytes", "Bytes read from the port", labels)
 
-    def parse_message(self, msg: str):
+    def parse_message(self, msg: str | bytes):
         try:
-            self.last_read = LoadCellData(**json.loads(msg))
-            if self.callback:
-                self.callback(self.last_read)
+            self.last_read = parse_sample(msg)
         except Exception as e:
+            self.stats.parse_errors += 1
+            self.parse_errors.inc()
             print(f"Exception parsing values {e}:{msg}")
+            return
+        self.samples_read.inc()
+        self.last_read_time = time.monotonic()
+        if self.callback:
+            self.callback(self.last_read)
+
+    def parse_block(self, lines: list[bytes]):
+        # decode every complete line of one read into the reused column block
+        self.block.clear()
+        self.block.decode_lines(lines)
+        self.stats.parse_errors += self.block.errors
+        self.parse_errors.inc(self.block.errors)
+        self.dispatch_block()
+
+    def parse_frames(self, data: bytes):
+        self.block.clear()
+        bad_frames = self.decoder.bad_frames
+        frames = self.decoder.feed(data)
+        self.parse_errors.inc(self.decoder.bad_frames - bad_frames)
+        for line in self.decoder.take_lines():
+            # JSON replies ('g') between frames refresh the calibration fields
+            brace = line.find(b'{"')
+            if brace > 0 or brace < 0 and is_text(line):
+                self.commands.on_line(line[:brace] if brace > 0 else line)
+            if brace >= 0:
+                try:
+                    sample = parse_sample(line[brace:])
+                except Exception:
+                    continue
+                if None not in (sample.zeroOffset, sample.isCalibrated, sample.knownWeight, sample.calibrationValue):
+                    self.calibration = sample
+                self.commands.on_sample(sample)
+        if self.commands.pending:
+            consumed = self.commands.on_partial(self.decoder._text)
+            self.decoder._text = self.decoder._text[consumed:]
+        self.block.decode_frames(frames, self.calibration)
+        self.dispatch_block()
+
+    def dispatch_block(self):
+        if not self.block.count:
+            return
+        self.samples_read.inc(self.block.count)
+        self.stamp_block()
+        self.last_read = self.block.sample(-1)
+        self.last_read_time = time.monotonic()
+        if self.block_callback:
+            self.block_callback(self.block)
+        if self.callback:
+            for i in range(self.block.count):
+                self.callback(self.block.sample(i))
     
+    def stamp_block(self):
+        """Host time of every sample of the block, from its device timestamp when there is one."""
+        block = self.block
+        micros = block.column('micros')
+        if micros.any():
+            device = self.clock.device_seconds(micros)
+            self.latency["device_to_host"].add_many(self.clock.update(device, self.received))
+            # a sample can't be converted after it was received
+            times = np.minimum(self.clock.to_host(device), self.received)
+        else:
+            times = np.full(block.count, self.received)
+        # keep time increasing when the clock fit moves
+        times = np.maximum.accumulate(np.r_[self.last_time, times])[1:]
+        self.last_time = times[-1]
+        block.times = times
+        self.latency["parse"].add(time.monotonic() - self.received)
+
     def get_data(self):
         return self.last_read
 
+    def read_chunk(self) -> bytes:
+        # block until at least one byte arrives (or the port timeout expires),
+        # then take everything already waiting in the driver in the same call
+        waiting = self.ser.in_waiting
+        data = self.ser.read(waiting if waiting else 1)
+        if data and not waiting:
+            waiting = self.ser.in_waiting
+            if waiting:
+                data += self.ser.read(waiting)
+        return data
+
     def continuously_read(self):
+        cpu_start = time.thread_time()
         while self.running:
-            # read all available bytes, decode to str
-            data = self.ser.read_all().decode('utf-8', errors='ignore')
-            if not data:
-                continue
+            try:
+                data = self.read_chunk()
+            except serial.SerialException as e:
+                if self.running:
+                    print(f"Exception reading load cell {e}")
+                break
+            finally:
+                self.stats.cpu_time = time.thread_time() - cpu_start
+
+            if data:
+                try:
+                    with self.parse_time.time():
+                        self.feed(data, time.monotonic())
+                except Exception as e:
+                    # a bad chunk must not end the thread, the next one is read as usual
+                    self.stats.parse_errors += 1
+                    self.parse_errors.inc()
+                    print(f"Exception processing load cell data {e}")
 
-            # add to leftover buffer
-            self._line_buf += data
+    def feed(self, data: bytes, received: float = None):
+        """Process one chunk read from the port (reader thread or LoadCellHub loop) at host time received."""
+        self.received = time.monotonic() if received is None else received
+        self.stats.reads += 1
+        self.stats.bytes_read += len(data)
+        self.bytes_read.inc(len(data))
+        if self.binary:
+            self.parse_frames(data)
+            return
 
-            # split on newline; all but the last are complete messages
-            lines = self._line_buf.split('\n')
-            self._line_buf = lines.pop()  # last item = incomplete (or empty) remainder
+        # split on newline; all but the last are complete messages
+        lines = (self._line_buf + data).split(b'\n')
+        self._line_buf = lines.pop()  # last item = incomplete (or empty) remainder
+        if len(self._line_buf) > MAX_LINE_LEN:
+            self._line_buf = b""
 
+        lines = [line.strip() for line in lines]
+        lines = [line for line in lines if line]
+        self.stats.lines_read += len(lines)
+        if any(line[0] != 0x7B for line in lines):
+            lines = self.split_text(lines)
+        if self.block_callback:
+            self.parse_block(lines)
+        else:
             for line in lines:
-                line = line.strip()
-                if not line:
-                    continue
                 self.parse_message(line)
+        if self.commands.pending:
+            if lines:
+                self.commands.on_sample(self.last_read)
+            consumed = self.commands.on_partial(self._line_buf)
+            self._line_buf = self._line_buf[consumed:]
+
+    def split_text(self, lines: list[bytes]) -> list[bytes]:
+        """Hands banner and command replies to the command channel, returns the sample lines."""
+        samples = []
+        for line in lines:
+            if line[0] == 0x7B:
+                samples.append(line)
+                continue
+            # mode replies have no newline, the next sample follows on the same line
+            brace = line.find(b'{"')
+            if brace > 0:
+                self.commands.on_line(line[:brace])
+                samples.append(line[brace:])
+            elif is_text(line):
+                self.commands.on_line(line)
+            else:
+                samples.append(line)  # line noise, counted as a parse error
+        return samples
 
-    def start(self, callback = None):
-        self.setAutomaticMode()
-        if not self.read_thread:
+    def get_stats(self) -> dict:
+        stats = self.stats.snapshot()
+        if self.binary:
+            stats.update(
+                frames=self.decoder.frames,
+                frames_dropped=self.decoder.dropped,
+                bad_frames=self.decoder.bad_frames,
+                resyncs=self.decoder.resyncs,
+            )
+        stats["commands"] = self.commands.get_stats()
+        stats["clock"] = self.clock.get_stats()
+        stats["latency"] = {name: histogram.to_dict() for name, histogram in self.latency.items()}
+        return stats
+
+    def start(self, callback = None, block_callback = None, binary: bool = False, threaded: bool = True):
+        """callback gets one LoadCellSample per line, block_callback one LoadCellBlock per read.
+
+        With binary=True the firmware streams BinaryFrame records ('mb') instead of JSON lines.
+        threaded=False leaves reading to the caller, who passes each chunk to feed() (LoadCellHub).
+        The mode switch is not waited for, its reply is mode_reply.
+        """
+        if not self.isConnected():
+            raise Exception("Error Load Cell not connected")
+        self.binary = binary
+        self.decoder = BinaryFrameDecoder()
+        # banner and samples from before the mode switch
+        self.ser.reset_input_buffer()
+        self._line_buf = b""
+        if not self.read_thread and not self.running:
             self.running = True
-            self.read_thread = threading.Thread(target=self.continuously_read)
-            self.read_thread.start()
             self.callback = callback
-    
-    def setAutomaticMode(self):
-        print("Set Mode Load cell") 
+            self.block_callback = block_callback
+            self.stats = ReaderStats()
+            if threaded:
+                self.read_thread = threading.Thread(target=self.continuously_read)
+                self.read_thread.start()
+        self.mode_reply = self.set_mode(b'b' if binary else b'a')
+        if binary:
+            # the JSON reply carries the calibration fields needed to convert raw frames
+            self.get()
 
-        if not self.ser or not self.ser.is_open:
+    def write(self, data: bytes):
+        self.ser.write(data)
+
+    # commands, answered while samples keep streaming; the returned
+    # LoadCellCommand is a future resolved by the reading thread
+
+    def command(self, data: bytes, replies: tuple = (), timeout: float = None, partial: bool = False,
+                sample: bool = False) -> LoadCellCommand:
+        if not self.isConnected():
             raise Exception("Error Load Cell not connected")
+        command = LoadCellCommand(data, replies, partial=partial, sample=sample)
+        if timeout is not None:
+            command.timeout = timeout
+        return self.commands.send(command)
 
-        try:
-            self.ser_buffer = self.ser.read_all()
-            # calibrate
-            self.ser.write(b'ma')
-            time.sleep(0.2)
-            
-            self.ser_buffer = self.ser.read_all()
+    def set_mode(self, mode: bytes) -> LoadCellCommand:
+        """b'm' manual, b'a' JSON streaming, b'b' binary streaming."""
+        self.mode = mode
+        self.decoder.restart()
+        return self.command(b'm' + mode, MODE_REPLIES, partial=True)
 
-        except:
-            raise Exception("Error connecting with Load Cell")
-        
-        return self.ser_buffer.decode()
+    def tare(self) -> LoadCellCommand:
+        command = self.command(b't', TARE_REPLIES, TARE_TIMEOUT)
+        self.refresh_calibration()
+        return command
+
+    def calibrate(self, weight_kg: float = 1.0) -> LoadCellCommand:
+        # the newline ends Serial.parseFloat() at once instead of after its 1 s timeout
+        command = self.command(f'c{weight_kg}\n'.encode(), CALIBRATE_REPLIES, CALIBRATE_TIMEOUT)
+        self.refresh_calibration()
+        return command
+
+    def reset_calibration(self) -> LoadCellCommand:
+        command = self.command(b'r')
+        self.refresh_calibration()
+        return command
+
+    def refresh_calibration(self):
+        # binary frames are converted with the fields of the last JSON reply
+        if self.binary:
+            self.get()
+
+    def get(self) -> LoadCellCommand:
+        """Resolves with the next JSON sample (LoadCellSample)."""
+        return self.command(b'g', sample=True)
+
+    def setAutomaticMode(self):
+        print("Set Mode Load cell")
+        try:
+            return self.set_mode(b'b' if self.binary else b'a').text()
+        except TimeoutError:
+            raise Exception("Error Load Cell not answering")
 
     def isConnected(self):
         return (self.ser != None and self.ser.is_open)
     
     def disconnect(self):
-        self.ser.close()
+        self.running = False
         if self.read_thread:
-            self.running = False
+            try:
+                # wake the reader blocked in read() instead of waiting the timeout
+                self.ser.cancel_read()
+            except Exception:
+                pass
             self.read_thread.join()
             self.read_thread = None
+        self.commands.close()
+        self.ser.close()
     
     def readBuffer(self):
+        if self.running:
+            # the reading thread owns the port, return the text it didn't match to a command
+            return "\n".join(self.commands.take_messages()).encode()
         return self.ser.read_all()
 
     def get_current_force(self):
+        """Latest streamed weight, a 'g' round trip only when nothing is streamed (manual mode)."""
+        if self.mode != b'm' and self.last_read_time is not None:
+            return self.last_read.calculatedWeight
         try:
-            self.ser.write(b'g')
-            time.sleep(0.1)
-            current_values = self.ser.readline()
-            values = current_values.decode()
-            val_map = json.loads(values)
-        
-            print(f"Force data: {val_map}")
-            return val_map["calculatedWeight"]
-        except:
-            return None 
+            return self.get().result().calculatedWeight
+        except Exception:
+            return None
 
     def calibrate_lc(self, weigth_kg: float = 1.0):
         print("Calibrate Load cell") 
-
-        if not self.ser or not self.ser.is_open:
-            raise Exception("Error Load Cell not connected")
-
         try:
-            self.ser_buffer = self.ser.read_all()
-            # calibrate
-            self.ser.write(b'c')
-            time.sleep(0.2)
-            self.ser.write(f'{weigth_kg}'.encode())
-            time.sleep(0.2)
-            
-            self.ser_buffer = self.ser.read_all()
-
-        except:
-            raise Exception("Error connecting with Load Cell")
-        
-        return self.ser_buffer.decode()
+            return self.calibrate(weigth_kg).text()
+        except TimeoutError:
+            raise Exception("Error Load Cell not answering")
 
     def tare_lc(self):
         print("Tare Load cell") 
-
-        if not self.ser or not self.ser.is_open:
-            raise Exception("Error Load Cell not connected")
-
         try:
-            self.ser_buffer = self.ser.read_all()
-
-            #tare
-            self.ser.write(b't')
-            time.sleep(0.2)
-            
-            self.ser_buffer = self.ser.read_all()
-
-        except:
-            raise Exception("Error connecting with Load Cell")
-        
-        return self.ser_buffer.decode()
+            return self.tare().text()
+        except TimeoutError:
+            raise Exception("Error Load Cell not answering")
 
     def connect_lc(self, event=None):
         if self.ser and self.ser.is_open:
@@ -156,13 +655,14 @@ class LoadCellreader:
         try:
             # try to connect serial force sensor
             self.ser = serial.Serial(self.com, self.baud_rate, timeout = 2)  # open serial port
+            self.decoder.restart()
 
             init_message =  self.ser.read_all()
 
         except:
             raise Exception("Error connecting with Load Cell")
         
-        return init_message.decode()
+        return init_message.decode(errors="replace")
     
 
 if __name__ == '__main__':
@@ -1,3 +1,4 @@
+import sys
 import time
 import threading
 
@@ -15,9 +16,11 @@ def check_position():
 if __name__ == "__main__":
 
     motor = MotorController()
-    motor.config()
+    motor.config(sys.argv[1] if len(sys.argv) > 1 else None)
     motor.save_and_reboot()
+    motor.restore_calibration()
     motor.calibrate()
+    print("Connect report:", motor.connect_report())
     # motor.set_home()
     motor.run()
 
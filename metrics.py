@@ -0,0 +1,213 @@
+import os
+import time
+import threading
+
+from latency_stats import LatencyHistogram, LATENCY_BUCKETS
+
+# METRICS=0 turns every update into one flag check
+enabled = os.environ.get("METRICS", "1") != "0"
+
+def set_enabled(value: bool):
+    global enabled
+    enabled = bool(value)
+
+class Counter:
+    """Monotonic count, incremented from any thread (dispatcher, sampler, reader, API)."""
+
+    kind = "counter"
+
+    def __init__(self, name: str, help: str, labels: dict) -> None:
+        self.name = name
+        self.help = help
+        self.labels = labels
+        self.value = 0
+        self.lock = threading.Lock()
+
+    def inc(self, n: int = 1):
+        if enabled:
+            # += on an attribute is a read and a write, another thread can slip in between
+            with self.lock:
+                self.value += n
+
+    def samples(self) -> list:
+        return [(self.name + "_total", self.labels, self.value)]
+
+    def to_dict(self):
+        return self.value
+
+class Gauge(Counter):
+    """Current value, or fn() read at scrape time."""
+
+    kind = "gauge"
+
+    def __init__(self, name: str, help: str, labels: dict, fn=None) -> None:
+        super().__init__(name, help, labels)
+        self.fn = fn
+
+    def set(self, value: float):
+        if enabled:
+            with self.lock:
+                self.value = value
+
+    def read(self):
+        if not self.fn:
+            return self.value
+        try:
+            return self.fn()
+        except Exception:
+            return None  # source went away, exported as NaN
+
+    def samples(self) -> list:
+        return [(self.name, self.labels, self.read())]
+
+    def to_dict(self):
+        return self.read()
+
+class _Timing:
+    __slots__ = ("histogram", "start")
+
+    def __init__(self, histogram: "Histogram") -> None:
+        self.histogram = histogram
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.histogram.observe(time.perf_counter() - self.start)
+        return False
+
+class _NoTiming:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+_NO_TIMING = _NoTiming()
+
+class Histogram:
+    """Fixed bucket histogram of durations (s), a LatencyHistogram behind the enabled switch."""
+
+    kind = "histogram"
+
+    def __init__(self, name: str, help: str, labels: dict, buckets: tuple = LATENCY_BUCKETS) -> None:
+        self.name = name
+        self.help = help
+        self.labels = labels
+        self.histogram = LatencyHistogram(buckets)
+        self.lock = threading.Lock()
+
+    def observe(self, value: float):
+        if enabled:
+            with self.lock:
+                self.histogram.add(value)
+
+    def time(self):
+        """with histogram.time(): ... observes the duration of the block."""
+        return _Timing(self) if enabled else _NO_TIMING
+
+    def samples(self) -> list:
+        h = self.histogram
+        # prometheus buckets are cumulative, the last one is +Inf
+        with self.lock:
+            counts = h.counts.cumsum().tolist()
+            total, count = h.sum, h.count
+        rows = [(self.name + "_bucket", {**self.labels, "le": repr(float(bound))}, count)
+                for bound, count in zip(h.buckets, counts)]
+        rows.append((self.name + "_bucket", {**self.labels, "le": "+Inf"}, counts[-1]))
+        rows.append((self.name + "_sum", self.labels, total))
+        rows.append((self.name + "_count", self.labels, count))
+        return rows
+
+    def to_dict(self) -> dict:
+        h = self.histogram
+        with self.lock:
+            return {"count": h.count, "mean": h.sum / h.count if h.count else 0.0, "max": h.max,
+                    "p50": h.quantile(0.5), "p99": h.quantile(0.99)}
+
+class Registry:
+    """Metrics by name and labels, created once where they are used and updated in the hot paths."""
+
+    def __init__(self) -> None:
+        self.metrics = {}
+        self.lock = threading.Lock()
+
+    def _get(self, cls, name: str, help: str, labels: dict, **kwargs):
+        labels = {key: str(value) for key, value in (labels or {}).items()}
+        key = (name, tuple(sorted(labels.items())))
+        with self.lock:
+            metric = self.metrics.get(key)
+            if metric is None:
+                metric = self.metrics[key] = cls(name, help, labels, **kwargs)
+            elif not isinstance(metric, cls):
+                raise Exception(f"Metric {name} already registered as a {metric.kind}")
+            elif kwargs.get("fn"):
+                # a reconnected device replaces the gauge's source
+                metric.fn = kwargs["fn"]
+        return metric
+
+    def counter(self, name: str, help: str = "", labels: dict = None) -> Counter:
+        return self._get(Counter, name, help, labels)
+
+    def gauge(self, name: str, help: str = "", labels: dict = None, fn=None) -> Gauge:
+        return self._get(Gauge, name, help, labels, fn=fn)
+
+    def histogram(self, name: str, help: str = "", labels: dict = None, buckets: tuple = LATENCY_BUCKETS) -> Histogram:
+        return self._get(Histogram, name, help, labels, buckets=buckets)
+
+    def to_prometheus(self) -> str:
+        """Text exposition format 0.0.4, one HELP/TYPE header per metric name."""
+        with self.lock:
+            metrics = sorted(self.metrics.values(), key=lambda m: m.name)
+        lines = []
+        name = None
+        for metric in metrics:
+            if metric.name != name:
+                name = metric.name
+                lines.append(f"# HELP {name} {metric.help}")
+                lines.append(f"# TYPE {name} {metric.kind}")
+            for sample, labels, value in metric.samples():
+                lines.append(f"{sample}{_labels(labels)} {_number(value)}")
+        return "\n".join(lines) + "\n"
+
+    def summary(self) -> dict:
+        """{name{labels}: value or histogram summary}, skipping metrics that never changed."""
+        with self.lock:
+            metrics = list(self.metrics.values())
+        result = {}
+        for metric in metrics:
+            value = metric.to_dict()
+            if value if not isinstance(value, dict) else value["count"]:
+                result[metric.name + _labels(metric.labels)] = value
+        return result
+
+def _labels(labels: dict) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{key}="{_escape(value)}"' for key, value in labels.items()) + "}"
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+def _number(value) -> str:
+    if value is None:
+        return "NaN"
+    value = float(value)
+    return str(int(value)) if value.is_integer() and abs(value) < 1e15 else repr(value)
+
+def format_summary(summary: dict) -> str:
+    """One line per metric for the console or a Tk label, durations in ms."""
+    lines = []
+    for name, value in sorted(summary.items()):
+        if isinstance(value, dict):
+            lines.append(f"{name}: n={value['count']} mean={value['mean'] * 1000:.2f}ms "
+                         f"p99={value['p99'] * 1000:.2f}ms max={value['max'] * 1000:.2f}ms")
+        else:
+            lines.append(f"{name}: {value:g}")
+    return "\n".join(lines)
+
+registry = Registry()
+counter = registry.counter
+gauge = registry.gauge
+histogram = registry.histogram
@@ -1,26 +1,83 @@
-import math
 import time
-import odrive
 import threading
 
+from telemetry_sampler import TelemetrySampler
+from command_dispatcher import CommandDispatcher, MotorRequest, RequestKind
+from step_sequence import StepSequence, LoopFlowData
+from trajectory import TrajectoryStreamer
+from motor_profile import DEFAULT_PROFILE, ApplyReport, apply_profile, load_profile, for_axis
+from odrive_connection import ODriveConnection, get_connection
+from state_poller import StatePoller
+from calibration_cache import CalibrationCache, read_calibration, write_calibration, same_calibration
+import metrics
 from odrive.utils import dump_errors
-from odrive.utils import MotorType, AxisState, EncoderId, Protocol, InputMode, ControlMode
+from odrive.utils import AxisState, InputMode
 
-class MotorRequest:
-    torque: float = 0.1     # Nm
-    velocity: float = 30  # deg/s
-    position: float = 0.0   # deg
+class MotorTelemetry:
+    """All logged motor state read in one pass and stamped with one monotonic time."""
 
-class LoopFlowData:
-    def __init__(self, delay_ms: int, position: int):
-        self.delay_ms = delay_ms
+    __slots__ = (
+        "timestamp",     # time.monotonic() when the fetch started
+        "fetch_time",    # seconds spent reading the values
+        "position",      # deg
+        "velocity",      # rev/s
+        "torque",        # Nm
+        "iq",            # A
+        "vbus_voltage",  # V
+        "axis_state",
+        "active_errors",
+        "disarm_reason",
+    )
+
+    def __init__(self, timestamp: float = 0.0, fetch_time: float = 0.0, position: float = 0.0,
+                 velocity: float = 0.0, torque: float = 0.0, iq: float = 0.0, vbus_voltage: float = 0.0,
+                 axis_state: int = 0, active_errors: int = 0, disarm_reason: int = 0) -> None:
+        self.timestamp = timestamp
+        self.fetch_time = fetch_time
         self.position = position
+        self.velocity = velocity
+        self.torque = torque
+        self.iq = iq
+        self.vbus_voltage = vbus_voltage
+        self.axis_state = axis_state
+        self.active_errors = active_errors
+        self.disarm_reason = disarm_reason
+
+    def to_dict(self) -> dict:
+        return {name: getattr(self, name) for name in self.__slots__}
 
 class MotorController:
 
-    requests: list[MotorRequest] = []
-    def __init__(self) -> None:
-        self.odrv0 = odrive.find_any()
+    # snapshots younger than this are shared instead of read again from the bus
+    TELEMETRY_MAX_AGE = 0.005
+
+    def __init__(self, connection: ODriveConnection = None, serial_number: str = None, axis: int = 0) -> None:
+        self.axis_index = axis
+        self.control_running = False
+        self.sampler = None
+        self.sequence = None
+        self.streamer = None
+        self.telemetry = None
+        self.telemetry_lock = threading.Lock()
+        self.poller = StatePoller(self)
+        self.profile = DEFAULT_PROFILE
+        self.config_report = None
+        self.calibration_cache = CalibrationCache()
+        self.calibration_status = None  # "device", "cache", "full" or None if not calibrated
+        self.calibration_report = None
+        self.timings = {}
+        # the handle is shared, only the first controller of a board scans USB
+        start = time.perf_counter()
+        self.connection = connection or get_connection(serial_number)
+        self.odrv0 = self.connection.connect()
+        self.timings["discover"] = time.perf_counter() - start
+        self.connection.add_listener(self.on_reconnect)
+        labels = {"serial": self.connection.serial_number, "axis": axis}
+        self.dispatcher = CommandDispatcher(self, labels=labels)
+        self.read_time = metrics.histogram("odrive_telemetry_read_seconds", "One telemetry fetch, 8 property reads over USB", labels)
+        self.read_errors = metrics.counter("odrive_read_errors", "Telemetry fetches that raised", labels)
+        self.cache_hits = metrics.counter("odrive_telemetry_cache_hits", "get_telemetry calls served without a fetch", labels)
+        self.write_time = metrics.histogram("odrive_write_seconds", "Setpoint and state property writes", labels)
         if self.odrv0.reboot_required: 
             try:
                 self.odrv0.erase_configuration()
@@ -30,121 +87,309 @@ class MotorController:
         else:
             print("Connecting to configured motor")
 
-    def run(self):
+    def run(self, rate_hz: float = 200):
+        """Start sampling telemetry at rate_hz (100-1000 Hz) into self.sampler.buffer."""
         self.control_running = True
-        self.request_not_processed = threading.Event()
-        self.th = threading.Thread(target=self.position_control, daemon= True)
-        self.th.start()
-
-    def position_control(self):
-
-        print("position_control START")
-        while self.control_running:
-            print(f"Current pos: {self.get_position()}")
-            time.sleep(1)
+        self.dispatcher.start()
+        self.sampler = TelemetrySampler(self, rate_hz)
+        self.sampler.start()
     
-    def add_request(self, request: MotorRequest):
-        self.requests.append(request)
-        self.request_not_processed.set()
+    def add_request(self, request: MotorRequest) -> MotorRequest:
+        """Queue a request for the dispatcher thread, newer requests of the same kind replace it."""
+        self.dispatcher.start()
+        return self.dispatcher.submit(request)
     
-    def config(self):
-        odrv = self.odrv0
-        odrv.config.dc_bus_overvoltage_trip_level = 40
-        odrv.config.dc_bus_undervoltage_trip_level = 15
-        odrv.config.dc_max_positive_current = 10
-        odrv.config.dc_max_negative_current = -1
-        odrv.config.brake_resistor0.enable = True
-        odrv.config.brake_resistor0.resistance = 2
-        odrv.axis0.config.motor.motor_type = MotorType.HIGH_CURRENT
-        odrv.axis0.config.motor.pole_pairs = 7
-        odrv.axis0.config.motor.torque_constant = 0.02506060606060606
-        odrv.axis0.config.motor.current_soft_max = 40
-        odrv.axis0.config.motor.current_hard_max = 60
-        odrv.axis0.config.motor.calibration_current = 3
-        odrv.axis0.config.motor.resistance_calib_max_voltage = 2
-        odrv.axis0.config.calibration_lockin.current = 3
-        odrv.axis0.motor.motor_thermistor.config.enabled = False
-        odrv.axis0.controller.config.control_mode = ControlMode.POSITION_CONTROL
-        odrv.axis0.controller.config.input_mode = InputMode.TRAP_TRAJ
-        odrv.axis0.controller.config.vel_limit = 5
-        odrv.axis0.controller.config.vel_limit_tolerance = 1.2
-        odrv.axis0.controller.config.vel_ramp_rate = 10
-        odrv.axis0.trap_traj.config.vel_limit = 10  # Max speed (rev/s)
-        odrv.axis0.trap_traj.config.accel_limit = 2
-        odrv.axis0.trap_traj.config.decel_limit = 2  # Max deceleration (rev/s^2)
-        odrv.axis0.config.torque_soft_min = -math.inf
-        odrv.axis0.config.torque_soft_max = math.inf
-        odrv.can.config.protocol = Protocol.NONE
-        odrv.axis0.config.enable_watchdog = False
-        odrv.axis0.config.load_encoder = EncoderId.ONBOARD_ENCODER0
-        odrv.axis0.config.commutation_encoder = EncoderId.ONBOARD_ENCODER0
-        odrv.config.enable_uart_a = False
+    def config(self, profile: dict | str = None) -> ApplyReport:
+        """Apply a profile (dict or JSON file, DEFAULT_PROFILE if None), writing only the values that differ."""
+        if isinstance(profile, str):
+            profile = load_profile(profile)
+        self.profile = profile or DEFAULT_PROFILE
+        report = apply_profile(self.odrv0, for_axis(self.profile, self.axis_index))
+        self.config_report = report
+        self.timings["config"] = report.read_time + report.write_time
+        print(f"Configuration: {len(report.changed)} changed, {report.unchanged} unchanged "
+              f"({report.read_time:.3f}s read, {report.write_time:.3f}s write)")
+        for path, (old, new) in report.changed.items():
+            print(f"  {path}: {old} -> {new}")
+        for path, error in report.errors.items():
+            print(f"  {path}: error {error}")
+        return report
     
-    def save_and_reboot(self):
+    def save_and_reboot(self, force: bool = False) -> bool:
+        """Save and reboot only if config() changed something, returns True if the board rebooted."""
+        if not force and self.config_report and not self.config_report.needs_save:
+            print("Configuration unchanged, skipping save and reboot")
+            self.timings["save_reboot"] = 0.0
+            return False
+        start = time.perf_counter()
         try:
             self.odrv0.save_configuration()
         except:
             print("Saving config and reboot") # Saving configuration makes the device reboot
-        self.odrv0 = odrive.find_any()
+        self.odrv0 = self.connection.reconnect()
+        self.timings["save_reboot"] = time.perf_counter() - start
+        return True
 
-    def set_home(self):
-        self.odrv0.axis0.requested_state = AxisState.CLOSED_LOOP_CONTROL
-        while self.odrv0.axis0.current_state != AxisState.CLOSED_LOOP_CONTROL:
-            time.sleep(0.1)
+    @property
+    def axis(self):
+        return getattr(self.odrv0, f"axis{self.axis_index}")
+
+    def on_reconnect(self, odrv):
+        # new handle after a USB drop or reboot, cached telemetry belongs to the old one
+        self.odrv0 = odrv
+        self.telemetry = None
+
+    def is_connected(self) -> bool:
+        return self.connection.connected.is_set()
+
+    def connect_report(self) -> dict:
+        """How long connecting took and what the configuration step changed."""
+        return {
+            "timings": dict(self.timings),
+            "total": sum(self.timings.values()),
+            "connection": self.connection.get_stats(),
+            "config": self.config_report.to_dict() if self.config_report else None,
+            "calibration": self.calibration_report,
+        }
+
+    def set_home(self, timeout: float = None):
+        """Enter closed loop, raises (with the axis idled) if it is not reached within timeout."""
+        requested = time.monotonic()
+        self.axis.requested_state = AxisState.CLOSED_LOOP_CONTROL
+        if self.poller.wait_for_state(AxisState.CLOSED_LOOP_CONTROL, timeout, after=requested) is None:
+            self.write_idle()
+            raise Exception(f"Closed loop not reached after {timeout}s")
     
     def release_torque(self):
-        self.odrv0.axis0.requested_state = AxisState.IDLE
+        return self.add_request(MotorRequest(RequestKind.RELEASE))
+
+    def write_idle(self):
+        with self.write_time.time():
+            self.axis.requested_state = AxisState.IDLE
 
-    def calibrate(self):
-        self.odrv0.axis0.requested_state = AxisState.FULL_CALIBRATION_SEQUENCE
-        while self.odrv0.axis0.current_state != AxisState.IDLE:
-            time.sleep(0.1)
+    def calibration_key(self) -> str:
+        return CalibrationCache.key(self.odrv0.serial_number, self.profile, self.axis_index)
+
+    def restore_calibration(self) -> str:
+        """Reuse the device's own calibration or the cached one, without moving the motor.
+
+        Called after config()/save_and_reboot(). Sets calibration_status and returns it.
+        """
+        start = time.perf_counter()
+        key = self.calibration_key()
+        entry = self.calibration_cache.get(key)
+        try:
+            values, valid = read_calibration(self.odrv0, self.axis_index)
+        except Exception as e:
+            print(f"Could not read calibration: {e}")
+            values, valid = None, False
+        if valid and (entry or self.config_report and not self.config_report.needs_save):
+            # a valid device calibration wins, it may be newer than the cache (recalibrated
+            # outside this tool); without an entry only if the configuration did not change
+            if not entry or not same_calibration(values, entry["values"]):
+                self.calibration_cache.put(key, values, entry["duration"] if entry else None)
+            status = "device"
+        elif entry and values is not None:
+            # only written when the device has no valid calibration of its own
+            write_calibration(self.odrv0, entry["values"], self.axis_index)
+            status = "cache"
+        else:
+            status = None
+        self.calibration_status = status
+        self.timings["calibration_restore"] = time.perf_counter() - start
+        print(f"Calibration: {status or 'required'}")
+        return status
+
+    def validate_calibration(self, timeout: float = 1.0) -> bool:
+        """Cheap check of restored calibration: closed loop must engage without errors, then idle."""
+        axis = self.axis
+        axis.controller.input_pos = axis.pos_estimate
+        requested = time.monotonic()
+        axis.requested_state = AxisState.CLOSED_LOOP_CONTROL
+        telemetry = self.poller.wait_for(
+            lambda t: t.active_errors or t.axis_state == AxisState.CLOSED_LOOP_CONTROL, timeout, after=requested)
+        axis.requested_state = AxisState.IDLE
+        return telemetry is not None and not telemetry.active_errors and not axis.active_errors
+
+    def reuse_calibration(self, start: float) -> dict:
+        """Report for a validated device/cached calibration, None if the full sequence is needed."""
+        if not self.calibration_status or not self.validate_calibration():
+            if self.calibration_status:
+                print("Calibration validation failed, running full sequence")
+            return None
+        elapsed = time.perf_counter() - start
+        entry = self.calibration_cache.get(self.calibration_key())
+        full_time = entry["duration"] if entry else None
+        self.calibration_report = {
+            "source": self.calibration_status,
+            "time": elapsed,
+            "saved": full_time - elapsed if full_time else None,
+        }
+        print(f"Calibration reused from {self.calibration_status} in {elapsed:.2f}s")
+        return self.calibration_report
+
+    def start_full_calibration(self) -> float:
+        """Request FULL_CALIBRATION_SEQUENCE, returns the monotonic request time."""
+        self.odrv0.clear_errors()
+        requested = time.monotonic()
+        self.axis.requested_state = AxisState.FULL_CALIBRATION_SEQUENCE
+        return requested
+
+    def finish_calibration(self, start: float) -> dict:
+        """Cache the results of a finished full calibration started at perf_counter() start."""
+        key = self.calibration_key()
+        elapsed = time.perf_counter() - start
+        values, valid = read_calibration(self.odrv0, self.axis_index)
+        if valid and not self.axis.active_errors:
+            self.calibration_cache.put(key, values, elapsed)
+            self.calibration_status = "full"
+        else:
+            self.calibration_cache.remove(key)
+            self.calibration_status = None
+            print(f"Calibration failed, procedure result {self.axis.procedure_result}")
+        self.calibration_report = {"source": "full" if self.calibration_status else "failed",
+                                   "time": elapsed, "saved": 0.0}
+        return self.calibration_report
+
+    def calibrate(self, force: bool = False, timeout: float = None) -> dict:
+        """Skip FULL_CALIBRATION_SEQUENCE when the restored calibration validates, unless force."""
+        start = time.perf_counter()
+        report = None if force else self.reuse_calibration(start)
+        if report:
+            return report
+        requested = self.start_full_calibration()
+        # the axis leaves IDLE when the sequence starts and returns to it when done or failed
+        started = self.poller.wait_for(lambda t: t.axis_state != AxisState.IDLE, 1.0, after=requested)
+        if started and self.poller.wait_for_state(AxisState.IDLE, timeout, after=started.timestamp) is None:
+            self.write_idle()
+            raise Exception(f"Calibration not finished after {timeout}s")
+        return self.finish_calibration(start)
 
     def set_pos(self, pos: float, vel: float = 50 , torque: float = 0.3):
-        # self.odrv0.axis0.controller.input_torque = torque
-        # self.odrv0.axis0.controller.input_vel = vel/360
-        self.odrv0.axis0.controller.input_pos = (pos)/360
+        return self.add_request(MotorRequest(RequestKind.POSITION, position=pos, velocity=vel, torque=torque))
     
     def set_velocity(self, vel: float = 0.001 , torque: float = 0.1):
-        self.odrv0.axis0.controller.input_torque = torque
-        self.odrv0.axis0.controller.input_vel = vel/360
+        return self.add_request(MotorRequest(RequestKind.VELOCITY, velocity=vel, torque=torque))
+
+    def set_torque(self, torque: float):
+        return self.add_request(MotorRequest(RequestKind.TORQUE, torque=torque))
+
+    # direct writes, only called from the dispatcher thread
+    def write_pos(self, pos: float):
+        # self.odrv0.axis0.controller.input_torque = torque
+        # self.odrv0.axis0.controller.input_vel = vel/360
+        with self.write_time.time():
+            self.axis.controller.input_pos = (pos)/360
+
+    def write_velocity(self, vel: float, torque: float):
+        with self.write_time.time():
+            self.axis.controller.input_torque = torque
+            self.axis.controller.input_vel = vel/360
+
+    def write_torque(self, torque: float):
+        with self.write_time.time():
+            self.axis.controller.input_torque = torque
     
     def get_position(self):
-        return (self.odrv0.axis0.pos_estimate) * 360
+        return (self.axis.pos_estimate) * 360
     
     def get_velocity(self):
-        return self.odrv0.axis0.vel_estimate
+        return self.axis.vel_estimate
 
     def get_torque(self):
-        return self.odrv0.axis0.motor.torque_estimate
+        return self.axis.motor.torque_estimate
     
+    def read_telemetry(self) -> MotorTelemetry:
+        # resolve the object handles once, each leaf read below is one USB transfer
+        odrv = self.odrv0
+        axis = getattr(odrv, f"axis{self.axis_index}")
+        motor = axis.motor
+        start = time.monotonic()
+        try:
+            telemetry = MotorTelemetry(
+                timestamp=start,
+                position=axis.pos_estimate * 360,
+                velocity=axis.vel_estimate,
+                torque=motor.torque_estimate,
+                iq=motor.foc.Iq_measured,
+                vbus_voltage=odrv.vbus_voltage,
+                axis_state=int(axis.current_state),
+                active_errors=int(axis.active_errors),
+                disarm_reason=int(axis.disarm_reason),
+            )
+        except Exception:
+            self.read_errors.inc()
+            raise
+        telemetry.fetch_time = time.monotonic() - start
+        self.read_time.observe(telemetry.fetch_time)
+        return telemetry
+
+    def get_telemetry(self, max_age: float = None) -> MotorTelemetry:
+        """Latest snapshot, read from the device only if the cached one is older than max_age."""
+        if max_age is None:
+            max_age = self.TELEMETRY_MAX_AGE
+        telemetry = self.telemetry
+        if telemetry and time.monotonic() - telemetry.timestamp <= max_age:
+            self.cache_hits.inc()
+            return telemetry
+        with self.telemetry_lock:
+            # another caller may have refreshed it while we waited for the lock
+            telemetry = self.telemetry
+            if telemetry and time.monotonic() - telemetry.timestamp <= max_age:
+                self.cache_hits.inc()
+                return telemetry
+            self.telemetry = self.read_telemetry()
+            return self.telemetry
+
     def get_voltage(self):
         str(self.odrv0.vbus_voltage)
 
     def check_errors(self):
-        dump_errors(self.odrv0)
+        try:
+            dump_errors(self.odrv0)
+        except Exception as e:
+            print(f"Could not dump errors: {e}")
     
-    def end(self):
+    def end(self, reboot: bool = True):
+        """Stop the threads, reboot=False keeps the board as is for the next controller on this connection."""
         if self.control_running:
             self.control_running = False
-            self.th.join()
+            self.sampler.stop()
+        self.dispatcher.stop()
+        self.poller.stop()
+        self.connection.remove_listener(self.on_reconnect)
         self.odrv0.clear_errors()
-        self.odrv0.reboot()
-        dump_errors(self.odrv0)
-
-    def set_loop_flow(self, steps: list[LoopFlowData]):
-        self.steps = steps
-        self.steps_loop_running = True
-        self.step_th = threading.Thread(target=self.steps_loop_th, daemon= True)
-        self.step_th.start()
-    
-    def steps_loop_th(self):
-        while self.steps_loop_running:
-            for step in self.steps:
-                self.set_pos(step.position)
-                time.sleep(step.delay_ms/1000)
+        if reboot:
+            self.odrv0.reboot()
+        self.check_errors()
+
+    def set_loop_flow(self, steps: list[LoopFlowData], cycles: int = None) -> StepSequence:
+        """Run steps (repeated cycles times, forever if None) on their own thread."""
+        self.stop_steps_loop()
+        self.sequence = StepSequence(self, steps, cycles)
+        self.sequence.start()
+        return self.sequence
     
+    def get_input_mode(self) -> int:
+        return self.axis.controller.config.input_mode
+
+    def set_input_mode(self, mode: InputMode):
+        self.axis.controller.config.input_mode = mode
+
+    def stream_trajectory(self, positions, rate_hz: float, cycles: int = 1) -> TrajectoryStreamer:
+        """Stream a profile from trajectory.py (deg sampled at rate_hz), cycles=None repeats it."""
+        self.stop_trajectory()
+        self.streamer = TrajectoryStreamer(self, positions, rate_hz, cycles)
+        self.streamer.start()
+        return self.streamer
+
+    def stop_trajectory(self):
+        if self.streamer:
+            self.streamer.stop()
+            print(f"Trajectory stopped: {self.streamer.stats.to_dict()}")
+
     def stop_steps_loop(self):
-        self.steps_loop_running = False
-        self.step_th.join()
+        if self.sequence:
+            self.sequence.cancel()
+            print(f"Step loop stopped: {self.sequence.summary()}")
 
@@ -0,0 +1,151 @@
+import sys
+import math
+import json
+import time
+import hashlib
+
+from odrive import utils as odrive_utils
+from odrive.utils import MotorType, EncoderId, Protocol, InputMode, ControlMode
+
+# Property path on the ODrive object -> value, same values MotorController.config() used to write
+DEFAULT_PROFILE = {
+    "config.dc_bus_overvoltage_trip_level": 40,
+    "config.dc_bus_undervoltage_trip_level": 15,
+    "config.dc_max_positive_current": 10,
+    "config.dc_max_negative_current": -1,
+    "config.brake_resistor0.enable": True,
+    "config.brake_resistor0.resistance": 2,
+    "axis0.config.motor.motor_type": MotorType.HIGH_CURRENT,
+    "axis0.config.motor.pole_pairs": 7,
+    "axis0.config.motor.torque_constant": 0.02506060606060606,
+    "axis0.config.motor.current_soft_max": 40,
+    "axis0.config.motor.current_hard_max": 60,
+    "axis0.config.motor.calibration_current": 3,
+    "axis0.config.motor.resistance_calib_max_voltage": 2,
+    "axis0.config.calibration_lockin.current": 3,
+    "axis0.motor.motor_thermistor.config.enabled": False,
+    "axis0.controller.config.control_mode": ControlMode.POSITION_CONTROL,
+    "axis0.controller.config.input_mode": InputMode.TRAP_TRAJ,
+    "axis0.controller.config.vel_limit": 5,
+    "axis0.controller.config.vel_limit_tolerance": 1.2,
+    "axis0.controller.config.vel_ramp_rate": 10,
+    "axis0.trap_traj.config.vel_limit": 10,  # Max speed (rev/s)
+    "axis0.trap_traj.config.accel_limit": 2,
+    "axis0.trap_traj.config.decel_limit": 2,  # Max deceleration (rev/s^2)
+    "axis0.config.torque_soft_min": -math.inf,
+    "axis0.config.torque_soft_max": math.inf,
+    "can.config.protocol": Protocol.NONE,
+    "axis0.config.enable_watchdog": False,
+    "axis0.config.load_encoder": EncoderId.ONBOARD_ENCODER0,
+    "axis0.config.commutation_encoder": EncoderId.ONBOARD_ENCODER0,
+    "config.enable_uart_a": False,
+}
+
+def _parse_value(value):
+    # enums are written as "MotorType.HIGH_CURRENT" in profile files
+    if isinstance(value, str) and '.' in value:
+        enum_name, member = value.split('.', 1)
+        return getattr(getattr(odrive_utils, enum_name), member)
+    return value
+
+def load_profile(path: str) -> dict:
+    """JSON object of property path -> value, Infinity/-Infinity allowed."""
+    with open(path) as f:
+        return {key: _parse_value(value) for key, value in json.load(f).items()}
+
+def save_profile(profile: dict, path: str):
+    def encode(value):
+        if hasattr(value, 'name') and hasattr(value, 'value'):
+            return f"{type(value).__name__}.{value.name}"
+        return value
+    with open(path, 'w') as f:
+        json.dump({key: encode(value) for key, value in profile.items()}, f, indent=4)
+
+def profile_hash(profile: dict) -> str:
+    text = json.dumps({key: float(value) for key, value in sorted(profile.items())})
+    return hashlib.sha1(text.encode()).hexdigest()[:12]
+
+def for_axis(profile: dict, axis: int) -> dict:
+    """Profiles are written for axis0, move the axis entries to another axis of the board."""
+    if axis == 0:
+        return profile
+    return {(f"axis{axis}." + key[6:] if key.startswith("axis0.") else key): value for key, value in profile.items()}
+
+def _resolve(odrv, path: str):
+    parts = path.split('.')
+    obj = odrv
+    for part in parts[:-1]:
+        obj = getattr(obj, part)
+    return obj, parts[-1]
+
+def read_property(odrv, path: str):
+    obj, name = _resolve(odrv, path)
+    return getattr(obj, name)
+
+def write_property(odrv, path: str, value):
+    obj, name = _resolve(odrv, path)
+    setattr(obj, name, value)
+
+def same_value(current, wanted) -> bool:
+    # floats are stored as float32 on the device, compare with a relative tolerance
+    try:
+        current, wanted = float(current), float(wanted)
+    except (TypeError, ValueError):
+        return current == wanted
+    if math.isinf(current) or math.isinf(wanted):
+        return current == wanted
+    return math.isclose(current, wanted, rel_tol=1e-6, abs_tol=1e-6)
+
+class ApplyReport:
+    def __init__(self) -> None:
+        self.changed = {}     # path -> (device value, profile value)
+        self.errors = {}      # path -> error message
+        self.unchanged = 0
+        self.read_time = 0.0
+        self.write_time = 0.0
+
+    @property
+    def needs_save(self) -> bool:
+        return bool(self.changed)
+
+    def to_dict(self) -> dict:
+        return {
+            "changed": {key: [str(old), str(new)] for key, (old, new) in self.changed.items()},
+            "errors": self.errors,
+            "unchanged": self.unchanged,
+            "read_time": self.read_time,
+            "write_time": self.write_time,
+        }
+
+def apply_profile(odrv, profile: dict) -> ApplyReport:
+    """Read every property back and only write the ones that differ."""
+    report = ApplyReport()
+    to_write = {}
+    start = time.perf_counter()
+    for path, wanted in profile.items():
+        try:
+            current = read_property(odrv, path)
+        except Exception as e:
+            report.errors[path] = str(e)
+            continue
+        if same_value(current, wanted):
+            report.unchanged += 1
+        else:
+            to_write[path] = (current, wanted)
+    report.read_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for path, (current, wanted) in to_write.items():
+        try:
+            write_property(odrv, path, wanted)
+            report.changed[path] = (current, wanted)
+        except Exception as e:
+            report.errors[path] = str(e)
+    report.write_time = time.perf_counter() - start
+    return report
+
+if __name__ == '__main__':
+    # write the built-in profile to a file as a starting point for custom ones
+    path = sys.argv[1] if len(sys.argv) > 1 else 'motor_profile.json'
+    save_profile(DEFAULT_PROFILE, path)
+    print(f"Profile written to {path}")
@@ -0,0 +1,229 @@
+import os
+import time
+import odrive
+import threading
+from typing import Optional
+
+# device backend: the odrive package (USB) or odrive_sim (in-process simulator)
+backend = odrive
+if os.environ.get("ODRIVE_BACKEND") == "sim":
+    import odrive_sim as backend
+
+def set_backend(module):
+    """Module with an odrive.find_any compatible find_any(serial_number=, timeout=)."""
+    global backend
+    backend = module
+
+DISCOVERY_TIMEOUT = 10.0   # s for the first discovery
+RECONNECT_BACKOFF = (0.25, 8.0)  # first and max delay between reconnect attempts, doubled each failure
+CHECK_INTERVAL = 1.0       # s between liveness checks when the handle has no lost notification
+LOSS_TIMEOUT = 5.0         # s to wait for a rebooting board to drop off the bus
+
+def normalize_serial(serial_number) -> Optional[str]:
+    """Upper case hex as odrivetool prints it, from the int serial_number property or any hex string."""
+    if serial_number is None:
+        return None
+    if isinstance(serial_number, int):
+        return format(serial_number, 'X')
+    return str(serial_number).strip().upper()
+
+class ConnectionStats:
+    def __init__(self) -> None:
+        self.discoveries = 0
+        self.discover_time = 0.0      # last successful discovery
+        self.disconnects = 0
+        self.reconnects = 0
+        self.reconnect_attempts = 0
+        self.reconnect_time = 0.0     # last loss -> handle available again
+        self.reconnect_time_max = 0.0
+        self.connected_since = None
+
+    def to_dict(self) -> dict:
+        return dict(self.__dict__)
+
+class ODriveConnection:
+    """Owns the handle of one ODrive, found by serial number.
+
+    The handle is discovered once and shared by every MotorController built on
+    this connection, so API requests and UI reconnects do not scan USB again.
+    When the device is lost (USB drop, reboot after save_configuration) a
+    watchdog thread rediscovers the same serial number with exponential
+    backoff and calls the listeners with the new handle.
+    """
+
+    def __init__(self, serial_number: str = None, timeout: float = DISCOVERY_TIMEOUT) -> None:
+        self.serial_number = normalize_serial(serial_number)
+        self.timeout = timeout
+        self.odrv = None
+        self.stats = ConnectionStats()
+        self.listeners = []
+        self.lock = threading.RLock()
+        self.lost = threading.Event()
+        self.connected = threading.Event()
+        self.lost_at = None
+        self.running = False
+        self.th = None
+
+    def _discover(self, timeout: float):
+        start = time.perf_counter()
+        kwargs = {"timeout": timeout}
+        if self.serial_number:
+            kwargs["serial_number"] = self.serial_number
+        try:
+            odrv = backend.find_any(**kwargs)
+        except TimeoutError:
+            odrv = None
+        if odrv is None:
+            raise Exception(f"ODrive {self.serial_number or ''} not found after {timeout}s")
+        self.stats.discoveries += 1
+        self.stats.discover_time = time.perf_counter() - start
+        return odrv
+
+    def connect(self):
+        """Return the cached handle, discovering the device the first time."""
+        with self.lock:
+            if self.odrv is None:
+                self._set_handle(self._discover(self.timeout))
+            if not self.running:
+                self.running = True
+                self.th = threading.Thread(target=self.watch_loop, daemon=True)
+                self.th.start()
+            return self.odrv
+
+    def _set_handle(self, odrv):
+        self.odrv = odrv
+        if not self.serial_number:
+            # pin later rediscoveries to this board
+            self.serial_number = normalize_serial(odrv.serial_number)
+        self.lost.clear()
+        self.connected.set()
+        self.stats.connected_since = time.time()
+        on_lost = getattr(odrv, '_on_lost', None)
+        if on_lost is not None and hasattr(on_lost, 'add_done_callback'):
+            on_lost.add_done_callback(lambda _: self.mark_lost(odrv))
+
+    def mark_lost(self, odrv=None):
+        """Called on a lost notification or by users that got an error from the handle."""
+        with self.lock:
+            if odrv is not None and odrv is not self.odrv:
+                return
+            if self.lost.is_set():
+                return
+            self.connected.clear()
+            self.lost_at = time.perf_counter()
+            self.stats.disconnects += 1
+            self.lost.set()
+        print("ODrive connection lost")
+
+    def wait_connected(self, timeout: float = None):
+        """Block until a handle is available again, returns it or raises on timeout."""
+        if not self.connected.wait(timeout):
+            raise Exception(f"ODrive {self.serial_number} not reconnected after {timeout}s")
+        return self.odrv
+
+    def reconnect(self, timeout: float = None):
+        """Expect the device to go away (reboot) and wait for the new handle."""
+        odrv = self.odrv
+        deadline = time.monotonic() + LOSS_TIMEOUT
+        # don't rediscover the board before it actually dropped off the bus
+        while self.connected.is_set() and self._alive() and time.monotonic() < deadline:
+            time.sleep(0.05)
+        self.mark_lost(odrv)
+        return self.wait_connected(timeout or self.timeout)
+
+    def add_listener(self, callback):
+        """callback(odrv) runs on the watchdog thread each time the handle is replaced."""
+        self.listeners.append(callback)
+
+    def remove_listener(self, callback):
+        if callback in self.listeners:
+            self.listeners.remove(callback)
+
+    def _alive(self) -> bool:
+        try:
+            self.odrv.vbus_voltage
+            return True
+        except Exception:
+            return False
+
+    def watch_loop(self):
+        while self.running:
+            odrv = self.odrv
+            if not self.lost.wait(CHECK_INTERVAL if getattr(odrv, '_on_lost', None) is None else None):
+                if not self._alive():
+                    self.mark_lost(odrv)
+                continue
+            if not self.running:
+                return
+            self._reconnect_loop()
+
+    def _reconnect_loop(self):
+        delay, max_delay = RECONNECT_BACKOFF
+        while self.running:
+            self.stats.reconnect_attempts += 1
+            try:
+                odrv = self._discover(max(delay, 1.0))
+            except Exception as e:
+                print(f"Reconnect failed, retrying in {delay:.2f}s: {e}")
+                time.sleep(delay)
+                delay = min(delay * 2, max_delay)
+                continue
+            with self.lock:
+                self._set_handle(odrv)
+                elapsed = time.perf_counter() - self.lost_at
+                self.stats.reconnects += 1
+                self.stats.reconnect_time = elapsed
+                self.stats.reconnect_time_max = max(self.stats.reconnect_time_max, elapsed)
+            print(f"ODrive reconnected in {elapsed:.2f}s")
+            for callback in list(self.listeners):
+                try:
+                    callback(odrv)
+                except Exception as e:
+                    print(f"Exception in reconnect listener {e}")
+            return
+
+    def close(self):
+        self.running = False
+        self.lost.set()
+        if self.th and self.th is not threading.current_thread():
+            self.th.join()
+        self.th = None
+
+    def get_stats(self) -> dict:
+        stats = self.stats.to_dict()
+        stats.update(serial_number=self.serial_number, connected=self.connected.is_set())
+        return stats
+
+# one connection per board, shared by the UI, the API and main.py
+connections: dict[str, ODriveConnection] = {}
+connections_lock = threading.Lock()
+# held while a board is discovered, callers for the same serial wait, other boards don't
+connect_locks: dict[Optional[str], threading.Lock] = {}
+
+def _find(serial_number: Optional[str]) -> Optional[ODriveConnection]:
+    # called with connections_lock held
+    if serial_number is None:
+        return next(iter(connections.values()), None)
+    return connections.get(serial_number)
+
+def get_connection(serial_number: str = None, timeout: float = DISCOVERY_TIMEOUT) -> ODriveConnection:
+    """Shared connection for serial_number (int or hex string), None reuses the first connection made."""
+    serial_number = normalize_serial(serial_number)
+    with connections_lock:
+        connection = _find(serial_number)
+        if connection is not None:
+            return connection
+        lock = connect_locks.setdefault(serial_number, threading.Lock())
+    with lock:
+        with connections_lock:
+            connection = _find(serial_number)
+        if connection is not None:
+            return connection
+        connection = ODriveConnection(serial_number, timeout)
+        connection.connect()
+        with connections_lock:
+            # a discovery without serial number may have found the same board meanwhile
+            shared = connections.setdefault(connection.serial_number, connection)
+        if shared is not connection:
+            connection.close()
+        return shared
@@ -0,0 +1,477 @@
+import math
+import time
+import random
+import threading
+from concurrent.futures import Future
+
+from odrive.utils import AxisState, InputMode, ControlMode, ProcedureResult, MotorType, EncoderId, Protocol, ODriveError
+
+# In-process stand-in for an ODrive 0.6 board, used through odrive_connection
+# with ODRIVE_BACKEND=sim or set_backend(odrive_sim). Positions are in turns
+# like the real property tree, torques in Nm, times in s.
+
+STEP = 0.0005          # model time step (2 kHz)
+MAX_CATCH_UP = 10.0    # s of model time simulated after a long gap, older time is skipped
+LATENCY = 0.0004       # s per property access, roughly one USB round trip
+DISCOVER_TIME = 0.3    # s find_any takes to return a board that is up
+REBOOT_TIME = 1.5      # s a board is gone after reboot()/save_configuration()
+CALIBRATION_TIME = 3.0 # s of FULL_CALIBRATION_SEQUENCE
+
+class ObjectLostError(Exception):
+    pass
+
+class CapstanModel:
+    """Rigid capstan on the motor shaft: inertia, viscous and coulomb friction, external load."""
+
+    def __init__(self, inertia: float = 2e-4, damping: float = 2e-3, friction: float = 0.01) -> None:
+        self.inertia = inertia     # kg m^2
+        self.damping = damping     # Nm per turn/s
+        self.friction = friction   # Nm
+        self.load_torque = 0.0     # Nm, e.g. tape tension * capstan radius
+        self.pos = 0.0             # turns
+        self.vel = 0.0             # turns/s
+
+    def step(self, torque: float, dt: float):
+        drive = torque - self.load_torque - self.damping * self.vel
+        if self.vel == 0.0 and abs(drive) <= self.friction:
+            return  # stiction holds
+        drive -= math.copysign(self.friction, self.vel if self.vel else drive)
+        vel = self.vel + drive / (self.inertia * 2 * math.pi) * dt
+        # friction can stop the shaft but not reverse it within one step
+        self.vel = 0.0 if self.vel and vel * self.vel < 0 else vel
+        self.pos += self.vel * dt
+
+# persistent configuration of one axis, path below axisN -> default
+AXIS_CONFIG = {
+    "config.motor.motor_type": MotorType.HIGH_CURRENT,
+    "config.motor.pole_pairs": 7,
+    "config.motor.torque_constant": 0.0827,
+    "config.motor.current_soft_max": 10.0,
+    "config.motor.current_hard_max": 23.0,
+    "config.motor.calibration_current": 10.0,
+    "config.motor.resistance_calib_max_voltage": 2.0,
+    "config.motor.phase_resistance": 0.0,
+    "config.motor.phase_inductance": 0.0,
+    "config.motor.phase_resistance_valid": False,
+    "config.motor.phase_inductance_valid": False,
+    "config.calibration_lockin.current": 10.0,
+    "config.torque_soft_min": -math.inf,
+    "config.torque_soft_max": math.inf,
+    "config.enable_watchdog": False,
+    "config.load_encoder": EncoderId.ONBOARD_ENCODER0,
+    "config.commutation_encoder": EncoderId.ONBOARD_ENCODER0,
+    "motor.motor_thermistor.config.enabled": False,
+    "controller.config.control_mode": ControlMode.POSITION_CONTROL,
+    "controller.config.input_mode": InputMode.PASSTHROUGH,
+    "controller.config.vel_limit": 2.0,
+    "controller.config.vel_limit_tolerance": 1.2,
+    "controller.config.vel_ramp_rate": 1.0,
+    "controller.config.pos_gain": 20.0,
+    "controller.config.vel_gain": 0.16,
+    "controller.config.vel_integrator_gain": 0.32,
+    "controller.config.input_filter_bandwidth": 20.0,
+    "trap_traj.config.vel_limit": 2.0,
+    "trap_traj.config.accel_limit": 0.5,
+    "trap_traj.config.decel_limit": 0.5,
+    "commutation_mapper.config.offset": 0.0,
+    "commutation_mapper.config.offset_valid": False,
+    "pos_vel_mapper.config.offset": 0.0,
+    "pos_vel_mapper.config.offset_valid": False,
+}
+
+BOARD_CONFIG = {
+    "config.dc_bus_overvoltage_trip_level": 59.92,
+    "config.dc_bus_undervoltage_trip_level": 10.5,
+    "config.dc_max_positive_current": math.inf,
+    "config.dc_max_negative_current": -math.inf,
+    "config.brake_resistor0.enable": False,
+    "config.brake_resistor0.resistance": 2.0,
+    "config.enable_uart_a": True,
+    "can.config.protocol": Protocol.SIMPLE,
+}
+
+# values written by the host and lost on reboot
+AXIS_INPUTS = {
+    "requested_state": AxisState.UNDEFINED,
+    "controller.input_pos": 0.0,
+    "controller.input_vel": 0.0,
+    "controller.input_torque": 0.0,
+}
+
+# computed from the model on every read
+AXIS_LIVE = ("current_state", "pos_estimate", "vel_estimate", "active_errors", "disarm_reason",
+             "procedure_result", "motor.torque_estimate", "motor.foc.Iq_measured")
+
+class SimAxis:
+    def __init__(self, board: "SimBoard", index: int) -> None:
+        self.board = board
+        self.prefix = f"axis{index}."
+        self.capstan = CapstanModel()
+        self.reset()
+
+    def reset(self):
+        self.state = AxisState.IDLE
+        self.active_errors = 0
+        self.disarm_reason = 0
+        self.procedure_result = ProcedureResult.SUCCESS
+        self.calibration_end = None
+        self.capstan.vel = 0.0
+        self.pos_setpoint = self.capstan.pos
+        self.vel_setpoint = 0.0
+        self.integrator = 0.0
+        self.torque = 0.0
+
+    def cfg(self, name: str):
+        return self.board.values[self.prefix + name]
+
+    def calibrated(self) -> bool:
+        return all(self.cfg(name) for name in (
+            "config.motor.phase_resistance_valid", "config.motor.phase_inductance_valid",
+            "commutation_mapper.config.offset_valid", "pos_vel_mapper.config.offset_valid"))
+
+    def disarm(self, error: int, result: ProcedureResult = ProcedureResult.DISARMED):
+        self.active_errors |= error
+        self.disarm_reason = error
+        self.procedure_result = result
+        self.state = AxisState.IDLE
+
+    def request_state(self, state: int):
+        now = self.board.now
+        if state == AxisState.IDLE:
+            if self.state == AxisState.FULL_CALIBRATION_SEQUENCE:
+                self.procedure_result = ProcedureResult.CANCELLED
+            self.state = AxisState.IDLE
+        elif state == AxisState.FULL_CALIBRATION_SEQUENCE:
+            self.state = AxisState.FULL_CALIBRATION_SEQUENCE
+            self.procedure_result = ProcedureResult.BUSY
+            self.calibration_end = now + self.board.calibration_time
+        elif state == AxisState.CLOSED_LOOP_CONTROL:
+            if self.active_errors:
+                self.procedure_result = ProcedureResult.DISARMED
+            elif not self.calibrated():
+                self.disarm(ODriveError.CALIBRATION_ERROR, ProcedureResult.NOT_CALIBRATED)
+            else:
+                # setpoints start where the shaft is, like the firmware
+                self.state = AxisState.CLOSED_LOOP_CONTROL
+                self.pos_setpoint = self.capstan.pos
+                self.vel_setpoint = 0.0
+                self.integrator = 0.0
+                self.board.values[self.prefix + "controller.input_pos"] = self.capstan.pos
+        else:
+            self.procedure_result = ProcedureResult.INVALID_STATE
+
+    def finish_calibration(self):
+        values = self.board.values
+        rng = self.board.rng
+        values[self.prefix + "config.motor.phase_resistance"] = 0.05 * (1 + 0.01 * rng.uniform(-1, 1))
+        values[self.prefix + "config.motor.phase_inductance"] = 2.5e-5 * (1 + 0.01 * rng.uniform(-1, 1))
+        values[self.prefix + "commutation_mapper.config.offset"] = 0.3 + 0.001 * rng.uniform(-1, 1)
+        values[self.prefix + "pos_vel_mapper.config.offset"] = 0.7 + 0.001 * rng.uniform(-1, 1)
+        for name in ("config.motor.phase_resistance_valid", "config.motor.phase_inductance_valid",
+                     "commutation_mapper.config.offset_valid", "pos_vel_mapper.config.offset_valid"):
+            values[self.prefix + name] = True
+        self.state = AxisState.IDLE
+        self.procedure_result = ProcedureResult.SUCCESS
+
+    def _trajectory(self, dt: float):
+        # online trapezoid: brake as soon as the remaining distance needs it
+        target = self.cfg("controller.input_pos")
+        vel_limit = self.cfg("trap_traj.config.vel_limit")
+        accel = self.cfg("trap_traj.config.accel_limit")
+        decel = self.cfg("trap_traj.config.decel_limit")
+        error = target - self.pos_setpoint
+        vel = self.vel_setpoint
+        if abs(error) < 1e-6 and abs(vel) < decel * dt:
+            self.pos_setpoint, self.vel_setpoint = target, 0.0
+            return
+        direction = math.copysign(1.0, error)
+        stopping = vel * vel / (2 * decel)
+        if vel * direction > 0 and stopping >= abs(error):
+            vel -= direction * decel * dt
+        else:
+            vel += direction * accel * dt
+        vel = max(-vel_limit, min(vel_limit, vel))
+        self.vel_setpoint = vel
+        self.pos_setpoint += vel * dt
+        if (target - self.pos_setpoint) * direction < 0 and abs(vel) <= decel * dt * 2:
+            self.pos_setpoint, self.vel_setpoint = target, 0.0
+
+    def _setpoints(self, dt: float):
+        mode = self.cfg("controller.config.input_mode")
+        input_pos = self.cfg("controller.input_pos")
+        input_vel = self.cfg("controller.input_vel")
+        if mode == InputMode.TRAP_TRAJ:
+            self._trajectory(dt)
+        elif mode == InputMode.POS_FILTER:
+            ki = 2.0 * self.cfg("controller.config.input_filter_bandwidth")
+            kp = 0.25 * ki * ki
+            accel = kp * (input_pos - self.pos_setpoint) + ki * (input_vel - self.vel_setpoint)
+            self.vel_setpoint += accel * dt
+            self.pos_setpoint += self.vel_setpoint * dt
+        elif mode == InputMode.VEL_RAMP:
+            ramp = self.cfg("controller.config.vel_ramp_rate") * dt
+            self.vel_setpoint += max(-ramp, min(ramp, input_vel - self.vel_setpoint))
+        else:
+            self.pos_setpoint, self.vel_setpoint = input_pos, input_vel
+
+    def _control(self, dt: float) -> float:
+        self._setpoints(dt)
+        control_mode = self.cfg("controller.config.control_mode")
+        if control_mode == ControlMode.TORQUE_CONTROL:
+            torque = self.cfg("controller.input_torque")
+        else:
+            vel_limit = self.cfg("controller.config.vel_limit")
+            if control_mode == ControlMode.POSITION_CONTROL:
+                vel_cmd = self.cfg("controller.config.pos_gain") * (self.pos_setpoint - self.capstan.pos) + self.vel_setpoint
+            else:
+                vel_cmd = self.vel_setpoint
+            vel_cmd = max(-vel_limit, min(vel_limit, vel_cmd))
+            error = vel_cmd - self.capstan.vel
+            torque = self.cfg("controller.config.vel_gain") * error + self.integrator + self.cfg("controller.input_torque")
+            limit = self.cfg("config.motor.torque_constant") * self.cfg("config.motor.current_soft_max")
+            if abs(torque) < limit:
+                # anti windup, only integrate while not saturated
+                self.integrator += self.cfg("controller.config.vel_integrator_gain") * error * dt
+            if abs(self.capstan.vel) > vel_limit * self.cfg("controller.config.vel_limit_tolerance"):
+                self.disarm(ODriveError.VELOCITY_LIMIT_VIOLATION)
+                return 0.0
+        limit = self.cfg("config.motor.torque_constant") * self.cfg("config.motor.current_soft_max")
+        torque = max(-limit, min(limit, torque))
+        return max(self.cfg("config.torque_soft_min"), min(self.cfg("config.torque_soft_max"), torque))
+
+    def step(self, dt: float):
+        if self.state == AxisState.FULL_CALIBRATION_SEQUENCE:
+            self.torque = 0.0
+            if self.board.now >= self.calibration_end:
+                self.finish_calibration()
+        elif self.state == AxisState.CLOSED_LOOP_CONTROL:
+            self.torque = self._control(dt)
+        else:
+            self.torque = 0.0
+        self.capstan.step(self.torque, dt)
+
+    def live(self, name: str):
+        if name == "current_state":
+            return self.state
+        if name == "pos_estimate":
+            return self.capstan.pos
+        if name == "vel_estimate":
+            return self.capstan.vel
+        if name == "active_errors":
+            return self.active_errors
+        if name == "disarm_reason":
+            return self.disarm_reason
+        if name == "procedure_result":
+            return self.procedure_result
+        if name == "motor.torque_estimate":
+            return self.torque
+        if name == "motor.foc.Iq_measured":
+            return self.torque / self.cfg("config.motor.torque_constant")
+
+class SimBoard:
+    """State of one simulated board. It outlives handles: reboots hand out a new SimNode root."""
+
+    def __init__(self, serial_number: int = 0x3A1F00000001, axes: int = 1, latency: float = LATENCY,
+                 latencies: dict = None, jitter: float = 0.0, calibration_time: float = CALIBRATION_TIME,
+                 reboot_time: float = REBOOT_TIME, discover_time: float = DISCOVER_TIME, seed: int = 0) -> None:
+        self.serial_number = serial_number
+        self.latency = latency
+        self.latencies = latencies or {}  # property path -> latency, overrides latency
+        self.jitter = jitter              # uniform extra latency in [0, jitter]
+        self.calibration_time = calibration_time
+        self.reboot_time = reboot_time
+        self.discover_time = discover_time
+        self.rng = random.Random(seed)
+        self.bus = threading.Lock()       # one transfer at a time, like the USB endpoint
+        self.axes = [SimAxis(self, i) for i in range(axes)]
+        self.defaults = dict(BOARD_CONFIG)
+        for axis in self.axes:
+            self.defaults.update({axis.prefix + key: value for key, value in AXIS_CONFIG.items()})
+        self.flash = dict(self.defaults)
+        self.values = {}
+        self.now = time.monotonic()
+        self.handle = None
+        self.available_at = 0.0
+        self.accesses = 0
+        self.boot()
+
+    def boot(self):
+        self.values = dict(self.flash)
+        for axis in self.axes:
+            self.values.update({axis.prefix + key: value for key, value in AXIS_INPUTS.items()})
+            axis.reset()
+        self.handle = SimNode(self, "")
+
+    def resting(self) -> bool:
+        return all(axis.state == AxisState.IDLE and axis.capstan.vel == 0.0 and
+                   abs(axis.capstan.load_torque) <= axis.capstan.friction for axis in self.axes)
+
+    def advance(self):
+        now = time.monotonic()
+        elapsed = now - self.now
+        if self.resting():
+            # nothing moves, skip ahead instead of stepping
+            self.now = max(self.now, now)
+            return
+        if elapsed > MAX_CATCH_UP:
+            self.now = now - MAX_CATCH_UP
+        while self.now + STEP <= now:
+            self.now += STEP
+            for axis in self.axes:
+                axis.step(STEP)
+
+    def _latency(self, path: str):
+        delay = self.latencies.get(path, self.latency)
+        if self.jitter:
+            delay += self.rng.uniform(0, self.jitter)
+        if delay > 0:
+            time.sleep(delay)
+
+    def _axis(self, path: str):
+        if path.startswith("axis"):
+            index, _, rest = path[4:].partition(".")
+            if index.isdigit() and int(index) < len(self.axes):
+                return self.axes[int(index)], rest
+        return None, path
+
+    def has(self, path: str) -> bool:
+        axis, rest = self._axis(path)
+        return path in self.values or path in ("vbus_voltage", "serial_number", "reboot_required") \
+            or (axis is not None and rest in AXIS_LIVE)
+
+    def is_node(self, path: str) -> bool:
+        prefix = path + "."
+        return any(key.startswith(prefix) for key in self.values) or \
+            any(f"axis{i}" == path for i in range(len(self.axes))) or \
+            any((f"axis{i}." + live).startswith(prefix) for i in range(len(self.axes)) for live in AXIS_LIVE)
+
+    def read(self, node: "SimNode", path: str):
+        with self.bus:
+            node._check()
+            self._latency(path)
+            self.accesses += 1
+            self.advance()
+            axis, rest = self._axis(path)
+            if axis is not None and rest in AXIS_LIVE:
+                return axis.live(rest)
+            if path == "vbus_voltage":
+                current = sum(abs(axis.torque * axis.capstan.vel * 2 * math.pi) for axis in self.axes) / 24.0
+                return 24.0 - 0.1 * current + self.rng.gauss(0, 0.01)
+            if path == "serial_number":
+                return self.serial_number
+            if path == "reboot_required":
+                return False
+            return self.values[path]
+
+    def write(self, node: "SimNode", path: str, value):
+        with self.bus:
+            node._check()
+            self._latency(path)
+            self.accesses += 1
+            self.advance()
+            axis, rest = self._axis(path)
+            if axis is not None and rest in AXIS_LIVE:
+                raise AttributeError(f"{path} is read only")
+            self.values[path] = value
+            if axis is not None and rest == "requested_state":
+                axis.request_state(value)
+
+    # functions of the root object
+    def save_configuration(self):
+        self.flash = {key: self.values[key] for key in self.defaults}
+        self.reboot()
+
+    def erase_configuration(self):
+        self.flash = dict(self.defaults)
+        self.reboot()
+
+    def reboot(self):
+        old = self.handle
+        self.available_at = time.monotonic() + self.reboot_time
+        self.boot()
+        old._lose()
+
+    def clear_errors(self):
+        with self.bus:
+            for axis in self.axes:
+                axis.active_errors = 0
+                axis.disarm_reason = 0
+
+    def set_load(self, torque: float, axis: int = 0):
+        """External load on the capstan (Nm), not a device property."""
+        self.axes[axis].capstan.load_torque = torque
+
+class SimNode:
+    """Object of the simulated property tree, attribute access costs one simulated transfer."""
+
+    FUNCTIONS = ("save_configuration", "erase_configuration", "reboot", "clear_errors")
+
+    def __init__(self, board: SimBoard, path: str, root: "SimNode" = None) -> None:
+        object.__setattr__(self, "_board", board)
+        object.__setattr__(self, "_path", path)
+        object.__setattr__(self, "_root", root or self)
+        object.__setattr__(self, "_lost", False)
+        object.__setattr__(self, "_children", {})
+        if root is None:
+            object.__setattr__(self, "_on_lost", Future())
+
+    def _check(self):
+        if self._root._lost:
+            raise ObjectLostError(f"ODrive {self._board.serial_number:X} lost")
+
+    def _lose(self):
+        object.__setattr__(self, "_lost", True)
+        self._on_lost.set_result(True)
+
+    def __getattr__(self, name: str):
+        if name.startswith("_"):
+            raise AttributeError(name)
+        board = self._board
+        path = f"{self._path}.{name}" if self._path else name
+        if not self._path and name in self.FUNCTIONS:
+            self._check()
+            return getattr(board, name)
+        if board.has(path):
+            return board.read(self, path)
+        if board.is_node(path):
+            child = self._children.get(name)
+            if child is None:
+                child = SimNode(board, path, self._root)
+                self._children[name] = child
+            return child
+        raise AttributeError(f"ODrive has no property {path}")
+
+    def __setattr__(self, name: str, value):
+        path = f"{self._path}.{name}" if self._path else name
+        if not self._board.has(path):
+            raise AttributeError(f"ODrive has no property {path}")
+        self._board.write(self, path, value)
+
+# boards find_any() can return, by serial number as hex string
+boards: dict[str, SimBoard] = {}
+
+def add_board(**options) -> SimBoard:
+    board = SimBoard(**options)
+    boards[format(board.serial_number, 'X')] = board
+    return board
+
+def find_any(serial_number: str = None, timeout: float = None, **kwargs):
+    """Same contract as odrive.find_any, a default board is created on first use."""
+    if not boards:
+        add_board()
+    deadline = None if timeout is None else time.monotonic() + timeout
+    while True:
+        candidates = [board for key, board in boards.items() if serial_number is None or key == serial_number.upper()]
+        ready = [board for board in candidates if board.available_at <= time.monotonic()]
+        if ready:
+            board = ready[0]
+            time.sleep(board.discover_time)
+            return board.handle
+        wait = min([board.available_at for board in candidates], default=math.inf) - time.monotonic()
+        if deadline is not None:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0 or wait > remaining:
+                time.sleep(max(remaining, 0))
+                raise TimeoutError(f"no ODrive {serial_number or ''} found")
+            wait = min(wait, remaining)
+        time.sleep(max(min(wait, 0.05), 0.001))
@@ -0,0 +1,194 @@
+import os
+import csv
+import sys
+import json
+import mmap
+import queue
+import struct
+import datetime
+import threading
+import time
+import numpy as np
+
+import metrics
+
+# File layout (little endian):
+#   MAGIC, uint32 header length, JSON header (channels, units, dtype)
+#   then chunks: CHUNK_MAGIC, uint32 row count, one float64 array per channel
+MAGIC = b'CDREC1\n'
+CHUNK_MAGIC = b'CHNK'
+EXTENSION = '.cdr'
+
+WRITE_TIME = metrics.histogram("recorder_write_seconds", "One chunk written and flushed to the recording")
+ROWS_WRITTEN = metrics.counter("recorder_rows_written", "Rows written to recordings")
+ROWS_DROPPED = metrics.counter("recorder_rows_dropped", "Rows dropped because the writer queue was full")
+
+# same columns as the original CSV output of app.py
+CSV_CHANNELS = [
+    ('timestamp', 's'),
+    ('position', 'deg'),
+    ('torque', 'Nm'),
+    ('velocity', 'rev/s'),
+    ('force', 'kg'),
+]
+
+class RecorderStats:
+    def __init__(self) -> None:
+        self.rows_written = 0
+        self.rows_dropped = 0   # rejected because the queue was full
+        self.chunks_written = 0
+        self.bytes_written = 0
+        self.files = 0
+        self.write_time = 0.0   # seconds spent in file writes
+
+    def to_dict(self) -> dict:
+        return dict(self.__dict__)
+
+class SessionRecorder:
+    """Records rows to chunked columnar binary files from a background thread.
+
+    record() never blocks: rows go into a bounded queue and are counted as
+    dropped when the writer cannot keep up. The writer batches rows into one
+    chunk per flush_interval (or batch_size rows) and starts a new file when
+    the current one exceeds max_bytes or max_seconds.
+    """
+
+    def __init__(self, base_path: str, channels: list[tuple[str, str]] = CSV_CHANNELS,
+                 queue_size: int = 100000, batch_size: int = 5000, flush_interval: float = 1.0,
+                 max_bytes: int = 512 * 1024 * 1024, max_seconds: float = 3600) -> None:
+        self.base_path = base_path
+        self.channels = channels
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_bytes = max_bytes
+        self.max_seconds = max_seconds
+        self.queue = queue.Queue(maxsize=queue_size)
+        self.stats = RecorderStats()
+        self.file = None
+        self.file_path = None
+        self.file_start = 0.0
+        self.paths = []
+        self.running = True
+        self.th = threading.Thread(target=self.write_loop, daemon=True)
+        self.th.start()
+
+    def record(self, row) -> bool:
+        """row holds one value per channel, returns False if it was dropped."""
+        try:
+            self.queue.put_nowait(row)
+            return True
+        except queue.Full:
+            self.stats.rows_dropped += 1
+            ROWS_DROPPED.inc()
+            return False
+
+    def close(self):
+        if not self.running:
+            return
+        self.running = False
+        self.th.join()
+
+    def _open_file(self):
+        self._close_file()
+        self.file_path = f"{self.base_path}_{len(self.paths):03d}{EXTENSION}"
+        header = json.dumps({
+            'version': 1,
+            'dtype': '<f8',
+            'created': datetime.datetime.now().isoformat(),
+            'channels': [{'name': name, 'unit': unit} for name, unit in self.channels],
+        }).encode()
+        self.file = open(self.file_path, 'wb')
+        self.file.write(MAGIC + struct.pack('<I', len(header)) + header)
+        self.file_start = time.monotonic()
+        self.paths.append(self.file_path)
+        self.stats.files += 1
+
+    def _close_file(self):
+        if self.file:
+            self.file.close()
+            self.file = None
+
+    def _needs_rotation(self) -> bool:
+        return (self.file is None
+                or self.file.tell() >= self.max_bytes
+                or time.monotonic() - self.file_start >= self.max_seconds)
+
+    def write_chunk(self, rows: list):
+        if self._needs_rotation():
+            self._open_file()
+        start = time.perf_counter()
+        columns = np.asarray(rows, dtype='<f8').T
+        self.file.write(CHUNK_MAGIC + struct.pack('<I', len(rows)))
+        self.file.write(np.ascontiguousarray(columns).tobytes())
+        self.file.flush()
+        elapsed = time.perf_counter() - start
+        self.stats.write_time += elapsed
+        WRITE_TIME.observe(elapsed)
+        ROWS_WRITTEN.inc(len(rows))
+        self.stats.rows_written += len(rows)
+        self.stats.chunks_written += 1
+        self.stats.bytes_written += 8 + columns.nbytes
+
+    def write_loop(self):
+        rows = []
+        deadline = time.monotonic() + self.flush_interval
+        while self.running or not self.queue.empty():
+            try:
+                rows.append(self.queue.get(timeout=max(deadline - time.monotonic(), 0.01)))
+                while len(rows) < self.batch_size:
+                    rows.append(self.queue.get_nowait())
+            except queue.Empty:
+                pass
+            if rows and (len(rows) >= self.batch_size or time.monotonic() >= deadline or not self.running):
+                try:
+                    self.write_chunk(rows)
+                except Exception as e:
+                    print(f"Exception writing recording {e}")
+                rows = []
+            if time.monotonic() >= deadline:
+                deadline = time.monotonic() + self.flush_interval
+        self._close_file()
+
+def read_recording(path: str):
+    """Returns (header, {channel: array}); the file is memory mapped, each column is loaded into one array."""
+    with open(path, 'rb') as f:
+        data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    if data[:len(MAGIC)] != MAGIC:
+        raise Exception(f"{path} is not a recording")
+    pos = len(MAGIC)
+    header_len, = struct.unpack_from('<I', data, pos)
+    pos += 4
+    header = json.loads(data[pos:pos + header_len])
+    pos += header_len
+
+    names = [channel['name'] for channel in header['channels']]
+    chunks = {name: [] for name in names}
+    while pos + 8 <= len(data):
+        if data[pos:pos + 4] != CHUNK_MAGIC:
+            raise Exception(f"Corrupted chunk at byte {pos} in {path}")
+        rows, = struct.unpack_from('<I', data, pos + 4)
+        pos += 8
+        if pos + rows * 8 * len(names) > len(data):
+            break  # truncated last chunk, e.g. the process was killed mid write
+        for name in names:
+            chunks[name].append(np.frombuffer(data, '<f8', count=rows, offset=pos))
+            pos += rows * 8
+    columns = {name: np.concatenate(parts) if parts else np.empty(0) for name, parts in chunks.items()}
+    return header, columns
+
+def to_csv(path: str, csv_path: str = None) -> str:
+    """Convert a recording to the CSV layout app.py used to write."""
+    csv_path = csv_path or os.path.splitext(path)[0] + '.csv'
+    header, columns = read_recording(path)
+    names = [channel['name'] for channel in header['channels']]
+    with open(csv_path, 'w', newline='') as csvfile:
+        writer = csv.writer(csvfile)
+        writer.writerow(names)
+        writer.writerows(zip(*(columns[name].tolist() for name in names)))
+    return csv_path
+
+if __name__ == '__main__':
+    if len(sys.argv) < 2:
+        print("Usage: python recorder.py <recording.cdr> [output.csv]")
+        sys.exit(1)
+    print(to_csv(sys.argv[1], sys.argv[2] if len(sys.argv) > 2 else None))
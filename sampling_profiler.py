@@ -0,0 +1,112 @@
+import os
+import sys
+import time
+import threading
+from collections import Counter
+
+DEFAULT_INTERVAL = 0.005  # s between stack samples
+MAX_DURATION = 600.0      # s, a forgotten profiler stops by itself
+MAX_DEPTH = 64            # frames kept per stack
+
+class SamplingProfiler:
+    """Opt-in statistical profiler for a running process.
+
+    While on, a daemon thread snapshots the stacks of all other threads every
+    interval with sys._current_frames() and counts them, nothing is hooked
+    into the profiled code so it runs at full speed when the profiler is off
+    and pays about one stack walk per thread and interval when it's on.
+    start() runs for duration seconds, the counts stay readable afterwards
+    until the next start().
+    """
+
+    def __init__(self) -> None:
+        self.stacks = Counter()   # (thread name, frame, ..., leaf frame) -> samples
+        self.samples = 0
+        self.interval = DEFAULT_INTERVAL
+        self.started = None
+        self.stopped = None
+        self.sample_time = 0.0    # s spent taking samples, the profiler's own cost
+        self.stop_event = threading.Event()
+        self.lock = threading.Lock()
+        self.th = None
+
+    def is_running(self) -> bool:
+        return self.th is not None and self.th.is_alive()
+
+    def start(self, duration: float = 30.0, interval: float = DEFAULT_INTERVAL):
+        if self.is_running():
+            raise Exception("Profiler already running")
+        with self.lock:
+            self.stacks = Counter()
+        self.samples = 0
+        self.sample_time = 0.0
+        self.interval = max(interval, 0.001)
+        self.started = time.monotonic()
+        self.stopped = None
+        self.stop_event.clear()
+        self.th = threading.Thread(target=self.sample_loop, args=(min(duration, MAX_DURATION),),
+                                   name="sampling-profiler", daemon=True)
+        self.th.start()
+
+    def stop(self):
+        self.stop_event.set()
+        if self.th:
+            self.th.join()
+            self.th = None
+
+    def sample_loop(self, duration: float):
+        own = threading.get_ident()
+        deadline = self.started + duration
+        while not self.stop_event.wait(self.interval) and time.monotonic() < deadline:
+            start = time.perf_counter()
+            names = {thread.ident: thread.name for thread in threading.enumerate()}
+            sampled = [(names.get(ident, str(ident)),) + stack(frame)
+                       for ident, frame in sys._current_frames().items() if ident != own]
+            with self.lock:
+                self.stacks.update(sampled)
+            self.samples += 1
+            self.sample_time += time.perf_counter() - start
+        self.stopped = time.monotonic()
+
+    def folded(self) -> str:
+        """Collapsed stacks ("thread;outer;...;leaf count"), input of flamegraph.pl and speedscope."""
+        with self.lock:
+            stacks = self.stacks.most_common()
+        return "\n".join(f"{';'.join(key)} {count}" for key, count in stacks) + "\n"
+
+    def top(self, n: int = 20) -> list[dict]:
+        """Functions by samples on top of a stack (self) and anywhere in it (total)."""
+        own = Counter()
+        total = Counter()
+        with self.lock:
+            stacks = list(self.stacks.items())
+        for key, count in stacks:
+            own[key[-1]] += count
+            for frame in set(key[1:]):
+                total[frame] += count
+        stacks = sum(count for _, count in stacks) or 1
+        return [{"function": frame, "self": count, "self_percent": 100 * count / stacks,
+                 "total_percent": 100 * total[frame] / stacks}
+                for frame, count in own.most_common(n)]
+
+    def get_stats(self) -> dict:
+        end = self.stopped or time.monotonic()
+        elapsed = end - self.started if self.started else 0.0
+        return {
+            "running": self.is_running(),
+            "interval": self.interval,
+            "elapsed": elapsed,
+            "samples": self.samples,
+            "overhead_percent": 100 * self.sample_time / elapsed if elapsed else 0.0,
+        }
+
+def stack(frame) -> tuple:
+    """Frames outermost first as "function (file:first line)", truncated to the innermost MAX_DEPTH."""
+    frames = []
+    while frame is not None and len(frames) < MAX_DEPTH:
+        code = frame.f_code
+        frames.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+        frame = frame.f_back
+    return tuple(reversed(frames))
+
+profiler = SamplingProfiler()
@@ -0,0 +1,127 @@
+import numpy as np
+
+class SignalBuffer:
+    """Preallocated ring buffer of timestamped samples with named float channels.
+
+    Every appended sample gets a sequence number (0, 1, 2...) so readers can ask
+    for everything after the last sample they saw.
+
+    Storage is mirrored (each sample is written at i and i + capacity) so any
+    window of up to capacity consecutive samples is one contiguous slice and
+    view() can hand it out without copying. One thread writes, any number read:
+    the writer publishes a sample by bumping seq only after it is stored.
+    """
+
+    def __init__(self, channels: list[str], capacity: int = 10000) -> None:
+        if capacity <= 0:
+            raise ValueError("capacity must be positive")
+        self.channels = list(channels)
+        self.index = {name: i for i, name in enumerate(self.channels)}
+        self.capacity = capacity
+        self.timestamps = np.zeros(2 * capacity)
+        self.values = np.zeros((len(self.channels), 2 * capacity))
+        self.seq = 0    # sequence number of the next sample
+        self.floor = 0  # samples before this were discarded by drop_oldest()
+        self.writing = 0  # samples being stored but not yet published, see _copy()
+
+    def __len__(self) -> int:
+        return self.seq - self.oldest_seq()
+
+    def append(self, timestamp: float, values) -> int:
+        """values in channel order, returns the sequence number of the sample."""
+        seq = self.seq
+        i = seq % self.capacity
+        j = i + self.capacity
+        self.writing = 1
+        self.timestamps[i] = self.timestamps[j] = timestamp
+        self.values[:, i] = values
+        self.values[:, j] = self.values[:, i]
+        self.seq = seq + 1
+        self.writing = 0
+        return seq
+
+    def extend(self, timestamps, values) -> int:
+        """Append many samples, values shaped [channel, sample]. Returns the first sequence number."""
+        timestamps = np.asarray(timestamps, dtype=float)
+        values = np.asarray(values, dtype=float).reshape(len(self.channels), -1)
+        n = len(timestamps)
+        first = self.seq
+        if n > self.capacity:
+            # only the newest capacity samples can be kept anyway
+            skip = n - self.capacity
+            first += skip
+            timestamps, values, n = timestamps[skip:], values[:, skip:], self.capacity
+        last = first + n
+        self.writing = last - self.seq
+        # write both mirror halves, each as at most two contiguous slices
+        for offset in (0, self.capacity):
+            start = first % self.capacity
+            head = min(n, self.capacity - start)
+            self.timestamps[offset + start:offset + start + head] = timestamps[:head]
+            self.values[:, offset + start:offset + start + head] = values[:, :head]
+            if head < n:
+                self.timestamps[offset:offset + n - head] = timestamps[head:]
+                self.values[:, offset:offset + n - head] = values[:, head:]
+        self.seq = last
+        self.writing = 0
+        return first
+
+    def oldest_seq(self) -> int:
+        return max(self.seq - self.capacity, self.floor)
+
+    def drop_oldest(self, keep: int):
+        """Forget everything but the last keep samples."""
+        self.floor = max(self.floor, self.seq - keep)
+
+    def clear(self):
+        self.floor = self.seq
+
+    def _slice(self, first: int, last: int) -> slice:
+        end = last % self.capacity + self.capacity
+        return slice(end - (last - first), end)
+
+    def _range(self, first: int, last: int):
+        s = self._slice(first, last)
+        return first, self.timestamps[s], self.values[:, s]
+
+    def view(self, n: int = None):
+        """Last n samples (all if None) as (first_seq, timestamps, values[channel, sample]).
+
+        The arrays are views into the buffer: they stay valid until the writer
+        appends another capacity - n samples, copy them to keep them longer.
+        """
+        last = self.seq
+        first = self.oldest_seq() if n is None else max(last - n, self.oldest_seq())
+        return self._range(first, last)
+
+    def channel_view(self, channel: str, n: int = None):
+        first, timestamps, values = self.view(n)
+        return timestamps, values[self.index[channel]]
+
+    def _copy(self, first: int, last: int):
+        while True:
+            # skip the slots a write in progress is overwriting
+            first = max(first, self.oldest_seq(), self.seq + self.writing - self.capacity)
+            _, timestamps, values = self._range(first, last)
+            timestamps, values = timestamps.copy(), values.copy()
+            # retry if the writer lapped the window while it was being copied, including
+            # the slots of a write still in progress (read writing before seq: a write
+            # that finishes in between has bumped seq by then)
+            writing = self.writing
+            if first >= self.seq + writing - self.capacity:
+                return first, timestamps, values
+
+    def latest(self, n: int):
+        """Copy of the last n samples, same format as view()."""
+        last = self.seq
+        return self._copy(max(last - n, self.oldest_seq()), last)
+
+    def since(self, seq: int):
+        """Copy of the samples with sequence number >= seq still in the buffer."""
+        last = self.seq
+        return self._copy(min(max(seq, self.oldest_seq()), last), last)
+
+    def last_value(self, channel: str) -> float:
+        if not self.seq:
+            return 0.0
+        return float(self.values[self.index[channel], (self.seq - 1) % self.capacity])
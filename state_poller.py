@@ -0,0 +1,130 @@
+import time
+import threading
+
+FAST_INTERVAL = 0.005   # s, while someone waits for a state or just after a change
+SLOW_INTERVAL = 0.1     # s, nobody waiting
+SETTLE_TIME = 0.5       # s of fast polling after the last change
+
+class StatePoller:
+    """One thread watching axis_state/active_errors for every waiter of a MotorController.
+
+    Reads go through motor.get_telemetry(max_age=interval), so while the
+    sampler runs the poller reuses its snapshots and adds no bus traffic.
+    The interval drops to FAST_INTERVAL as soon as a waiter registers and
+    stays there for SETTLE_TIME after each change. Listeners are called on
+    the poller thread with every new snapshot whose state changed.
+    """
+
+    def __init__(self, motor, fast_interval: float = FAST_INTERVAL, slow_interval: float = SLOW_INTERVAL) -> None:
+        self.motor = motor
+        self.fast_interval = fast_interval
+        self.slow_interval = slow_interval
+        self.cond = threading.Condition()
+        self.wake = threading.Event()
+        self.telemetry = None
+        self.changes = 0
+        self.last_change = 0.0
+        self.waiters = 0
+        self.listeners = []
+        self.polls = 0
+        self.errors = 0
+        self.running = False
+        self.th = None
+
+    def start(self):
+        with self.cond:
+            if self.running:
+                return
+            self.running = True
+        self.th = threading.Thread(target=self.poll_loop, daemon=True)
+        self.th.start()
+
+    def stop(self):
+        self.running = False
+        self.wake.set()
+        if self.th and self.th is not threading.current_thread():
+            self.th.join()
+        self.th = None
+
+    def add_listener(self, callback):
+        self.listeners.append(callback)
+
+    def remove_listener(self, callback):
+        if callback in self.listeners:
+            self.listeners.remove(callback)
+
+    def add_waiter(self):
+        """Switch to fast polling until the matching remove_waiter()."""
+        with self.cond:
+            self.waiters += 1
+        self.start()
+        self.wake.set()
+
+    def remove_waiter(self):
+        with self.cond:
+            self.waiters -= 1
+
+    def interval(self) -> float:
+        if self.waiters or time.monotonic() - self.last_change < SETTLE_TIME:
+            return self.fast_interval
+        return self.slow_interval
+
+    def poll_loop(self):
+        while self.running:
+            interval = self.interval()
+            try:
+                telemetry = self.motor.get_telemetry(max_age=interval)
+            except Exception as e:
+                self.errors += 1
+                telemetry = None
+                if self.motor.is_connected():
+                    print(f"Exception polling axis state {e}")
+            if telemetry is not None and telemetry is not self.telemetry:
+                self.polls += 1
+                previous = self.telemetry
+                changed = previous is None or (telemetry.axis_state, telemetry.active_errors) != \
+                    (previous.axis_state, previous.active_errors)
+                with self.cond:
+                    self.telemetry = telemetry
+                    if changed:
+                        self.changes += 1
+                        self.last_change = time.monotonic()
+                    self.cond.notify_all()
+                if changed:
+                    for callback in list(self.listeners):
+                        callback(telemetry)
+            self.wake.wait(interval)
+            self.wake.clear()
+
+    def wait_for(self, predicate, timeout: float = None, after: float = None):
+        """Block until predicate(telemetry) holds for a snapshot taken at or after `after`.
+
+        Returns the matching MotorTelemetry, None on timeout.
+        """
+        after = time.monotonic() if after is None else after
+        deadline = None if timeout is None else time.monotonic() + timeout
+        match = lambda t: t is not None and t.timestamp >= after and predicate(t)
+        self.add_waiter()
+        try:
+            with self.cond:
+                while not match(self.telemetry):
+                    remaining = None if deadline is None else deadline - time.monotonic()
+                    if remaining is not None and remaining <= 0:
+                        return None
+                    self.cond.wait(remaining)
+                return self.telemetry
+        finally:
+            self.remove_waiter()
+
+    def wait_for_state(self, state, timeout: float = None, after: float = None):
+        states = (state,) if isinstance(state, int) else tuple(state)
+        return self.wait_for(lambda t: t.axis_state in states, timeout, after)
+
+    def get_stats(self) -> dict:
+        return {
+            "polls": self.polls,
+            "changes": self.changes,
+            "errors": self.errors,
+            "waiters": self.waiters,
+            "interval": self.interval(),
+        }
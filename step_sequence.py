@@ -0,0 +1,139 @@
+import csv
+import json
+import math
+import time
+import threading
+import numpy as np
+
+# one row per executed step, times in seconds relative to the sequence start
+STEP_LOG_DTYPE = np.dtype([
+    ('cycle', '<u4'),
+    ('step', '<u4'),
+    ('target', '<f4'),      # deg
+    ('scheduled', '<f8'),   # deadline of the step
+    ('issued', '<f8'),      # setpoint written to the drive
+    ('error', '<f4'),       # issued - scheduled
+    ('arrival', '<f8'),     # pos_estimate within tolerance of target, NaN if never
+])
+
+class LoopFlowData:
+    def __init__(self, delay_ms: int, position: int):
+        self.delay_ms = delay_ms
+        self.position = position
+
+def load_steps(path: str) -> list[LoopFlowData]:
+    """Read steps from a .json list of {"position", "delay_ms"} or a csv with position,delay_ms columns."""
+    with open(path, newline='') as f:
+        if path.endswith('.json'):
+            rows = json.load(f)
+        else:
+            rows = list(csv.DictReader(f))
+    return [LoopFlowData(delay_ms=float(row['delay_ms']), position=float(row['position'])) for row in rows]
+
+class StepSequence:
+    """Runs LoopFlowData steps against absolute monotonic deadlines.
+
+    Step k of the sequence starts exactly at start + sum of the previous delays,
+    regardless of how long the USB writes took, so timing does not drift over
+    thousands of cycles. cancel() returns immediately, the worker thread waits
+    on an Event instead of sleeping.
+    """
+
+    def __init__(self, motor, steps: list[LoopFlowData], cycles: int = None, tolerance: float = 1.0,
+                 poll_interval: float = 0.005) -> None:
+        self.motor = motor
+        self.steps = steps
+        self.cycles = cycles          # None repeats until cancelled
+        self.tolerance = tolerance    # deg, for the arrival time
+        self.poll_interval = poll_interval
+        self.cancelled = threading.Event()
+        self.cycle = 0
+        self.log = np.zeros(max(len(steps), 1) * 16, STEP_LOG_DTYPE)
+        self.log_len = 0
+        self.write_errors = 0         # steps whose setpoint was not written, logged with the time they gave up
+        self.read_errors = 0
+        self.last_error = None
+        self.th = None
+
+    def start(self):
+        self.cancelled.clear()
+        self.th = threading.Thread(target=self.run, daemon=True)
+        self.th.start()
+
+    def cancel(self):
+        self.cancelled.set()
+        if self.th and self.th is not threading.current_thread():
+            self.th.join()
+
+    def running(self) -> bool:
+        return bool(self.th and self.th.is_alive())
+
+    def _record(self, row: tuple):
+        if self.log_len == len(self.log):
+            self.log = np.resize(self.log, 2 * len(self.log))
+        self.log[self.log_len] = row
+        self.log_len += 1
+
+    def _wait_until(self, deadline: float, target: float, issued: float) -> float:
+        # wait for the deadline, watching for the axis to reach target meanwhile
+        arrival = math.nan
+        while not self.cancelled.is_set():
+            now = time.monotonic()
+            if now >= deadline:
+                break
+            if math.isnan(arrival):
+                try:
+                    telemetry = self.motor.get_telemetry()
+                    # ignore snapshots taken before the setpoint was written
+                    if telemetry.timestamp >= issued and abs(telemetry.position - target) <= self.tolerance:
+                        arrival = telemetry.timestamp
+                except Exception as e:
+                    # a failed read only costs this poll, the step keeps its deadline
+                    self.read_errors += 1
+                    self.last_error = f"read: {e}"
+            self.cancelled.wait(min(deadline - now, self.poll_interval) if math.isnan(arrival) else deadline - now)
+        return arrival
+
+    def run(self):
+        if not self.steps:
+            return
+        start = time.monotonic()
+        deadline = start
+        while not self.cancelled.is_set() and (self.cycles is None or self.cycle < self.cycles):
+            for i, step in enumerate(self.steps):
+                scheduled = deadline
+                request = self.motor.set_pos(step.position)
+                if request.wait(0.1):
+                    issued = request.sent_at
+                else:
+                    issued = time.monotonic()
+                    if request.error is not None:
+                        self.write_errors += 1
+                        self.last_error = f"step {i}: {request.error}"
+                deadline += step.delay_ms / 1000
+                arrival = self._wait_until(deadline, step.position, issued)
+                self._record((self.cycle, i, step.position, scheduled - start, issued - start,
+                              issued - scheduled, arrival - start))
+                if self.cancelled.is_set():
+                    return
+            self.cycle += 1
+
+    def get_log(self) -> np.ndarray:
+        return self.log[:self.log_len]
+
+    def save_log(self, path: str):
+        np.save(path, self.get_log())
+
+    def summary(self) -> dict:
+        log = self.get_log()
+        arrived = log['arrival'][~np.isnan(log['arrival'])]
+        return {
+            "cycles": self.cycle,
+            "steps": len(log),
+            "max_error": float(np.abs(log['error']).max()) if len(log) else 0.0,
+            "mean_error": float(log['error'].mean()) if len(log) else 0.0,
+            "arrived": len(arrived),
+            "write_errors": self.write_errors,
+            "read_errors": self.read_errors,
+            "last_error": self.last_error,
+        }
@@ -0,0 +1,140 @@
+import io
+import numpy as np
+
+from signal_buffer import SignalBuffer
+
+# (name, bucket seconds, buckets kept)
+DEFAULT_TIERS = [
+    ("100ms", 0.1, 36000),   # 1 hour
+    ("1s", 1.0, 86400),      # 1 day
+    ("10s", 10.0, 60480),    # 1 week
+]
+
+class AggregateTier:
+    """min/max/mean of every channel over fixed time buckets."""
+
+    def __init__(self, name: str, interval: float, channels: list[str], capacity: int) -> None:
+        self.name = name
+        self.interval = interval
+        self.channels = channels
+        stats = [f"{channel}_{stat}" for channel in channels for stat in ("min", "max", "mean")]
+        self.buffer = SignalBuffer(stats, capacity)
+        self.pending = None  # (bucket, min, max, sum, count) of the bucket still filling
+
+    def add(self, ts: np.ndarray, values: np.ndarray):
+        bins = np.floor(ts / self.interval)
+        starts = np.flatnonzero(np.r_[True, bins[1:] != bins[:-1]])
+        counts = np.diff(np.r_[starts, len(ts)])
+        lows = np.minimum.reduceat(values, starts, axis=1)
+        highs = np.maximum.reduceat(values, starts, axis=1)
+        sums = np.add.reduceat(values, starts, axis=1)
+        buckets = bins[starts]
+
+        if self.pending is not None:
+            bucket, low, high, total, count = self.pending
+            if buckets[0] == bucket:
+                # first group continues the pending bucket
+                lows[:, 0] = np.minimum(lows[:, 0], low)
+                highs[:, 0] = np.maximum(highs[:, 0], high)
+                sums[:, 0] += total
+                counts[0] += count
+            else:
+                self._emit(np.array([bucket]), low[:, None], high[:, None], (total / count)[:, None])
+
+        # the last bucket may still receive samples
+        self.pending = (buckets[-1], lows[:, -1].copy(), highs[:, -1].copy(), sums[:, -1].copy(), counts[-1])
+        if len(buckets) > 1:
+            self._emit(buckets[:-1], lows[:, :-1], highs[:, :-1], sums[:, :-1] / counts[:-1])
+
+    def _emit(self, buckets, lows, highs, means):
+        stats = np.stack((lows, highs, means), axis=1).reshape(3 * len(self.channels), -1)
+        self.buffer.extend(buckets * self.interval, stats)
+
+class TelemetryHistory:
+    """Session history of one SignalBuffer source at several resolutions.
+
+    The raw tier keeps the last raw_capacity samples, each aggregate tier keeps
+    a bounded number of min/max/mean buckets, so memory stays fixed however long
+    the session runs. query() answers from the finest tier that covers the
+    requested range in at most max_points points.
+    """
+
+    def __init__(self, channels: list[str], raw_capacity: int = 200000, tiers=DEFAULT_TIERS) -> None:
+        self.channels = list(channels)
+        self.raw = SignalBuffer(self.channels, raw_capacity)
+        self.tiers = [AggregateTier(name, interval, self.channels, capacity) for name, interval, capacity in tiers]
+        self.source = None
+        self.next_seq = 0
+
+    def update(self, source: SignalBuffer):
+        """Pull the samples added to source since the previous call."""
+        if source is not self.source:
+            self.source = source
+            self.next_seq = 0
+        first, ts, values = source.since(self.next_seq)
+        self.next_seq = first + len(ts)
+        if not len(ts):
+            return
+        self.raw.extend(ts, values)
+        for tier in self.tiers:
+            tier.add(ts, values)
+
+    def _pick(self, since: float, until: float, max_points: int):
+        # finest tier that reaches back to since and fits in max_points
+        candidates = [(None, self.raw)] + [(tier, tier.buffer) for tier in self.tiers]
+        for i, (tier, buffer) in enumerate(candidates):
+            _, ts, _ = buffer.view()
+            if not len(ts):
+                continue
+            last = i == len(candidates) - 1
+            covers = since is None or ts[0] <= since
+            lo = 0 if since is None else np.searchsorted(ts, since)
+            hi = len(ts) if until is None else np.searchsorted(ts, until, side='right')
+            if last or (covers and hi - lo <= max_points):
+                return tier, buffer, lo, hi
+        return None, self.raw, 0, 0
+
+    def query(self, since: float = None, until: float = None, max_points: int = 2000) -> dict:
+        tier, buffer, lo, hi = self._pick(since, until, max_points)
+        _, ts, values = buffer.view()
+        ts, values = ts[lo:hi], values[:, lo:hi]
+        if len(ts) > max_points:
+            # even the coarsest tier is too dense, keep evenly spaced points
+            keep = np.linspace(0, len(ts) - 1, max_points).astype(np.intp)
+            ts, values = ts[keep], values[:, keep]
+        result = {
+            "tier": tier.name if tier else "raw",
+            "interval": tier.interval if tier else 0.0,
+            "timestamp": ts.copy(),
+        }
+        if tier is None:
+            for i, channel in enumerate(self.channels):
+                result[channel] = values[i].copy()
+        else:
+            for i, channel in enumerate(self.channels):
+                result[channel] = {stat: values[3 * i + j].copy() for j, stat in enumerate(("min", "max", "mean"))}
+        return result
+
+def history_to_json(result: dict) -> dict:
+    def convert(value):
+        if isinstance(value, np.ndarray):
+            return value.tolist()
+        if isinstance(value, dict):
+            return {k: convert(v) for k, v in value.items()}
+        return value
+    return convert(result)
+
+def history_to_npz(result: dict) -> bytes:
+    """Compressed columnar encoding, one array per column named channel or channel_stat."""
+    arrays = {}
+    for key, value in result.items():
+        if isinstance(value, dict):
+            for stat, column in value.items():
+                arrays[f"{key}_{stat}"] = column
+        elif isinstance(value, np.ndarray):
+            arrays[key] = value
+        else:
+            arrays[key] = np.array(value)
+    out = io.BytesIO()
+    np.savez_compressed(out, **arrays)
+    return out.getvalue()
@@ -0,0 +1,131 @@
+import math
+import time
+import threading
+
+from signal_buffer import SignalBuffer
+from latency_stats import LatencyHistogram
+import metrics
+
+TELEMETRY_CHANNELS = [
+    "position",
+    "velocity",
+    "torque",
+    "iq",
+    "vbus_voltage",
+    "axis_state",
+    "active_errors",
+    "fetch_time",
+    "jitter",
+]
+
+def telemetry_row(t, jitter: float) -> tuple:
+    """Values of a MotorTelemetry in TELEMETRY_CHANNELS order."""
+    return (t.position, t.velocity, t.torque, t.iq, t.vbus_voltage,
+            t.axis_state, t.active_errors, t.fetch_time, jitter)
+
+def sample_time(t) -> float:
+    """Midpoint of the fetch, the values are read one after the other during it."""
+    return t.timestamp + t.fetch_time / 2
+
+class SamplerStats:
+    def __init__(self) -> None:
+        self.iterations = 0
+        self.overruns = 0      # deadlines missed because a fetch took longer than the period
+        self.skipped = 0       # periods skipped to catch up after an overrun
+        self.errors = 0
+        self.disconnected = 0  # periods skipped while the drive was reconnecting
+        self.max_jitter = 0.0
+        self.jitter_sum = 0.0
+
+    def to_dict(self) -> dict:
+        return {
+            "iterations": self.iterations,
+            "overruns": self.overruns,
+            "skipped": self.skipped,
+            "errors": self.errors,
+            "disconnected": self.disconnected,
+            "max_jitter": self.max_jitter,
+            "mean_jitter": self.jitter_sum / self.iterations if self.iterations else 0.0,
+        }
+
+class TelemetrySampler:
+    """Polls MotorController telemetry at a fixed rate into a SignalBuffer.
+
+    Deadlines are absolute (start + k * period) so fetch time does not make the
+    rate drift, jitter is how late each iteration woke up versus its deadline.
+    """
+
+    def __init__(self, motor, rate_hz: float = 200, capacity: int = 60000) -> None:
+        if rate_hz <= 0:
+            raise ValueError("rate_hz must be positive")
+        self.motor = motor
+        self.period = 1 / rate_hz
+        self.buffer = SignalBuffer(TELEMETRY_CHANNELS, capacity)
+        self.stats = SamplerStats()
+        self.fetch_latency = LatencyHistogram()
+        labels = {"serial": motor.connection.serial_number, "axis": motor.axis_index}
+        self.jitter = metrics.histogram("telemetry_sampler_jitter_seconds", "Wake up delay versus the sampling deadline", labels)
+        self.overruns = metrics.counter("telemetry_sampler_overruns", "Sampling deadlines missed because a fetch was too slow", labels)
+        self.running = False
+        self.th = None
+
+    def start(self):
+        if self.th:
+            return
+        self.running = True
+        self.stats = SamplerStats()
+        self.fetch_latency = LatencyHistogram()
+        self.th = threading.Thread(target=self.sample_loop, daemon=True)
+        self.th.start()
+
+    def stop(self):
+        self.running = False
+        if self.th:
+            self.th.join()
+            self.th = None
+
+    def sample_loop(self):
+        deadline = time.monotonic()
+        while self.running:
+            woke = time.monotonic()
+            jitter = woke - deadline
+            if not self.motor.is_connected():
+                # reconnecting, don't flood the log with read errors
+                self.stats.disconnected += 1
+            else:
+                try:
+                    # max_age=0 always reads the device and refreshes the shared snapshot
+                    t = self.motor.get_telemetry(max_age=0)
+                    self.buffer.append(sample_time(t), telemetry_row(t, jitter))
+                    self.fetch_latency.add(t.fetch_time)
+                except Exception as e:
+                    self.stats.errors += 1
+                    print(f"Exception sampling telemetry {e}")
+
+            stats = self.stats
+            stats.iterations += 1
+            stats.jitter_sum += jitter
+            stats.max_jitter = max(stats.max_jitter, jitter)
+            self.jitter.observe(jitter)
+
+            deadline += self.period
+            now = time.monotonic()
+            if now > deadline:
+                # overrun, drop the missed periods instead of bursting to catch up
+                stats.overruns += 1
+                self.overruns.inc()
+                missed = math.ceil((now - deadline) / self.period)
+                stats.skipped += missed
+                deadline += missed * self.period
+            time.sleep(max(deadline - time.monotonic(), 0))
+
+    def latest(self, n: int):
+        return self.buffer.latest(n)
+
+    def since(self, seq: int):
+        return self.buffer.since(seq)
+
+    def get_stats(self) -> dict:
+        stats = self.stats.to_dict()
+        stats.update(rate_hz=1 / self.period, samples=self.buffer.seq, fetch_time=self.fetch_latency.to_dict())
+        return stats
@@ -0,0 +1,84 @@
+import json
+import struct
+import numpy as np
+
+from signal_buffer import SignalBuffer
+
+# Binary frame: header then float64 timestamps and float32 values [channel, sample]
+#   uint8 version, uint8 source id, uint16 channel count, uint32 first seq, uint32 sample count, uint32 dropped
+BINARY_HEADER = struct.Struct('<BBHIII')
+BINARY_VERSION = 1
+
+class StreamCursor:
+    """Per-subscriber read position on a shared SignalBuffer.
+
+    Nothing is queued per client: every poll() reads what arrived since the
+    previous one straight from the buffer, downsampled to the client rate.
+    A client that falls behind skips to the newest max_batch samples and the
+    skipped ones are counted in dropped.
+    """
+
+    def __init__(self, name: str, source_id: int, buffer: SignalBuffer, rate_hz: float = None,
+                 max_batch: int = 1000) -> None:
+        self.name = name
+        self.source_id = source_id
+        self.buffer = buffer
+        self.period = 1 / rate_hz if rate_hz else 0.0
+        self.max_batch = max_batch
+        self.next_seq = buffer.seq  # start with live data
+        self.last_bin = None
+        self.sent = 0
+        self.dropped = 0
+
+    def poll(self):
+        """Returns (first_seq, timestamps, values) of the new samples to send, or None."""
+        first, ts, values = self.buffer.since(self.next_seq)
+        if first > self.next_seq:
+            # the writer lapped this client
+            self.dropped += first - self.next_seq
+        self.next_seq = first + len(ts)
+        if not len(ts):
+            return None
+
+        if self.period:
+            # keep the first sample of every rate period
+            bins = np.floor(ts / self.period)
+            keep = np.empty(len(bins), dtype=bool)
+            keep[0] = self.last_bin is None or bins[0] != self.last_bin
+            keep[1:] = bins[1:] != bins[:-1]
+            self.last_bin = bins[-1]
+            ts, values = ts[keep], values[:, keep]
+        if len(ts) > self.max_batch:
+            self.dropped += len(ts) - self.max_batch
+            ts, values = ts[-self.max_batch:], values[:, -self.max_batch:]
+        if not len(ts):
+            return None
+        self.sent += len(ts)
+        return first, ts, values
+
+    def describe(self) -> dict:
+        return {"source": self.name, "id": self.source_id, "channels": self.buffer.channels}
+
+    def encode_json(self, first: int, ts: np.ndarray, values: np.ndarray) -> str:
+        frame = {
+            "source": self.name,
+            "seq": first,
+            "dropped": self.dropped,
+            "timestamp": ts.tolist(),
+        }
+        for i, channel in enumerate(self.buffer.channels):
+            frame[channel] = values[i].tolist()
+        return json.dumps(frame)
+
+    def encode_binary(self, first: int, ts: np.ndarray, values: np.ndarray) -> bytes:
+        header = BINARY_HEADER.pack(BINARY_VERSION, self.source_id, len(values), first & 0xFFFFFFFF,
+                                    len(ts), min(self.dropped, 0xFFFFFFFF))
+        return header + ts.astype('<f8').tobytes() + values.astype('<f4').tobytes()
+
+def decode_binary(frame: bytes):
+    """Client side helper, inverse of StreamCursor.encode_binary()."""
+    version, source_id, channels, first, n, dropped = BINARY_HEADER.unpack_from(frame)
+    offset = BINARY_HEADER.size
+    ts = np.frombuffer(frame, '<f8', count=n, offset=offset)
+    values = np.frombuffer(frame, '<f4', count=n * channels, offset=offset + 8 * n).reshape(channels, n)
+    return source_id, first, dropped, ts, values
@@ -0,0 +1,100 @@
+import math
+import numpy as np
+
+from signal_buffer import SignalBuffer
+from clock_sync import ClockSync
+from latency_stats import LatencyHistogram
+
+class StreamAligner:
+    """Resamples several SignalBuffers onto one fixed rate grid of host monotonic time.
+
+    poll() returns the grid points covered by every stream since the previous
+    call, each channel linearly interpolated between its neighbouring samples,
+    so nothing is extrapolated: a grid point waits until all streams have a
+    sample after it. channels names the buffer channels taken from each
+    stream, streams whose buffer is None are left out (zeros).
+    """
+
+    def __init__(self, channels: dict[str, list[str]], rate_hz: float = 100) -> None:
+        self.channels = channels
+        self.period = 1 / rate_hz
+        self.next_time = None
+        self.buffers = {}
+        self.cursors = {}
+        self.rows = 0
+        # distance from a grid point to the farther of the two samples it is interpolated from
+        self.gaps = {name: LatencyHistogram() for name in channels}
+
+    def poll(self, buffers: dict[str, SignalBuffer]):
+        """Returns (grid, {stream: values[channel, point]}), grid empty if nothing new is covered."""
+        data = {}
+        end = math.inf
+        for name in self.channels:
+            buffer = buffers.get(name)
+            if buffer is None:
+                continue
+            if self.buffers.get(name) is not buffer:
+                self.buffers[name] = buffer
+                self.cursors[name] = 0
+            first, ts, values = buffer.since(self.cursors[name])
+            if not len(ts):
+                return np.empty(0), {}
+            data[name] = (first, ts, values)
+            end = min(end, ts[-1])
+        if not data:
+            return np.empty(0), {}
+
+        # a stream that (re)connected starts later than the grid, don't stretch its first sample back
+        start = max(ts[0] for _, ts, _ in data.values())
+        if self.next_time is not None:
+            start = max(start, self.next_time)
+        start = math.ceil(start / self.period) * self.period
+        n = math.floor((end - start) / self.period) + 1 if end >= start else 0
+        if n <= 0:
+            return np.empty(0), {}
+        grid = start + np.arange(n) * self.period
+
+        result = {}
+        for name, samples in self.channels.items():
+            if name not in data:
+                result[name] = np.zeros((len(samples), n))
+                continue
+            first, ts, values = data[name]
+            rows = [self.buffers[name].index[channel] for channel in samples]
+            result[name] = np.vstack([np.interp(grid, ts, values[row]) for row in rows])
+            after = np.clip(np.searchsorted(ts, grid), 0, len(ts) - 1)
+            before = np.maximum(after - 1, 0)
+            self.gaps[name].add_many(np.maximum(ts[after] - grid, grid - ts[before]))
+            # keep the last sample before the next grid point, it's needed to interpolate it
+            keep = np.searchsorted(ts, grid[-1] + self.period, side='right') - 1
+            self.cursors[name] = first + max(int(keep), 0)
+        self.next_time = grid[-1] + self.period
+        self.rows += n
+        return grid, result
+
+    def get_stats(self) -> dict:
+        return {
+            "rate_hz": 1 / self.period,
+            "rows": self.rows,
+            "interpolation_gap": {name: gap.to_dict() for name, gap in self.gaps.items()},
+        }
+
+def timing_report(clock: ClockSync, stages: dict[str, LatencyHistogram], aligner: StreamAligner = None) -> dict:
+    """Alignment error of a recording and the latency of every pipeline stage.
+
+    alignment_error adds the clock fit error of the load cell timestamps and
+    half the longest motor fetch (the values are read one after the other
+    during the fetch and stamped with its midpoint). The constant minimum
+    USB delay of the load cell link is not included, see ClockSync.
+    """
+    fetch = stages.get("motor_fetch")
+    motor_error = fetch.max / 2 if fetch and fetch.count else 0.0
+    report = {
+        "alignment_error": clock.error + motor_error,
+        "alignment_error_parts": {"clock_fit": clock.error, "motor_fetch": motor_error},
+        "clock": clock.get_stats(),
+        "stages": {name: histogram.to_dict() for name, histogram in stages.items()},
+    }
+    if aligner:
+        report["aligner"] = aligner.get_stats()
+    return report
@@ -0,0 +1,190 @@
+import math
+import time
+import threading
+from functools import lru_cache
+import numpy as np
+
+from odrive.utils import InputMode
+
+# Profiles are sampled at a fixed rate, positions in deg, times in s.
+# Generators are cached on their parameters, the returned arrays are read only
+# so a cached profile can be streamed by several endurance cycles safely.
+PROFILE_CACHE_SIZE = 64
+
+def _freeze(positions: np.ndarray) -> np.ndarray:
+    positions.flags.writeable = False
+    return positions
+
+def _time_grid(duration: float, rate_hz: float) -> np.ndarray:
+    return np.arange(int(math.ceil(duration * rate_hz)) + 1) / rate_hz
+
+@lru_cache(maxsize=PROFILE_CACHE_SIZE)
+def trapezoid(start: float, end: float, vel_limit: float, accel_limit: float, rate_hz: float = 200) -> np.ndarray:
+    """Constant acceleration profile (triangular if vel_limit is never reached)."""
+    distance = abs(end - start)
+    direction = 1 if end >= start else -1
+    vel = min(vel_limit, math.sqrt(distance * accel_limit))
+    t_acc = vel / accel_limit if accel_limit else 0.0
+    t_cruise = (distance - vel * t_acc) / vel if vel else 0.0
+    duration = 2 * t_acc + t_cruise
+    t = _time_grid(duration, rate_hz)
+
+    t_dec = np.clip(t - t_acc - t_cruise, 0, t_acc)
+    pos = np.where(
+        t < t_acc,
+        0.5 * accel_limit * t ** 2,
+        vel * t_acc / 2 + vel * np.clip(t - t_acc, 0, t_cruise) + vel * t_dec - 0.5 * accel_limit * t_dec ** 2,
+    )
+    pos = np.minimum(pos, distance)
+    return _freeze(start + direction * pos)
+
+@lru_cache(maxsize=PROFILE_CACHE_SIZE)
+def scurve(start: float, end: float, vel_limit: float, accel_limit: float, jerk_limit: float,
+           rate_hz: float = 200) -> np.ndarray:
+    """Jerk limited (7 segment) profile, built by integrating the acceleration shape."""
+    distance = abs(end - start)
+    direction = 1 if end >= start else -1
+    if distance == 0:
+        return _freeze(np.array([float(start)]))
+
+    def accel_phase(vel):
+        # acceleration limited by jerk if vel is too low to reach accel_limit
+        acc = min(accel_limit, math.sqrt(vel * jerk_limit))
+        t_jerk = acc / jerk_limit
+        return acc, t_jerk, vel / acc + t_jerk
+
+    vel = vel_limit
+    acc, t_jerk, t_acc = accel_phase(vel)
+    if vel * t_acc > distance:
+        # cruise speed not reachable, bisect the peak velocity
+        low, high = 0.0, vel_limit
+        for _ in range(60):
+            vel = (low + high) / 2
+            acc, t_jerk, t_acc = accel_phase(vel)
+            low, high = (vel, high) if vel * t_acc < distance else (low, vel)
+    t_cruise = max(distance - vel * t_acc, 0.0) / vel
+    duration = 2 * t_acc + t_cruise
+
+    dt = 1 / rate_hz
+    t = _time_grid(duration, rate_hz)
+    knots = [0, t_jerk, t_acc - t_jerk, t_acc, t_acc + t_cruise, t_acc + t_cruise + t_jerk,
+             duration - t_jerk, duration]
+    accel = np.interp(t, knots, [0, acc, acc, 0, 0, -acc, -acc, 0])
+    velocity = np.cumsum(accel) * dt
+    pos = np.cumsum(velocity) * dt
+    # remove the integration error so the profile ends exactly on target
+    pos *= distance / pos[-1] if pos[-1] else 0.0
+    return _freeze(start + direction * pos)
+
+@lru_cache(maxsize=PROFILE_CACHE_SIZE)
+def sine_sweep(center: float, amplitude: float, f_start: float, f_end: float, duration: float,
+               rate_hz: float = 200) -> np.ndarray:
+    """Linear chirp from f_start to f_end Hz around center."""
+    t = _time_grid(duration, rate_hz)
+    phase = 2 * np.pi * (f_start * t + (f_end - f_start) * t ** 2 / (2 * duration))
+    return _freeze(center + amplitude * np.sin(phase))
+
+def waypoint_spline(times, positions, rate_hz: float = 200) -> np.ndarray:
+    """Cubic Hermite spline through (time, position) waypoints, Catmull-Rom slopes, at rest at both ends.
+
+    times and positions can be any sequences (lists from a step file), they are cached as tuples.
+    """
+    return _waypoint_spline(tuple(map(float, times)), tuple(map(float, positions)), rate_hz)
+
+@lru_cache(maxsize=PROFILE_CACHE_SIZE)
+def _waypoint_spline(times: tuple, positions: tuple, rate_hz: float) -> np.ndarray:
+    times = np.asarray(times, dtype=float)
+    positions = np.asarray(positions, dtype=float)
+    if len(times) != len(positions) or len(times) < 2:
+        raise ValueError("need at least two waypoints with matching times and positions")
+    slopes = np.zeros(len(times))
+    slopes[1:-1] = (positions[2:] - positions[:-2]) / (times[2:] - times[:-2])
+
+    t = times[0] + _time_grid(times[-1] - times[0], rate_hz)
+    t = np.minimum(t, times[-1])
+    i = np.clip(np.searchsorted(times, t, side='right') - 1, 0, len(times) - 2)
+    h = times[i + 1] - times[i]
+    s = (t - times[i]) / h
+    h00 = 2 * s ** 3 - 3 * s ** 2 + 1
+    h10 = s ** 3 - 2 * s ** 2 + s
+    h01 = -2 * s ** 3 + 3 * s ** 2
+    h11 = s ** 3 - s ** 2
+    pos = h00 * positions[i] + h10 * h * slopes[i] + h01 * positions[i + 1] + h11 * h * slopes[i + 1]
+    return _freeze(pos)
+
+def cache_info():
+    functions = {"trapezoid": trapezoid, "scurve": scurve, "sine_sweep": sine_sweep, "waypoint_spline": _waypoint_spline}
+    return {name: f.cache_info()._asdict() for name, f in functions.items()}
+
+class StreamStats:
+    def __init__(self) -> None:
+        self.sent = 0
+        self.underruns = 0   # ticks that started after the next setpoint was already due
+        self.coalesced = 0   # setpoints replaced in the dispatcher before reaching the drive
+        self.max_late = 0.0
+        self.cycles = 0
+
+    def to_dict(self) -> dict:
+        return dict(self.__dict__)
+
+class TrajectoryStreamer:
+    """Streams a sampled profile to the drive at its sample rate.
+
+    The drive is switched to POS_FILTER input mode for the duration of the
+    stream (TRAP_TRAJ would re-plan every setpoint) and its previous input
+    mode is restored afterwards.
+    Ticks run on absolute deadlines; a tick that wakes up more than one period
+    late means the drive held a stale setpoint and is counted as an underrun.
+    """
+
+    def __init__(self, motor, positions: np.ndarray, rate_hz: float, cycles: int = 1) -> None:
+        self.motor = motor
+        self.positions = positions
+        self.period = 1 / rate_hz
+        self.cycles = cycles  # None repeats until stopped
+        self.stats = StreamStats()
+        self.cancelled = threading.Event()
+        self.th = None
+
+    def start(self):
+        self.cancelled.clear()
+        self.th = threading.Thread(target=self.run, daemon=True)
+        self.th.start()
+
+    def stop(self):
+        self.cancelled.set()
+        if self.th and self.th is not threading.current_thread():
+            self.th.join()
+
+    def running(self) -> bool:
+        return bool(self.th and self.th.is_alive())
+
+    def run(self):
+        # back to what the profile configured afterwards, not a fixed mode
+        previous = self.motor.get_input_mode()
+        self.motor.set_input_mode(InputMode.POS_FILTER)
+        try:
+            self.stream()
+        finally:
+            self.motor.set_input_mode(previous)
+
+    def stream(self):
+        stats = self.stats
+        deadline = time.monotonic()
+        last = None
+        while self.cycles is None or stats.cycles < self.cycles:
+            for position in self.positions:
+                if self.cancelled.is_set():
+                    return
+                late = time.monotonic() - deadline
+                if late > self.period:
+                    stats.underruns += 1
+                stats.max_late = max(stats.max_late, late)
+                previous = last
+                last = self.motor.set_pos(float(position))
+                if previous and previous.superseded:
+                    stats.coalesced += 1
+                stats.sent += 1
+                deadline += self.period
+                self.cancelled.wait(max(deadline - time.monotonic(), 0))
+            stats.cycles += 1